@@ -0,0 +1,181 @@
+"""Compare request throughput of the threadpool (DB_MODE=sync) and asyncio
+(DB_MODE=async) database modes under high concurrency.
+
+Each mode gets its own uvicorn server and a fresh temporary database seeded with
+the same users and moods; the load is a mix of authenticated mood listings and
+mood/journal writes.
+
+    python benchmarks/db_modes.py --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import create_engine
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from migrations import run_migrations  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def migrate(db_path: str):
+    """Create the schema in a fresh database; the server refuses to start without it."""
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        run_migrations(engine)
+    finally:
+        engine.dispose()
+
+
+def start_server(mode: str, db_path: str, port: int, profile: str, **extra_env: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DB_MODE=mode,
+        DB_PROFILE=profile,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-benchmark"),
+        FEEDBACK_PRECOMPUTE="0",
+        # Password hashing is not what is being measured.
+        BCRYPT_ROUNDS="4",
+        **extra_env,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env,
+    )
+
+
+async def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/prompts/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+async def seed(client: httpx.AsyncClient, users: int, days: int) -> list:
+    tokens = []
+    start = date(2025, 1, 1)
+    for n in range(users):
+        email = f"bench{n}@example.com"
+        await client.post("/users/", json={"email": email, "password": "benchmark-pass"})
+        login = await client.post("/login", json={"email": email, "password": "benchmark-pass"})
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+        for offset in range(days):
+            day = (start + timedelta(days=offset)).isoformat()
+            await client.post("/moods/", headers=headers, json={"mood": "neutral", "mood_date": day})
+        tokens.append(headers)
+    return tokens
+
+
+async def run_load(client: httpx.AsyncClient, tokens: list, total: int, concurrency: int, write_ratio: float, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for n in range(total):
+        queue.put_nowait(n)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                n = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = rng.choice(tokens)
+            began = time.perf_counter()
+            if rng.random() < write_ratio:
+                response = await client.post("/journal/", headers=headers, json={
+                    "entry_date": "2025-06-01", "content": f"Benchmark entry {n}"
+                })
+            else:
+                response = await client.get("/moods/?limit=50", headers=headers)
+            latencies.append((time.perf_counter() - began) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+async def bench_mode(mode: str, args) -> dict:
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    migrate(db_path)
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(mode, db_path, port, args.profile)
+    try:
+        await wait_until_up(base_url)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            tokens = await seed(client, args.users, args.days)
+            return await run_load(client, tokens, args.requests, args.concurrency, args.write_ratio, args.seed)
+    finally:
+        server.terminate()
+        server.wait()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--profile", choices=["default", "production"], default="production")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(bench_mode(mode, args)) for mode in ("sync", "async")}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.requests} requests at concurrency {args.concurrency}, {args.write_ratio:.0%} writes, {args.profile} profile\n")
+    for mode, r in results.items():
+        print(
+            f"{mode:>5}: {r['requests_per_second']:8.1f} req/s  p50 {r['p50_ms']:7.2f} ms  "
+            f"p95 {r['p95_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  errors {r['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Compare journal search through the journal_fts index (migration 6) against a
+LIKE scan of the user's entries.
+
+    python benchmarks/journal_search.py --entries 1000000 --users 1000
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrations import run_migrations  # noqa: E402
+
+# A Zipf-distributed synthetic vocabulary: a few very common words and a long
+# tail, like real prose. Queries draw from the middle of the distribution.
+VOCABULARY = [f"w{n}" for n in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+FTS_SQL = """
+    SELECT journal.id, snippet(journal_fts, 0, '<mark>', '</mark>', '…', 16), bm25(journal_fts) AS rank
+    FROM journal_fts JOIN journal ON journal.id = journal_fts.rowid
+    WHERE journal_fts MATCH :match AND journal.user_id = :user_id
+    ORDER BY rank, journal.id LIMIT 21
+"""
+LIKE_SQL = """
+    SELECT id, content FROM journal
+    WHERE user_id = :user_id AND content LIKE :pattern
+    ORDER BY entry_date DESC, id DESC LIMIT 21
+"""
+GLOBAL_LIKE_SQL = "SELECT id FROM journal WHERE content LIKE :pattern LIMIT 21"
+GLOBAL_FTS_SQL = "SELECT rowid FROM journal_fts WHERE journal_fts MATCH :term LIMIT 21"
+
+
+def populate(engine, entries: int, users: int, seed: int):
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    now = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, email, password_hash, created_at) VALUES (:id, :email, 'x', :now)"),
+            [{"id": u, "email": f"user{u}@example.com", "now": now} for u in range(1, users + 1)]
+        )
+        batch = []
+        for n in range(entries):
+            batch.append({
+                "user_id": rng.randint(1, users),
+                "day": start + timedelta(days=rng.randrange(3650)),
+                "content": " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=rng.randint(20, 80))),
+                "now": now,
+            })
+            if len(batch) == 50000 or n == entries - 1:
+                conn.execute(
+                    text("INSERT INTO journal (user_id, entry_date, content, created_at) VALUES (:user_id, :day, :content, :now)"),
+                    batch
+                )
+                batch = []
+
+
+def timed(conn, sql: str, params, runs: int) -> dict:
+    timings = []
+    for bound in params[:runs]:
+        began = time.perf_counter()
+        conn.execute(text(sql), bound).fetchall()
+        timings.append((time.perf_counter() - began) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        # Load rows before the FTS migration so the index is built in one 'rebuild'.
+        run_migrations(engine, target=5)
+        populate(engine, args.entries, args.users, args.seed)
+        began = time.perf_counter()
+        run_migrations(engine)
+        index_seconds = round(time.perf_counter() - began, 2)
+
+        rng = random.Random(args.seed)
+        terms = [rng.choice(VOCABULARY[100:2000]) for _ in range(args.runs)]
+        per_user = []
+        for term in terms:
+            user_id = rng.randint(1, args.users)
+            per_user.append({
+                "user_id": user_id,
+                "match": f'user_id:"{user_id}" AND content:"{term}"',
+                "term": f'content:"{term}"',
+                # Trailing space keeps w12 from matching w123.
+                "pattern": f"%{term} %",
+            })
+        with engine.connect() as conn:
+            results = {
+                "user_fts": timed(conn, FTS_SQL, per_user, args.runs),
+                "user_like": timed(conn, LIKE_SQL, per_user, args.runs),
+                "global_fts": timed(conn, GLOBAL_FTS_SQL, per_user, args.runs),
+                "global_like": timed(conn, GLOBAL_LIKE_SQL, per_user, args.runs),
+            }
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    if args.json:
+        print(json.dumps({"index_build_seconds": index_seconds, **results}, indent=2))
+        return
+    print(f"{args.entries} entries across {args.users} users, {args.runs} single-term queries")
+    print(f"FTS index built in {index_seconds} s\n")
+    for name, r in results.items():
+        print(f"{name:>12}: {r['mean_ms']:9.3f} ms mean  {r['p95_ms']:9.3f} ms p95")
+
+
+if __name__ == "__main__":
+    main()
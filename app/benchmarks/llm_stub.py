@@ -0,0 +1,64 @@
+"""A stand-in for the OpenAI chat completions API, so the feedback routes can be
+load-tested without a key or a bill. Answers after LLM_STUB_LATENCY_MS
+(streamed responses spread that over LLM_STUB_CHUNKS chunks).
+
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 ...
+    python -m uvicorn llm_stub:app --app-dir benchmarks --port 8100
+"""
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_SECONDS = float(os.getenv("LLM_STUB_LATENCY_MS", "300")) / 1000
+CHUNKS = max(1, int(os.getenv("LLM_STUB_CHUNKS", "10")))
+REPLY = (
+    "It sounds like today asked a lot of you, and you still made room to notice how you felt. "
+    "Be gentle with yourself tonight, and consider one small thing that could make tomorrow lighter."
+)
+
+app = FastAPI()
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    created = int(time.time())
+    prompt_tokens, completion_tokens = len(json.dumps(body["messages"])) // 4, len(REPLY) // 4
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    if not body.get("stream"):
+        await asyncio.sleep(LATENCY_SECONDS)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    words = REPLY.split(" ")
+    size = -(-len(words) // CHUNKS)
+
+    async def events():
+        for start in range(0, len(words), size):
+            await asyncio.sleep(LATENCY_SECONDS / CHUNKS)
+            text = " ".join(words[start:start + size]) + " "
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model, "choices": [], "usage": usage}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
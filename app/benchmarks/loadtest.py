@@ -0,0 +1,432 @@
+"""Load-test every route of the API against a synthetic population.
+
+Bulk-seeds a fresh SQLite database with seed_db.py from synthetic.py (users with
+years of moods and journal entries of realistic length), starts a uvicorn server on it
+and drives a weighted mix of all user, mood, prompt, journal, import, export and
+feedback-cache routes from concurrent clients for a fixed duration. Reports
+throughput and p50/p95/p99 latency per route ("GET /journal/{journal_id}").
+
+The LLM-backed feedback routes are only exercised with --llm, which points the
+server at benchmarks/llm_stub.py so no API key is needed or billed.
+
+    python benchmarks/loadtest.py --users 1000 --years 2 --duration 60 --concurrency 64
+    python benchmarks/loadtest.py --output baseline.json
+    python benchmarks/loadtest.py --compare baseline.json --max-regression 25
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(APP_DIR))
+# Must be set before passwords is imported: the server runs with the same cost.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from db_modes import free_port, start_server, wait_until_up  # noqa: E402
+from seed_db import seed_bulk  # noqa: E402
+from synthetic import MOOD_LEVELS, Population  # noqa: E402
+
+PASSWORD = "loadtest-pass"
+
+
+# ---- measurement ----
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "requests_per_second": round(len(ordered) / seconds, 2),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(percentile(ordered, 0.50), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, route: str, milliseconds: float, ok: bool):
+        if not self.recording:
+            return
+        self.latencies[route].append(milliseconds)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, seconds: float) -> dict:
+        every = [ms for latencies in self.latencies.values() for ms in latencies]
+        return {
+            "totals": summarize(every, sum(self.errors.values()), seconds) if every else {},
+            "routes": {
+                route: summarize(self.latencies[route], self.errors[route], seconds)
+                for route in sorted(self.latencies)
+            },
+        }
+
+
+# ---- scenarios ----
+
+class Session:
+    """One logged-in population user; several clients may share it."""
+
+    def __init__(self, user_id: int, headers: dict, journal_ids: List[int], first_free_day: date):
+        self.user_id = user_id
+        self.headers = headers
+        self.journal_ids = journal_ids
+        self.created: List[int] = []
+        # Dates after the synthetic history, handed out once so new moods never collide.
+        self.days = (first_free_day + timedelta(days=n) for n in itertools.count())
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, population: Population, recorder: Recorder, llm: bool, seed: int):
+        self.client = client
+        self.population = population
+        self.recorder = recorder
+        self.sessions: List[Session] = []
+        self.search_terms = population.search_terms(50)
+        self.new_users = itertools.count()
+        self.run_tag = random.Random(seed).getrandbits(32)
+        # A small pool of texts so repeated feedback requests hit the cache.
+        self.feedback_texts = [population.text(random.Random(f"{seed}:feedback:{n}")) for n in range(20)]
+        self.scenarios = [(weight, scenario) for weight, scenario, needs_llm in self.SCENARIOS if llm or not needs_llm]
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        began = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.recorder.add(route, (time.perf_counter() - began) * 1000, response is not None and response.status_code < 400)
+        return response
+
+    async def login(self, user_id: int) -> Session:
+        response = await self.client.post("/login", json={"email": self.population.email(user_id), "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        journals = await self.client.get("/journal/?limit=100", headers=headers)
+        return Session(user_id, headers, [entry["id"] for entry in journals.json()], self.population.end + timedelta(days=1))
+
+    async def worker(self, rng: random.Random, deadline: float):
+        weights = [weight for weight, _ in self.scenarios]
+        scenarios = [scenario for _, scenario in self.scenarios]
+        while time.monotonic() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            await scenario(self, rng, rng.choice(self.sessions))
+
+    # Users
+
+    async def read_me(self, rng, s):
+        await self.call("GET /users/me", "GET", "/users/me", headers=s.headers)
+
+    async def read_user(self, rng, s):
+        await self.call("GET /users/{user_id}", "GET", f"/users/{rng.randint(1, self.population.users)}")
+
+    async def list_users(self, rng, s):
+        await self.call("GET /users/", "GET", "/users/")
+
+    async def log_in(self, rng, s):
+        await self.call("POST /login", "POST", "/login", json={"email": self.population.email(s.user_id), "password": PASSWORD})
+
+    async def user_lifecycle(self, rng, s):
+        email = f"loadtest-{self.run_tag}-{next(self.new_users)}@example.com"
+        response = await self.call("POST /users/", "POST", "/users/", json={"email": email, "password": PASSWORD})
+        if response is None or response.status_code >= 400:
+            return
+        user_id = response.json()["id"]
+        await self.call("PUT /users/{user_id}", "PUT", f"/users/{user_id}", json={"email": email, "display_name": "Load Test"})
+        await self.call("DELETE /users/{user_id}", "DELETE", f"/users/{user_id}")
+
+    # Moods
+
+    async def log_mood(self, rng, s):
+        await self.call("POST /moods/", "POST", "/moods/", headers=s.headers, json={
+            "mood": rng.choice(MOOD_LEVELS), "mood_date": str(next(s.days)),
+        })
+
+    async def list_moods(self, rng, s):
+        response = await self.call("GET /moods/", "GET", "/moods/?limit=50", headers=s.headers)
+        cursor = response is not None and response.headers.get("X-Next-Cursor")
+        if cursor and rng.random() < 0.3:
+            await self.call("GET /moods/", "GET", "/moods/", params={"limit": 50, "cursor": cursor}, headers=s.headers)
+
+    async def mood_trends(self, rng, s):
+        await self.call("GET /moods/trends", "GET", "/moods/trends", headers=s.headers, params={
+            "period": rng.choice(("week", "month")), "to": str(self.population.end),
+        })
+
+    async def import_moods(self, rng, s):
+        lines = (json.dumps({"mood": rng.choice(MOOD_LEVELS), "mood_date": str(next(s.days))}) for _ in range(30))
+        await self.call("POST /moods/import", "POST", "/moods/import", content="\n".join(lines),
+                        headers={**s.headers, "Content-Type": "application/x-ndjson"})
+
+    # Prompts
+
+    async def list_prompts(self, rng, s):
+        await self.call("GET /prompts/", "GET", "/prompts/")
+
+    async def read_prompt(self, rng, s):
+        await self.call("GET /prompts/{prompt_id}", "GET", f"/prompts/{rng.randint(1, max(1, self.population.prompts))}")
+
+    # Journals
+
+    def entry(self, rng) -> dict:
+        prompt_id = rng.randint(1, self.population.prompts) if self.population.prompts and rng.random() < 0.7 else None
+        return {"prompt_id": prompt_id, "entry_date": str(self.population.end), "content": self.population.text(rng)}
+
+    async def write_journal(self, rng, s):
+        response = await self.call("POST /journal/", "POST", "/journal/", headers=s.headers, json=self.entry(rng))
+        if response is not None and response.status_code < 400:
+            s.created.append(response.json()["id"])
+            s.journal_ids.append(s.created[-1])
+
+    async def list_journals(self, rng, s):
+        await self.call("GET /journal/", "GET", "/journal/?limit=20", headers=s.headers)
+
+    async def read_journal(self, rng, s):
+        if s.journal_ids:
+            await self.call("GET /journal/{journal_id}", "GET", f"/journal/{rng.choice(s.journal_ids)}", headers=s.headers)
+
+    async def edit_journal(self, rng, s):
+        if s.journal_ids:
+            journal_id = rng.choice(s.journal_ids)
+            await self.call("PUT /journal/{journal_id}", "PUT", f"/journal/{journal_id}", headers=s.headers, json=self.entry(rng))
+
+    async def delete_journal(self, rng, s):
+        # Only entries this run created, so the synthetic history stays intact.
+        if not s.created:
+            return await self.write_journal(rng, s)
+        journal_id = s.created.pop(rng.randrange(len(s.created)))
+        if journal_id in s.journal_ids:
+            s.journal_ids.remove(journal_id)
+        await self.call("DELETE /journal/{journal_id}", "DELETE", f"/journal/{journal_id}", headers=s.headers)
+
+    async def search_journals(self, rng, s):
+        terms = " ".join(rng.sample(self.search_terms, rng.choice((1, 1, 2))))
+        await self.call("GET /journal/search", "GET", "/journal/search", params={"q": terms, "limit": 20}, headers=s.headers)
+
+    async def import_journals(self, rng, s):
+        lines = (json.dumps({**self.entry(rng), "entry_date": str(next(s.days))}) for _ in range(10))
+        await self.call("POST /journal/import", "POST", "/journal/import", content="\n".join(lines),
+                        headers={**s.headers, "Content-Type": "application/x-ndjson"})
+
+    async def export(self, rng, s):
+        params = {"format": rng.choice(("ndjson", "csv")), "gzip": str(rng.random() < 0.5).lower()}
+        await self.call("GET /export", "GET", "/export", params=params, headers=s.headers)
+
+    async def feedback_cache_stats(self, rng, s):
+        await self.call("GET /journal/feedback/cache", "GET", "/journal/feedback/cache")
+
+    # Feedback (LLM)
+
+    def feedback_text(self, rng) -> str:
+        return rng.choice(self.feedback_texts) if rng.random() < 0.5 else self.population.text(rng)
+
+    async def feedback(self, rng, s):
+        await self.call("POST /journal/feedback", "POST", "/journal/feedback", json={"content": self.feedback_text(rng)})
+
+    async def feedback_stream(self, rng, s):
+        await self.call("POST /journal/feedback/stream", "POST", "/journal/feedback/stream", json={"content": self.feedback_text(rng)})
+
+    async def feedback_batch(self, rng, s):
+        if s.journal_ids:
+            journal_ids = rng.sample(s.journal_ids, min(5, len(s.journal_ids)))
+            await self.call("POST /journal/feedback/batch", "POST", "/journal/feedback/batch", headers=s.headers, json={"journal_ids": journal_ids})
+
+    async def precomputed_feedback(self, rng, s):
+        if s.journal_ids:
+            await self.call("GET /journal/{journal_id}/feedback", "GET", f"/journal/{rng.choice(s.journal_ids)}/feedback", headers=s.headers)
+
+    # (weight, scenario, needs --llm): reads dominate, as in real use.
+    SCENARIOS = [
+        (6, read_me, False),
+        (2, read_user, False),
+        (0.2, list_users, False),
+        (1, log_in, False),
+        (0.5, user_lifecycle, False),
+        (5, log_mood, False),
+        (12, list_moods, False),
+        (6, mood_trends, False),
+        (0.3, import_moods, False),
+        (4, list_prompts, False),
+        (2, read_prompt, False),
+        (4, write_journal, False),
+        (10, list_journals, False),
+        (6, read_journal, False),
+        (2, edit_journal, False),
+        (1, delete_journal, False),
+        (5, search_journals, False),
+        (0.3, import_journals, False),
+        (0.5, export, False),
+        (1, feedback_cache_stats, False),
+        (2, feedback, True),
+        (1, feedback_stream, True),
+        (0.5, feedback_batch, True),
+        (1, precomputed_feedback, True),
+    ]
+
+
+# ---- runner ----
+
+def stop(process: Optional[subprocess.Popen]):
+    if process is not None:
+        process.terminate()
+        process.wait()
+
+
+async def run(args) -> dict:
+    population = Population(users=args.users, years=args.years, journals_per_week=args.journals_per_week, seed=args.seed)
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    stub = server = None
+    try:
+        began = time.perf_counter()
+        dataset = seed_bulk(db_path, population, password=PASSWORD, verbose=False)
+        dataset["load_seconds"] = round(time.perf_counter() - began, 2)
+
+        extra_env = {}
+        if args.llm:
+            stub_port = free_port()
+            stub = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "llm_stub:app", "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+                 "--port", str(stub_port), "--log-level", "warning"],
+                env=dict(os.environ, LLM_STUB_LATENCY_MS=str(args.llm_latency_ms)),
+            )
+            extra_env["OPENAI_BASE_URL"] = f"http://127.0.0.1:{stub_port}/v1"
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(args.db_mode, db_path, port, args.profile, **extra_env)
+        await wait_until_up(base_url)
+
+        recorder = Recorder()
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            load = LoadTest(client, population, recorder, args.llm, args.seed)
+            rng = random.Random(args.seed)
+            active = rng.sample(range(1, population.users + 1), min(args.active_users, population.users))
+            load.sessions = await asyncio.gather(*(load.login(user_id) for user_id in active))
+
+            workers = [random.Random(f"{args.seed}:worker:{n}") for n in range(args.concurrency)]
+            if args.warmup:
+                await asyncio.gather(*(load.worker(w, time.monotonic() + args.warmup) for w in workers))
+            recorder.recording = True
+            began = time.perf_counter()
+            await asyncio.gather(*(load.worker(w, time.monotonic() + args.duration) for w in workers))
+            elapsed = time.perf_counter() - began
+            recorder.recording = False
+    finally:
+        stop(server)
+        stop(stub)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    config = {name: value for name, value in vars(args).items() if name not in ("json", "output", "compare", "max_regression")}
+    return {"config": config, "dataset": dataset, "seconds": round(elapsed, 2), **recorder.report(elapsed)}
+
+
+def compare(results: dict, baseline: dict, min_requests: int = 20) -> dict:
+    """Per-route percentage change against a baseline report (positive p95/p99 = slower)."""
+    def change(new, old):
+        return round((new - old) / old * 100, 1) if old else None
+
+    routes = {}
+    for route, new in results["routes"].items():
+        old = baseline.get("routes", {}).get(route)
+        if old is None or min(new["requests"], old["requests"]) < min_requests:
+            continue
+        routes[route] = {
+            "requests_per_second_change_pct": change(new["requests_per_second"], old["requests_per_second"]),
+            "p50_change_pct": change(new["p50_ms"], old["p50_ms"]),
+            "p95_change_pct": change(new["p95_ms"], old["p95_ms"]),
+            "p99_change_pct": change(new["p99_ms"], old["p99_ms"]),
+        }
+    return routes
+
+
+def regressions(comparison: dict, threshold: float) -> List[str]:
+    return [
+        route for route, delta in comparison.items()
+        if (delta["p95_change_pct"] or 0) > threshold or (delta["requests_per_second_change_pct"] or 0) < -threshold
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="synthetic population size")
+    parser.add_argument("--years", type=float, default=1.0, help="years of mood and journal history per user")
+    parser.add_argument("--journals-per-week", type=float, default=3.0)
+    parser.add_argument("--active-users", type=int, default=50, help="users the clients log in as")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--profile", choices=["default", "production"], default="production")
+    parser.add_argument("--llm", action="store_true", help="also drive the feedback routes against benchmarks/llm_stub.py")
+    parser.add_argument("--llm-latency-ms", type=int, default=300, help="stub completion latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="a previous JSON report to diff against")
+    parser.add_argument("--max-regression", type=float, help="exit 1 if any route's p95 grows (or throughput drops) by more than this percent")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            results["comparison"] = compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        d = results["dataset"]
+        print(
+            f"{d['users']} users, {d['moods']} moods, {d['journal']} journal entries (loaded in {d['load_seconds']} s); "
+            f"{args.concurrency} clients for {results['seconds']} s, {args.db_mode} mode\n"
+        )
+        print(f"{'route':<36}{'reqs':>8}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for route, r in {**results["routes"], "TOTAL": results["totals"]}.items():
+            print(f"{route:<36}{r['requests']:>8}{r['errors']:>6}{r['requests_per_second']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+        if "comparison" in results:
+            print(f"\nchange vs {args.compare} (routes with 20+ requests in both runs)")
+            print(f"{'route':<36}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+            for route, c in results["comparison"].items():
+                cells = (c["requests_per_second_change_pct"], c["p50_change_pct"], c["p95_change_pct"], c["p99_change_pct"])
+                print(f"{route:<36}" + "".join(f"{'n/a' if v is None else f'{v:+.1f}%':>9}" for v in cells))
+
+    if args.max_regression is not None and "comparison" in results:
+        slower = regressions(results["comparison"], args.max_regression)
+        if slower:
+            print(f"regressed by more than {args.max_regression}%: {', '.join(slower)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
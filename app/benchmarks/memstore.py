@@ -0,0 +1,137 @@
+"""Per-operation latency of the in-memory storage engine (memstore.py) as tables
+grow, next to the list-scan approach main_in_memory.py used before it.
+
+    python benchmarks/memstore.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from memstore import MemoryStore  # noqa: E402
+
+MOODS_PER_USER = 100
+NOW = datetime(2025, 1, 1)
+
+
+def build(rows: int):
+    """A store with `rows` moods spread over rows / MOODS_PER_USER users, plus the same data as lists."""
+    store = MemoryStore()
+    users = store.create_table("users", ("email", "password_hash", "display_name", "created_at", "updated_at"), unique=("email",))
+    moods = store.create_table("moods", ("user_id", "mood", "mood_date", "created_at"), indexes=("user_id",))
+    user_list, mood_list = [], []
+    user_count = max(1, rows // MOODS_PER_USER)
+    for n in range(1, user_count + 1):
+        values = {"email": f"user{n}@example.com", "password_hash": "x", "display_name": None, "created_at": NOW, "updated_at": NOW}
+        users.insert(values)
+        user_list.append({"id": n, **values})
+    start = date(2020, 1, 1)
+    for n in range(rows):
+        values = {"user_id": n % user_count + 1, "mood": "happy", "mood_date": start + timedelta(days=n // user_count), "created_at": NOW}
+        moods.insert(values)
+        mood_list.append({"id": n + 1, **values})
+    return store, user_list, mood_list, user_count
+
+
+def timed(operation, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - began) * 1e6)
+    return round(statistics.median(timings), 2)
+
+
+def measure(rows: int, runs: int, scan_runs: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    store, user_list, mood_list, user_count = build(rows)
+    users, moods = store["users"], store["moods"]
+    pick_user = lambda: rng.randint(1, user_count)  # noqa: E731
+    pick_mood = lambda: rng.randint(1, rows)  # noqa: E731
+
+    indexed = {
+        "get_by_id": timed(lambda: moods.get(pick_mood()), runs),
+        "email_lookup": timed(lambda: users.get_by("email", f"user{pick_user()}@example.com"), runs),
+        "moods_for_user": timed(lambda: moods.find("user_id", pick_user()), runs),
+        "insert": timed(lambda: moods.insert({"user_id": pick_user(), "mood": "sad", "mood_date": date(2030, 1, 1), "created_at": NOW}), runs),
+        "update": timed(lambda: moods.update(pick_mood(), {"mood": "neutral"}), runs),
+    }
+    doomed = iter(rng.sample(range(1, user_count + 1), min(runs, user_count)))
+
+    def cascade():
+        user_id = next(doomed)
+        users.delete(user_id)
+        moods.delete_by("user_id", user_id)
+    indexed["delete_user_cascade"] = timed(cascade, min(runs, user_count))
+
+    def scan_get():
+        mood_id = pick_mood()
+        return next((m for m in mood_list if m["id"] == mood_id), None)
+
+    def scan_email():
+        email = f"user{pick_user()}@example.com"
+        return any(u["email"] == email for u in user_list)
+
+    def scan_user_moods():
+        user_id = pick_user()
+        return [m for m in mood_list if m["user_id"] == user_id]
+
+    scan = {
+        "get_by_id": timed(scan_get, scan_runs),
+        "email_lookup": timed(scan_email, scan_runs),
+        "moods_for_user": timed(scan_user_moods, scan_runs),
+    }
+    return {"indexed_us": indexed, "list_scan_us": scan}
+
+
+def row_memory(rows: int) -> dict:
+    values = {"user_id": 1, "mood": "happy", "mood_date": date(2025, 1, 1), "created_at": NOW}
+    store = MemoryStore()
+    table = store.create_table("moods", tuple(values))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    slotted = [table.row_type(id=n, **values) for n in range(rows)]
+    slots_bytes = tracemalloc.get_traced_memory()[0] - before
+    del slotted
+    before = tracemalloc.get_traced_memory()[0]
+    dicts = [{"id": n, **values} for n in range(rows)]
+    dict_bytes = tracemalloc.get_traced_memory()[0] - before
+    del dicts
+    tracemalloc.stop()
+    return {"slots_bytes_per_row": round(slots_bytes / rows, 1), "dict_bytes_per_row": round(dict_bytes / rows, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--scan-runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = {rows: measure(rows, args.runs, args.scan_runs, args.seed) for rows in args.sizes}
+    memory = row_memory(min(args.sizes[-1], 200000))
+
+    if args.json:
+        print(json.dumps({"latency": results, "memory": memory}, indent=2))
+        return
+    print("median latency in microseconds (moods rows; 100 moods per user)\n")
+    operations = list(next(iter(results.values()))["indexed_us"])
+    print(f"{'operation':<22}" + "".join(f"{rows:>14,}" for rows in args.sizes))
+    for op in operations:
+        print(f"{op:<22}" + "".join(f"{results[rows]['indexed_us'][op]:>14}" for rows in args.sizes))
+    print("\nlist scan (previous implementation)")
+    for op in next(iter(results.values()))["list_scan_us"]:
+        print(f"{op:<22}" + "".join(f"{results[rows]['list_scan_us'][op]:>14}" for rows in args.sizes))
+    print(f"\nrow size: {memory['slots_bytes_per_row']} bytes with __slots__, {memory['dict_bytes_per_row']} bytes as dict")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Write throughput of the in-memory store at each durability level (memlog.py),
+and startup time from a snapshot versus replaying the whole write-ahead log.
+
+    python benchmarks/memstore_durability.py --writers 1 8 --writes 2000 --rows 1000000
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from memstore import MemoryStore  # noqa: E402
+
+NOW = datetime(2025, 1, 1)
+MOOD = {"user_id": 1, "mood": "happy", "mood_date": date(2025, 1, 1), "created_at": NOW}
+
+
+def make_store() -> MemoryStore:
+    store = MemoryStore()
+    store.create_table("moods", tuple(MOOD), indexes=("user_id",))
+    return store
+
+
+def write_throughput(durability: str, writers: int, writes: int, fsync_interval: float) -> dict:
+    directory = tempfile.mkdtemp(prefix="memstore-bench-")
+    store = make_store()
+    if durability != "off":
+        store.open(directory, durability=durability, fsync_interval=fsync_interval, snapshot_every=0)
+    latencies = [[] for _ in range(writers)]
+
+    def writer(timings):
+        for _ in range(writes):
+            began = time.perf_counter()
+            with store.write():
+                store["moods"].insert(MOOD)
+            timings.append((time.perf_counter() - began) * 1e6)
+
+    threads = [threading.Thread(target=writer, args=(timings,)) for timings in latencies]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    store.close(snapshot=False)
+    shutil.rmtree(directory)
+    timings = sorted(t for per_writer in latencies for t in per_writer)
+    return {
+        "writes_per_s": round(len(timings) / elapsed),
+        "p50_us": round(statistics.median(timings), 1),
+        "p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+    }
+
+
+def startup(rows: int) -> dict:
+    directory = tempfile.mkdtemp(prefix="memstore-bench-")
+    store = make_store()
+    store.open(directory, durability="async", snapshot_every=0)
+    moods = store["moods"]
+    with store.write():
+        for n in range(rows):
+            moods.insert({**MOOD, "user_id": n % 1000})
+    store.close(snapshot=False)
+
+    began = time.perf_counter()
+    replayed = make_store()
+    replayed.open(directory, durability="async", snapshot_every=0)
+    replay_s = time.perf_counter() - began
+    replayed.close()  # writes a snapshot
+
+    began = time.perf_counter()
+    loaded = make_store()
+    loaded.open(directory, durability="async", snapshot_every=0)
+    snapshot_s = time.perf_counter() - began
+    assert len(loaded["moods"]) == rows
+    loaded.close(snapshot=False)
+    shutil.rmtree(directory)
+    return {"rows": rows, "log_replay_s": round(replay_s, 2), "snapshot_load_s": round(snapshot_s, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--writes", type=int, default=2000, help="writes per writer thread")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows for the startup measurement")
+    parser.add_argument("--fsync-interval-ms", type=float, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    throughput = {
+        writers: {
+            level: write_throughput(level, writers, args.writes, args.fsync_interval_ms / 1000)
+            for level in ("off", "async", "group", "sync")
+        }
+        for writers in args.writers
+    }
+    recovery = startup(args.rows)
+
+    if args.json:
+        print(json.dumps({"writes": throughput, "startup": recovery}, indent=2))
+        return
+    for writers, levels in throughput.items():
+        print(f"{writers} writer thread(s), {args.writes} writes each")
+        print(f"{'durability':<12}{'writes/s':>12}{'p50 us':>12}{'p99 us':>12}")
+        for level, stats in levels.items():
+            print(f"{level:<12}{stats['writes_per_s']:>12,}{stats['p50_us']:>12}{stats['p99_us']:>12}")
+        print()
+    print(f"startup with {recovery['rows']:,} rows: {recovery['log_replay_s']}s replaying the log, "
+          f"{recovery['snapshot_load_s']}s loading a snapshot")
+
+
+if __name__ == "__main__":
+    main()
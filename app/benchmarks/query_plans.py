@@ -0,0 +1,134 @@
+"""Compare query plans and latency of the hot per-user queries before and after
+the owner/date indexes (migrations 3 and 4).
+
+    python benchmarks/query_plans.py --users 1000 --days 365
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrations import run_migrations  # noqa: E402
+
+MOODS = ["very_sad", "sad", "neutral", "happy", "very_happy"]
+
+QUERIES = {
+    "list_moods_page": (
+        "SELECT id, mood, mood_date, created_at FROM moods WHERE user_id = :user_id "
+        "ORDER BY mood_date DESC, id DESC LIMIT 101"
+    ),
+    "list_journals_range": (
+        "SELECT id, prompt_id, entry_date, content, created_at FROM journal "
+        "WHERE user_id = :user_id AND entry_date BETWEEN :start AND :end "
+        "ORDER BY entry_date DESC, id DESC LIMIT 101"
+    ),
+    "duplicate_mood_check": (
+        "SELECT id FROM moods WHERE user_id = :user_id AND mood_date = :day LIMIT 1"
+    ),
+}
+
+
+def populate(engine, users: int, days: int, seed: int):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    now = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, email, password_hash, created_at) VALUES (:id, :email, 'x', :now)"),
+            [{"id": u, "email": f"user{u}@example.com", "now": now} for u in range(1, users + 1)]
+        )
+        # Interleave users day by day, the way rows arrive in production, so a
+        # user's rows are scattered across the table.
+        moods, journals = [], []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            for user_id in range(1, users + 1):
+                moods.append({"user_id": user_id, "mood": rng.choice(MOODS), "day": day, "now": now})
+                if rng.random() < 0.5:
+                    journals.append({"user_id": user_id, "day": day, "content": "x" * rng.randint(40, 400), "now": now})
+        conn.execute(
+            text("INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (:user_id, :mood, :day, :now)"),
+            moods
+        )
+        conn.execute(
+            text("INSERT INTO journal (user_id, entry_date, content, created_at) VALUES (:user_id, :day, :content, :now)"),
+            journals
+        )
+        conn.execute(text("ANALYZE"))
+    return start
+
+
+def measure(engine, users: int, days: int, start: date, runs: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            def params():
+                day = start + timedelta(days=rng.randrange(days))
+                return {
+                    "user_id": rng.randint(1, users),
+                    "day": day,
+                    "start": day - timedelta(days=30),
+                    "end": day,
+                }
+            plan = [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params())]
+            timings = []
+            for _ in range(runs):
+                bound = params()
+                began = time.perf_counter()
+                conn.execute(text(sql), bound).fetchall()
+                timings.append((time.perf_counter() - began) * 1000)
+            timings.sort()
+            results[name] = {
+                "plan": plan,
+                "mean_ms": round(statistics.mean(timings), 3),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        run_migrations(engine, target=2)
+        start = populate(engine, args.users, args.days, args.seed)
+        before = measure(engine, args.users, args.days, start, args.runs, args.seed)
+        run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        after = measure(engine, args.users, args.days, start, args.runs, args.seed)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    if args.json:
+        print(json.dumps({"before": before, "after": after}, indent=2))
+        return
+    print(f"{args.users} users x {args.days} days, {args.runs} runs per query\n")
+    for name in QUERIES:
+        b, a = before[name], after[name]
+        print(f"{name}")
+        print(f"  before: {b['mean_ms']:8.3f} ms mean, {b['p95_ms']:8.3f} ms p95  | {'; '.join(b['plan'])}")
+        print(f"  after:  {a['mean_ms']:8.3f} ms mean, {a['p95_ms']:8.3f} ms p95  | {'; '.join(a['plan'])}")
+
+
+if __name__ == "__main__":
+    main()
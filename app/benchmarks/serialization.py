@@ -0,0 +1,96 @@
+"""Time how a 10k-row /journal/ response is built: the original ORM-object
+pipeline against column-tuple rows serialized by orjson.
+
+    python benchmarks/serialization.py --rows 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+import main  # noqa: E402
+from main import JOURNAL_COLUMNS, JOURNAL_FIELDS, Journal, JournalDB, rows_response  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+JOURNALS = TypeAdapter(List[Journal])
+
+
+def populate(rows: int):
+    start = date(2000, 1, 1)
+    now = datetime(2025, 1, 1, 12, 30)
+    run_migrations(main.engine)
+    with main.engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'bench@example.com', 'x', :now)"), {"now": now})
+        conn.execute(
+            text("INSERT INTO journal (user_id, entry_date, content, created_at) VALUES (1, :day, :content, :now)"),
+            [{"day": start + timedelta(days=n), "content": f"Entry {n} " + "x" * 200, "now": now} for n in range(rows)]
+        )
+
+
+def orm_pipeline(db, rows: int) -> bytes:
+    # What list_journals used to do, followed by FastAPI's response_model pass.
+    journals = db.query(JournalDB).filter(JournalDB.user_id == 1).order_by(JournalDB.entry_date.desc(), JournalDB.id.desc()).limit(rows).all()
+    content = [Journal(**j.__dict__) for j in journals]
+    return JSONResponse(JOURNALS.dump_python(JOURNALS.validate_python(content), mode="json")).body
+
+
+def column_pipeline(db, rows: int) -> bytes:
+    journals = db.query(*JOURNAL_COLUMNS).filter(JournalDB.user_id == 1).order_by(JournalDB.entry_date.desc(), JournalDB.id.desc()).limit(rows).all()
+    return rows_response(journals, JOURNAL_FIELDS).body
+
+
+def timed(pipeline, rows: int, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        db = main.SessionLocal()
+        began = time.perf_counter()
+        body = pipeline(db, rows)
+        timings.append((time.perf_counter() - began) * 1000)
+        db.close()
+    return {"mean_ms": round(statistics.mean(timings), 2), "min_ms": round(min(timings), 2), "bytes": len(body)}
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    try:
+        populate(args.rows)
+        db = main.SessionLocal()
+        assert json.loads(orm_pipeline(db, args.rows)) == json.loads(column_pipeline(db, args.rows))
+        db.close()
+        results = {
+            "orm_objects": timed(orm_pipeline, args.rows, args.runs),
+            "column_rows_orjson": timed(column_pipeline, args.rows, args.runs),
+        }
+    finally:
+        main.engine.dispose()
+        os.remove(DB_PATH)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.rows} journal rows, {args.runs} runs\n")
+    for name, r in results.items():
+        print(f"{name:>18}: {r['mean_ms']:8.2f} ms mean  {r['min_ms']:8.2f} ms min  {r['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    run()
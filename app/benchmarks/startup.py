@@ -0,0 +1,128 @@
+"""Measure how long a worker takes to boot: the time to `import main`, the time
+from launching uvicorn until it accepts connections, and the latency of its
+first and second requests. Every run is a fresh process against a migrated
+temporary database, so nothing is warm.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --top 15   # also list main's slowest imports
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from db_modes import free_port, migrate, start_server
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; began = time.perf_counter(); import main; print(time.perf_counter() - began)"
+
+
+def import_seconds(db_path: str, importtime: bool = False):
+    """Seconds to import main in a fresh interpreter (and, with importtime, the -X importtime report)."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", IMPORT_SNIPPET]
+    result = subprocess.run(command, cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(report: str, top: int) -> list:
+    """main's direct imports, by cumulative microseconds."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Depth is shown by indentation; main itself sits at one space, its imports at three.
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def wait_for_port(port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(f"server on port {port} did not start within {timeout}s")
+
+
+def boot_once(db_path: str, mode: str, profile: str) -> dict:
+    port = free_port()
+    began = time.perf_counter()
+    server = start_server(mode, db_path, port, profile)
+    try:
+        wait_for_port(port)
+        ready = time.perf_counter() - began
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            latencies = []
+            for _ in range(2):
+                sent = time.perf_counter()
+                client.get("/prompts/").raise_for_status()
+                latencies.append(time.perf_counter() - sent)
+        return {"ready": ready, "first_request": latencies[0], "second_request": latencies[1]}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(values: list) -> dict:
+    return {"median_ms": round(statistics.median(values) * 1000, 1), "min_ms": round(min(values) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per measurement")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--profile", choices=["default", "production"], default="default")
+    parser.add_argument("--top", type=int, default=0, help="list this many of main's slowest imports")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        migrate(db_path)
+        imports = [import_seconds(db_path)[0] for _ in range(args.runs)]
+        boots = [boot_once(db_path, args.db_mode, args.profile) for _ in range(args.runs)]
+        report = import_seconds(db_path, importtime=True)[1] if args.top else ""
+    finally:
+        os.remove(db_path)
+
+    results = {"import": summarize(imports)}
+    for key in ("ready", "first_request", "second_request"):
+        results[key] = summarize([boot[key] for boot in boots])
+    if args.top:
+        results["slowest_imports"] = [{"module": name, "ms": round(us / 1000, 1)} for us, name in slowest_imports(report, args.top)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    labels = {
+        "import": "import main",
+        "ready": "launch to accepting connections",
+        "first_request": "first GET /prompts/",
+        "second_request": "second GET /prompts/",
+    }
+    print(f"{args.runs} runs, DB_MODE={args.db_mode}, DB_PROFILE={args.profile}\n")
+    print(f"{'':<34}{'median':>10}{'min':>10}")
+    for key, label in labels.items():
+        print(f"{label:<34}{results[key]['median_ms']:>8.1f}ms{results[key]['min_ms']:>8.1f}ms")
+    if args.top:
+        print("\nslowest imports of main (cumulative)")
+        for row in results["slowest_imports"]:
+            print(f"  {row['module']:<40}{row['ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
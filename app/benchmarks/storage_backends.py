@@ -0,0 +1,146 @@
+"""Run the same repository workload against each storage backend: SQLite
+(SqlRepository, one session per operation as in a request) and the in-memory
+engine (MemoryRepository). Reports per-operation median and p99 latency.
+
+    python benchmarks/storage_backends.py --users 200 --moods 365 --journals 100
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FEEDBACK_PRECOMPUTE", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+from repositories import MemoryRepository, PageRequest, user_scope  # noqa: E402
+
+START = date(2020, 1, 1)
+MOODS = ("very_sad", "sad", "neutral", "happy", "very_happy")
+
+
+class SqlBackend:
+    """Opens a SqlRepository on a fresh session per operation, like get_repository."""
+
+    def __init__(self):
+        self.sessions = main.SessionLocal
+
+    def __call__(self, operation):
+        db = self.sessions()
+        try:
+            return operation(main.SqlRepository(db))
+        finally:
+            db.close()
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.repository = MemoryRepository()
+
+    def __call__(self, operation):
+        return operation(self.repository)
+
+
+def timed(backend, operation, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        backend(operation)
+        timings.append((time.perf_counter() - began) * 1e6)
+    return timings
+
+
+def summarize(timings: list) -> dict:
+    timings = sorted(timings)
+    return {"p50_us": round(statistics.median(timings), 1), "p99_us": round(timings[max(0, int(len(timings) * 0.99) - 1)], 1)}
+
+
+def run_workload(backend, users: int, moods: int, journals: int, runs: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    results = {}
+    counter = iter(range(10 ** 9))
+    user_ids = []
+
+    def create_user(repo):
+        user_ids.append(repo.create_user(f"user{next(counter)}@example.com", "x" * 60, None).id)
+    results["create_user"] = summarize(timed(backend, create_user, users))
+    backend(lambda repo: repo.add_missing_prompts(main.MOOD_PROMPT_MAP.values()))
+
+    days = iter([(user_id, START + timedelta(days=n)) for n in range(moods) for user_id in user_ids])
+
+    def create_mood(repo):
+        user_id, day = next(days)
+        repo.create_mood(user_id, rng.choice(MOODS), day)
+    results["create_mood"] = summarize(timed(backend, create_mood, users * moods))
+
+    entries = iter([(user_id, START + timedelta(days=n)) for n in range(journals) for user_id in user_ids])
+    journal_ids = []
+
+    def create_journal(repo):
+        user_id, day = next(entries)
+        journal_ids.append((user_id, repo.create_journal(user_id, None, day, "Today I " + "wrote a little. " * 20).id))
+    results["create_journal"] = summarize(timed(backend, create_journal, users * journals))
+
+    pick_user = lambda: rng.choice(user_ids)  # noqa: E731
+    pick_journal = lambda: rng.choice(journal_ids)  # noqa: E731
+    mid_page = (START + timedelta(days=moods // 2), 0)
+    reads = {
+        "get_user": lambda repo: repo.get_user(pick_user()),
+        "data_version": lambda repo: repo.data_version(user_scope(pick_user())),
+        "list_moods_first_page": lambda repo: repo.list_moods(pick_user(), PageRequest(limit=100)),
+        "list_moods_mid_page": lambda repo: repo.list_moods(pick_user(), PageRequest(limit=100, after=mid_page)),
+        "list_journals_first_page": lambda repo: repo.list_journals(pick_user(), PageRequest(limit=20)),
+        "get_journal": lambda repo: repo.get_journal(*pick_journal()),
+    }
+    for name, operation in reads.items():
+        results[name] = summarize(timed(backend, operation, runs))
+
+    def update_journal(repo):
+        user_id, journal_id = pick_journal()
+        repo.update_journal(user_id, journal_id, None, START, "Rewritten entry")
+    results["update_journal"] = summarize(timed(backend, update_journal, runs))
+    return results
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--moods", type=int, default=365, help="moods per user")
+    parser.add_argument("--journals", type=int, default=100, help="journal entries per user")
+    parser.add_argument("--runs", type=int, default=2000, help="runs per read/update operation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    try:
+        run_migrations(main.engine)
+        results = {
+            name: run_workload(backend(), args.users, args.moods, args.journals, args.runs, args.seed)
+            for name, backend in (("sql", SqlBackend), ("memory", MemoryBackend))
+        }
+    finally:
+        main.engine.dispose()
+        os.remove(DB_PATH)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.users} users, {args.moods} moods and {args.journals} journal entries each; latency in microseconds\n")
+    print(f"{'operation':<26}{'sql p50':>10}{'sql p99':>10}{'memory p50':>12}{'memory p99':>12}")
+    for op in results["sql"]:
+        sql, memory = results["sql"][op], results["memory"][op]
+        print(f"{op:<26}{sql['p50_us']:>10}{sql['p99_us']:>10}{memory['p50_us']:>12}{memory['p99_us']:>12}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -1,19 +1,48 @@
+import asyncio
+import base64
+import binascii
+import codecs
+import csv
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
 from datetime import datetime, date, timedelta
-from typing import Optional, List
+from operator import attrgetter
+from typing import AsyncIterator, Dict, Iterable, Optional, List, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Query, Request, Response, status
+from fastapi.routing import APIRoute
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, ValidationError
 from jose import JWTError, jwt
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text, Date
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, ForeignKey, Text, Date, Index, and_, or_, case, cast, delete, func, insert, literal, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from passlib.context import CryptContext
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from enum import Enum
-from openai import OpenAI  # or your preferred LLM library
 import os
 from dotenv import load_dotenv
+import orjson
+from cache import LRUCache
+import metrics
+import profiling
+from passwords import pwd_context, hash_password, verify_and_update_password
+from migrations import pending_migrations
+from repositories import PROMPTS_SCOPE, DuplicateError, MemoryRepository, PageRequest, Repository, user_scope
 load_dotenv()
 
 
@@ -31,10 +60,235 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_api_key)
+# =====================
+#   METRICS
+# =====================
+# GET /metrics reports, in the Prometheus text format (see metrics.py): request
+# counts and latency per route template and status, SQL statements and SQL time
+# per request, per-statement latency per engine, and OpenAI call latency, queue
+# wait and token usage. METRICS_ENABLED=0 drops the middleware and the endpoint.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+metrics_registry = metrics.Registry()
+http_requests = metrics_registry.counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"))
+http_latency = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency, including streamed bodies.", ("method", "route"))
+http_in_progress = metrics_registry.gauge("http_requests_in_progress", "HTTP requests being served.")
+request_queries = metrics_registry.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100))
+request_query_seconds = metrics_registry.counter(
+    "http_request_db_seconds_total", "Time spent in SQL statements, by the route that ran them.", ("method", "route"))
+db_query_latency = metrics_registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency by engine.", ("engine",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0))
+llm_latency = metrics_registry.histogram(
+    "llm_request_duration_seconds", "OpenAI chat completion latency; streams are timed to their last chunk.",
+    ("model", "mode", "outcome"), buckets=LLM_BUCKETS)
+llm_wait = metrics_registry.histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for one of LLM_MAX_CONCURRENCY slots.", ("model",))
+llm_first_token = metrics_registry.histogram(
+    "llm_time_to_first_token_seconds", "Time from requesting a streamed completion to its first text.", ("model",),
+    buckets=LLM_BUCKETS)
+llm_tokens = metrics_registry.counter("llm_tokens_total", "Tokens billed by the OpenAI API.", ("model", "kind"))
+
+_route_templates: Dict = {}
+
+def route_template(scope: dict) -> str:
+    """The matched route's path, so /journal/1 and /journal/2 share one series."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    template = _route_templates.get(endpoint)
+    if template is None:
+        _route_templates.update({route.endpoint: route.path for route in app.routes if hasattr(route, "endpoint")})
+        template = _route_templates.setdefault(endpoint, "unmatched")
+    return template
+
+def record_request(scope: dict, status: int, seconds: float, queries: metrics.QueryStats):
+    method, route = scope["method"], route_template(scope)
+    http_requests.inc(method, route, str(status))
+    http_latency.observe(seconds, method, route)
+    request_queries.observe(queries.queries, method, route)
+    request_query_seconds.inc(method, route, amount=queries.seconds)
+
+def query_observer(engine_name: str):
+    return lambda seconds: db_query_latency.observe(seconds, engine_name)
+
+def record_llm_call(model: str, mode: str, outcome: str, began: float, usage=None):
+    llm_latency.observe(time.perf_counter() - began, model, mode, outcome)
+    if usage is not None:
+        llm_tokens.inc(model, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        llm_tokens.inc(model, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, on_request=record_request, in_progress=http_in_progress)
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return Response(metrics_registry.render(), media_type=metrics.CONTENT_TYPE)
+
+# =====================
+#   PROFILING
+# =====================
+# Per-request profiles on demand (see profiling.py). With PROFILE_DIR set, a
+# request is profiled when it sends `X-Profile: <PROFILE_TOKEN>` or is drawn at
+# PROFILE_SAMPLE_RATE; its stack samples (speedscope or pstats, PROFILE_FORMAT)
+# and SQL timings are written to PROFILE_DIR. Without PROFILE_DIR the middleware
+# is not installed at all.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+if PROFILE_DIR:
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        directory=PROFILE_DIR,
+        token=PROFILE_TOKEN,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        default_format=PROFILE_FORMAT,
+        interval=PROFILE_INTERVAL_MS / 1000,
+    )
+
+# =====================
+#   LLM Setup
+# =====================
+# Clients are module-level so every request shares one pooled, keep-alive HTTP
+# connection pool. "async" mode awaits AsyncOpenAI on the event loop; "thread" mode
+# runs the blocking client on a dedicated pool for providers without async support.
+# The SDK is imported and the clients built on first use rather than at import:
+# that is most of a worker's boot time, and a missing OPENAI_API_KEY then fails
+# only the feedback routes instead of the whole app.
+LLM_CLIENT_MODE = os.getenv("LLM_CLIENT_MODE", "async")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+client = None
+async_client = None
+llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """The shared blocking OpenAI client, built on first use."""
+    global client
+    if client is None:
+        with llm_client_lock:
+            if client is None:
+                from openai import OpenAI  # or your preferred LLM library
+                client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT_SECONDS)
+    return client
+
+def get_async_llm_client():
+    """The shared AsyncOpenAI client, built on first use; None if the SDK has no async client."""
+    global async_client
+    if async_client is None:
+        with llm_client_lock:
+            if async_client is None:
+                try:
+                    from openai import AsyncOpenAI
+                except ImportError:  # SDKs without an async client fall back to the thread pool
+                    return None
+                async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT_SECONDS)
+    return async_client
+
+async def async_llm_client():
+    """The AsyncOpenAI client in "async" mode, else None. The first call builds
+    it on the thread pool so the import does not stall the event loop."""
+    if LLM_CLIENT_MODE != "async":
+        return None
+    return async_client or await run_in_threadpool(get_async_llm_client)
+
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+async def complete_chat(prompt: str, model: str) -> str:
+    """Run one chat completion without blocking the event loop.
+
+    At most LLM_MAX_CONCURRENCY calls are in flight at once; each is cut off after
+    LLM_TIMEOUT_SECONDS with a 504 so a slow completion cannot pin a worker.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    queued = time.perf_counter()
+    async with llm_semaphore:
+        began = time.perf_counter()
+        llm_wait.observe(began - queued, model)
+        try:
+            llm = await async_llm_client()
+            if llm is not None:
+                call = llm.chat.completions.create(model=model, messages=messages)
+            else:
+                call = asyncio.get_running_loop().run_in_executor(
+                    llm_executor,
+                    lambda: get_llm_client().chat.completions.create(model=model, messages=messages)
+                )
+            response = await asyncio.wait_for(call, timeout=LLM_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            record_llm_call(model, "complete", "timeout", began)
+            raise HTTPException(status_code=504, detail="Feedback generation timed out")
+        except Exception:
+            record_llm_call(model, "complete", "error", began)
+            raise
+    record_llm_call(model, "complete", "ok", began, getattr(response, "usage", None))
+    return response.choices[0].message.content.strip()
+
+async def stream_chat(prompt: str, model: str):
+    """Yield completion text deltas as the model produces them.
+
+    Shares the concurrency limit of complete_chat; LLM_TIMEOUT_SECONDS bounds the
+    wait for the stream to open and for each subsequent chunk.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    # The final chunk then carries token usage (with empty choices).
+    stream_options = {"include_usage": True}
+    queued = time.perf_counter()
+    async with llm_semaphore:
+        began = time.perf_counter()
+        llm_wait.observe(began - queued, model)
+        outcome, usage, first = "error", None, True
+        try:
+            llm = await async_llm_client()
+            if llm is not None:
+                stream = await asyncio.wait_for(
+                    llm.chat.completions.create(model=model, messages=messages, stream=True, stream_options=stream_options),
+                    timeout=LLM_TIMEOUT_SECONDS
+                )
+                chunks = aiter(stream)
+                next_chunk = lambda: anext(chunks, None)
+            else:
+                loop = asyncio.get_running_loop()
+                stream = await asyncio.wait_for(loop.run_in_executor(
+                    llm_executor,
+                    lambda: get_llm_client().chat.completions.create(model=model, messages=messages, stream=True, stream_options=stream_options)
+                ), timeout=LLM_TIMEOUT_SECONDS)
+                chunks = iter(stream)
+                next_chunk = lambda: loop.run_in_executor(llm_executor, next, chunks, None)
+            while True:
+                chunk = await asyncio.wait_for(next_chunk(), timeout=LLM_TIMEOUT_SECONDS)
+                if chunk is None:
+                    break
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first:
+                        llm_first_token.observe(time.perf_counter() - began, model)
+                        first = False
+                    yield delta
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise HTTPException(status_code=504, detail="Feedback generation timed out")
+        except GeneratorExit:
+            # The caller stopped reading, e.g. the client disconnected.
+            outcome = "aborted"
+            raise
+        finally:
+            record_llm_call(model, "stream", outcome, began, usage)
 
 # =====================
 #   JWT Setup
@@ -44,16 +298,133 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # =====================
 #   Database Setup
 # =====================
-DATABASE_URL = "sqlite:///./mental_health.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mental_health.db")
+
+# DB_PROFILE=default keeps SQLite's stock settings and one shared pool.
+# DB_PROFILE=production switches to WAL with tuned pragmas and splits the pools:
+# GET handlers read through a multi-connection query_only pool while every
+# mutation goes through a single writer connection, so reads proceed in parallel
+# with a write and writes queue in the pool instead of failing with "database is
+# locked".
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+DB_WRITE_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_WRITE_POOL_TIMEOUT_SECONDS", "30"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def apply_sqlite_pragmas(engine, query_only: bool = False):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def create_engines(url: str, profile: str):
+    """Return (write_engine, read_engine) for the given DB_PROFILE."""
+    connect_args = {"check_same_thread": False}
+    if profile != "production":
+        engine = create_engine(url, connect_args=connect_args)
+        return engine, engine
+    connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+    write_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_WRITE_POOL_TIMEOUT_SECONDS,
+    )
+    read_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_READ_POOL_SIZE,
+    )
+    apply_sqlite_pragmas(write_engine)
+    apply_sqlite_pragmas(read_engine, query_only=True)
+    return write_engine, read_engine
+
+engine, read_engine = create_engines(DATABASE_URL, DB_PROFILE)
+metrics.track_queries(engine, query_observer("write"))
+if read_engine is not engine:
+    metrics.track_queries(read_engine, query_observer("read"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+# The schema is created and upgraded by `python manage.py migrate` (see
+# migrations.py), once per deploy, not on import by every worker. Startup only
+# refuses to serve a database that still has migrations pending.
+@app.on_event("startup")
+def check_schema():
+    # Memory mode only touches SQLite for a persistent feedback cache.
+    if memory_repository is not None and not FEEDBACK_CACHE_PERSIST:
+        return
+    pending = [m.version for m in pending_migrations(engine)]
+    if pending:
+        raise RuntimeError(f"Database has unapplied migrations {pending}; run `python manage.py migrate`")
+
+# DB_MODE=async serves the user, mood, prompt and journal endpoints through an
+# aiosqlite-backed AsyncSession (see ASYNC DATABASE MODE); it needs the optional
+# aiosqlite package. Everything else keeps using the sync engines above.
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+# STORAGE_BACKEND=memory serves users, moods, prompts and journals from the
+# in-memory engine instead of SQLite (see STORAGE BACKENDS). Features built on
+# SQLite itself (trends, search, import/export, feedback jobs) then answer 501,
+# and the feedback cache is in-process only unless FEEDBACK_CACHE_PERSIST=1.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sql")
+if STORAGE_BACKEND not in ("sql", "memory"):
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; use sql or memory")
+if STORAGE_BACKEND == "memory" and DB_MODE == "async":
+    raise RuntimeError("DB_MODE=async needs STORAGE_BACKEND=sql")
+
+def create_async_engines(url: str, profile: str):
+    """Async counterpart of create_engines: (write_engine, read_engine) over aiosqlite."""
+    async_url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if profile != "production":
+        engine = create_async_engine(async_url)
+        return engine, engine
+    connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    write_engine = create_async_engine(
+        async_url,
+        connect_args=connect_args,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_WRITE_POOL_TIMEOUT_SECONDS,
+    )
+    read_engine = create_async_engine(
+        async_url,
+        connect_args=connect_args,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_READ_POOL_SIZE,
+        max_overflow=DB_READ_POOL_SIZE,
+    )
+    apply_sqlite_pragmas(write_engine.sync_engine)
+    apply_sqlite_pragmas(read_engine.sync_engine, query_only=True)
+    return write_engine, read_engine
+
+async_engine, async_read_engine = create_async_engines(DATABASE_URL, DB_PROFILE) if DB_MODE == "async" else (None, None)
+if async_engine is not None:
+    metrics.track_queries(async_engine.sync_engine, query_observer("async_write"))
+    if async_read_engine is not async_engine:
+        metrics.track_queries(async_read_engine.sync_engine, query_observer("async_read"))
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, expire_on_commit=False, autoflush=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -61,11 +432,105 @@ def get_db():
     finally:
         db.close()
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+# The memory backend can persist through memstore's write-ahead log: set
+# MEMORY_DATA_DIR, and MEMORY_DURABILITY to async, group or sync.
+MEMORY_DATA_DIR = os.getenv("MEMORY_DATA_DIR")
+MEMORY_DURABILITY = os.getenv("MEMORY_DURABILITY", "group")
+MEMORY_FSYNC_INTERVAL_MS = float(os.getenv("MEMORY_FSYNC_INTERVAL_MS", "5"))
+MEMORY_SNAPSHOT_EVERY = int(os.getenv("MEMORY_SNAPSHOT_EVERY", "100000"))
+
+memory_repository = MemoryRepository() if STORAGE_BACKEND == "memory" else None
+
+def get_sql_repository(db: Session = Depends(get_db)) -> Repository:
+    return SqlRepository(db)
+
+def get_sql_read_repository(db: Session = Depends(get_read_db)) -> Repository:
+    return SqlRepository(db)
+
+def get_memory_repository() -> Repository:
+    return memory_repository
+
+get_repository = get_sql_repository if memory_repository is None else get_memory_repository
+get_read_repository = get_sql_read_repository if memory_repository is None else get_memory_repository
+
+def require_sql_storage():
+    if memory_repository is not None:
+        raise HTTPException(status_code=501, detail="Not available with STORAGE_BACKEND=memory")
+
+@app.on_event("startup")
+def open_memory_store():
+    if memory_repository is not None and MEMORY_DATA_DIR and MEMORY_DURABILITY != "off":
+        memory_repository.store.open(
+            MEMORY_DATA_DIR,
+            durability=MEMORY_DURABILITY,
+            fsync_interval=MEMORY_FSYNC_INTERVAL_MS / 1000,
+            snapshot_every=MEMORY_SNAPSHOT_EVERY,
+        )
+
+@app.on_event("shutdown")
+def close_memory_store():
+    if memory_repository is not None:
+        memory_repository.store.close()
+
+def session_like(db: Session) -> Session:
+    """A fresh session on the same engine as `db`, for work that outlives the request."""
+    return Session(bind=db.get_bind(), autoflush=False)
+
+# bcrypt is CPU-bound, so hashing runs in a dedicated process pool rather than the
+# shared threadpool. Callers past PASSWORD_HASH_QUEUE_LIMIT in-flight jobs get a
+# 503 instead of queueing behind a login burst. PASSWORD_HASH_WORKERS=0 hashes on
+# the threadpool instead.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+password_executor = None
+password_jobs_in_flight = 0
+
+def get_password_executor() -> ProcessPoolExecutor:
+    global password_executor
+    if password_executor is None:
+        # Spawned workers import only passwords.py, not the app.
+        password_executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return password_executor
+
+async def run_password_job(func, *args):
+    global password_jobs_in_flight
+    if password_jobs_in_flight >= PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    password_jobs_in_flight += 1
+    try:
+        if PASSWORD_HASH_WORKERS <= 0:
+            return await run_in_threadpool(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(get_password_executor(), func, *args)
+    finally:
+        password_jobs_in_flight -= 1
+
+@app.on_event("shutdown")
+def stop_password_workers():
+    if password_executor is not None:
+        password_executor.shutdown(wait=False, cancel_futures=True)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -73,19 +538,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Authenticated principals are cached per user id, and decoded tokens per token
+# string, so a warm request skips both the JWT verification and the users lookup.
+# update_user and delete_user invalidate explicitly; the TTL bounds staleness
+# across worker processes.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    display_name: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+token_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+def decode_token(token: str) -> int:
+    """Return the user id of a valid token, memoizing the signature check."""
+    claims = token_cache.get(token)
+    if claims is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        claims = (int(payload["sub"]), payload.get("exp"))
+        token_cache.set(token, claims)
+    user_id, expires_at = claims
+    if expires_at is not None and expires_at <= time.time():
+        token_cache.pop(token)
+        raise JWTError("Signature has expired.")
+    return user_id
+
+def invalidate_principal(user_id: int):
+    principal_cache.pop(user_id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), repo: Repository = Depends(get_read_repository)):
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        user = db.query(UserDB).filter(UserDB.id == int(user_id)).first()
+        user_id = decode_token(token)
+    except (JWTError, KeyError, ValueError):
+        raise credentials_exception
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = repo.get_user(user_id)
         if user is None:
             raise credentials_exception
-        return user
-    except JWTError:
-        raise credentials_exception
+        principal = Principal(
+            id=user.id,
+            email=user.email,
+            display_name=user.display_name,
+            created_at=user.created_at,
+            updated_at=user.updated_at
+        )
+        principal_cache.set(user_id, principal)
+    return principal
     
 MOOD_PROMPT_MAP = {
     "very_sad": "What has been weighing heavily on your heart?",
@@ -97,12 +603,14 @@ MOOD_PROMPT_MAP = {
 
 @app.on_event("startup")
 def seed_prompts():
+    if memory_repository is not None:
+        memory_repository.add_missing_prompts(MOOD_PROMPT_MAP.values())
+        return
     db = SessionLocal()
-    for mood, text in MOOD_PROMPT_MAP.items():
-        if not db.query(PromptDB).filter(PromptDB.prompt_text == text).first():
-            db.add(PromptDB(prompt_text=text, created_at=datetime.utcnow()))
-    db.commit()
-    db.close()
+    try:
+        SqlRepository(db).add_missing_prompts(MOOD_PROMPT_MAP.values())
+    finally:
+        db.close()
 
 
 # =====================
@@ -121,6 +629,9 @@ class UserDB(Base):
 
 class MoodDB(Base):
     __tablename__ = "moods"
+    __table_args__ = (
+        Index("uq_moods_user_date", "user_id", "mood_date", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     mood = Column(String, nullable=False)
@@ -137,6 +648,10 @@ class PromptDB(Base):
 
 class JournalDB(Base):
     __tablename__ = "journal"
+    __table_args__ = (
+        Index("ix_journal_user_entry_date", "user_id", "entry_date", "id"),
+        Index("ix_journal_content", "content"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=True)
@@ -144,7 +659,54 @@ class JournalDB(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, nullable=False)
 
-Base.metadata.create_all(bind=engine)
+
+class MoodBucketDB(Base):
+    __tablename__ = "mood_buckets"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String, primary_key=True)
+    bucket_start = Column(Date, primary_key=True)
+    entries = Column(Integer, nullable=False)
+    score_total = Column(Integer, nullable=False)
+    angry = Column(Integer, nullable=False)
+    very_sad = Column(Integer, nullable=False)
+    sad = Column(Integer, nullable=False)
+    neutral = Column(Integer, nullable=False)
+    happy = Column(Integer, nullable=False)
+    very_happy = Column(Integer, nullable=False)
+
+
+class MoodStreakDB(Base):
+    __tablename__ = "mood_streaks"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    run_start = Column(Date, nullable=False)
+    run_end = Column(Date, nullable=False)
+    longest = Column(Integer, nullable=False)
+
+
+class DataVersionDB(Base):
+    __tablename__ = "data_versions"
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+class FeedbackCacheDB(Base):
+    __tablename__ = "feedback_cache"
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    feedback = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class FeedbackJobDB(Base):
+    __tablename__ = "feedback_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    journal_id = Column(Integer, ForeignKey("journal.id"), nullable=False, unique=True)
+    status = Column(String, nullable=False, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
 
 # =====================
 #   Pydantic MODELS
@@ -158,6 +720,8 @@ class UserCreate(UserBase):
     password: str = Field(..., min_length=6)
 
 class User(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
     updated_at: Optional[datetime]
@@ -171,6 +735,8 @@ class MoodBase(BaseModel):
     mood_date: date
 
 class Mood(MoodBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
 
@@ -193,6 +759,8 @@ class PromptCreate(PromptBase):
     pass
 
 class Prompt(PromptBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
 
@@ -205,78 +773,485 @@ class JournalCreate(JournalBase):
     pass
 
 class Journal(JournalBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     created_at: datetime
 
+class FeedbackBatchRequest(BaseModel):
+    journal_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+class JournalSearchHit(BaseModel):
+    id: int
+    prompt_id: Optional[int] = None
+    entry_date: date
+    created_at: datetime
+    snippet: str
+    rank: float
+
+# =====================
+#   PAGINATION
+# =====================
+# List endpoints page with a keyset on (date, id) so each page is an index range
+# scan no matter how deep the client has scrolled. The cursor for the next page is
+# returned in the X-Next-Cursor header and is absent on the last page.
+
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+        cursor: Optional[str] = None,
+        from_date: Optional[date] = Query(None, alias="from"),
+        to_date: Optional[date] = Query(None, alias="to"),
+        order: SortOrder = SortOrder.desc,
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.from_date = from_date
+        self.to_date = to_date
+        self.order = order
+
+    def request(self) -> PageRequest:
+        return PageRequest(
+            limit=self.limit,
+            after=decode_cursor(self.cursor) if self.cursor else None,
+            from_date=self.from_date,
+            to_date=self.to_date,
+            descending=self.order == SortOrder.desc,
+        )
+
+def encode_cursor(day: date, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{day.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, row_id = raw.split("|")
+        return date.fromisoformat(day), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_keyset(query, date_column, id_column, page: PageRequest):
+    """Add the page's filters, ordering and limit to a Query or select()."""
+    if page.from_date:
+        query = query.filter(date_column >= page.from_date)
+    if page.to_date:
+        query = query.filter(date_column <= page.to_date)
+    descending = page.descending
+    if page.after:
+        day, row_id = page.after
+        if descending:
+            query = query.filter(or_(date_column < day, and_(date_column == day, id_column < row_id)))
+        else:
+            query = query.filter(or_(date_column > day, and_(date_column == day, id_column > row_id)))
+    ordering = (date_column.desc(), id_column.desc()) if descending else (date_column, id_column)
+    # One extra row tells us whether another page follows.
+    return query.order_by(*ordering).limit(page.limit + 1)
+
+def finish_page(rows: list, date_field: str, page: PageParams) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row; return the page and the cursor for the next one."""
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, date_field), last.id)
+
+# =====================
+#   SERIALIZATION
+# =====================
+# List endpoints select exactly the response model's columns and hand the rows
+# straight to orjson: no ORM identity map, no per-row model, no second validation
+# by response_model (which still documents the schema). Single-object endpoints
+# return ORM objects and let response_model validate them once via from_attributes.
+# Rows are read by field name, so memory-backend rows (which also carry private
+# fields such as password_hash) serialize to exactly the same shape.
+
+def model_columns(model, orm_class) -> tuple:
+    return tuple(getattr(orm_class, name) for name in model.model_fields)
+
+USER_COLUMNS = model_columns(User, UserDB)
+MOOD_COLUMNS = model_columns(Mood, MoodDB)
+PROMPT_COLUMNS = model_columns(Prompt, PromptDB)
+JOURNAL_COLUMNS = model_columns(Journal, JournalDB)
+
+USER_FIELDS = tuple(User.model_fields)
+MOOD_FIELDS = tuple(Mood.model_fields)
+PROMPT_FIELDS = tuple(Prompt.model_fields)
+JOURNAL_FIELDS = tuple(Journal.model_fields)
+SEARCH_HIT_FIELDS = tuple(JournalSearchHit.model_fields)
+
+def rows_response(rows, fields: Tuple[str, ...], next_cursor: Optional[str] = None, etag: Optional[str] = None) -> ORJSONResponse:
+    headers = etag_headers(etag) if etag else {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    values = attrgetter(*fields)
+    return ORJSONResponse([dict(zip(fields, values(row))) for row in rows], headers=headers)
+
+# =====================
+#   CONDITIONAL GET
+# =====================
+# Every write to a user's profile, moods or journal bumps that user's row in
+# data_versions inside the same transaction; seeding prompts bumps the shared
+# "prompts" row. GET handlers derive a strong ETag from the version and the
+# request URL, so a client presenting a current If-None-Match gets a 304 after
+# one primary-key lookup and the main tables are never read. The version is read
+# before the data, so a racing write can only make an ETag stale, never wrong.
+# The memory backend keeps the same versions in its data_versions table.
+
+def read_data_version(db: Session, scope: str) -> int:
+    return db.scalar(select(DataVersionDB.version).where(DataVersionDB.scope == scope)) or 0
+
+def bump_data_version(db: Session, scope: str):
+    db.execute(sqlite_insert(DataVersionDB).values(scope=scope, version=1).on_conflict_do_update(
+        index_elements=[DataVersionDB.scope],
+        set_={"version": DataVersionDB.version + 1}
+    ))
+
+def conditional_etag(repo: Repository, request: Request, scope: str) -> str:
+    """Return the ETag for this request, or raise a 304 if the client already has it."""
+    version = repo.data_version(scope)
+    digest = hashlib.sha256(f"{scope}|{version}|{request.url.path}?{request.url.query}".encode()).hexdigest()[:32]
+    etag = f'"{digest}"'
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match uses weak comparison, so W/"x" matches "x".
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    return etag
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # Browsers may keep the response but must revalidate it before reuse.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+# =====================
+#   STORAGE BACKENDS
+# =====================
+# SqlRepository implements repositories.Repository over a request's Session. Its
+# writes keep the SQLite-only side effects in the same transaction: mood trend
+# aggregates, feedback jobs, and the cascade into those tables on delete.
+
+class SqlRepository(Repository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def data_version(self, scope: str) -> int:
+        return read_data_version(self.db, scope)
+
+    # Users
+
+    def get_user(self, user_id: int):
+        return self.db.get(UserDB, user_id)
+
+    def get_user_by_email(self, email: str):
+        return self.db.query(UserDB).filter(UserDB.email == email).first()
+
+    def list_users(self) -> list:
+        return self.db.query(*USER_COLUMNS).all()
+
+    def create_user(self, email: str, password_hash: str, display_name: Optional[str]):
+        now = datetime.utcnow()
+        db_user = UserDB(
+            email=email,
+            password_hash=password_hash,
+            display_name=display_name,
+            created_at=now,
+            updated_at=now,
+        )
+        self.db.add(db_user)
+        self._commit(email)
+        self.db.refresh(db_user)
+        return db_user
+
+    def update_user(self, user_id: int, email: str, display_name: Optional[str]):
+        db_user = self.db.get(UserDB, user_id)
+        if db_user is None:
+            return None
+        db_user.email = email
+        db_user.display_name = display_name
+        db_user.updated_at = datetime.utcnow()
+        bump_data_version(self.db, user_scope(user_id))
+        self._commit(email)
+        self.db.refresh(db_user)
+        return db_user
+
+    def set_password_hash(self, user_id: int, password_hash: str):
+        self.db.query(UserDB).filter(UserDB.id == user_id).update({UserDB.password_hash: password_hash})
+        self.db.commit()
+
+    def delete_user(self, user_id: int) -> bool:
+        db_user = self.db.get(UserDB, user_id)
+        if db_user is None:
+            return False
+        db = self.db
+        db.query(MoodDB).filter(MoodDB.user_id == user_id).delete()
+        db.query(MoodBucketDB).filter(MoodBucketDB.user_id == user_id).delete()
+        db.query(MoodStreakDB).filter(MoodStreakDB.user_id == user_id).delete()
+        user_journals = db.query(JournalDB.id).filter(JournalDB.user_id == user_id)
+        contents = db.scalars(select(JournalDB.content).where(JournalDB.user_id == user_id)).all()
+        db.query(FeedbackJobDB).filter(FeedbackJobDB.journal_id.in_(user_journals.scalar_subquery())).delete(synchronize_session=False)
+        db.query(JournalDB).filter(JournalDB.user_id == user_id).delete()
+        forget_feedback(db, contents)
+        db.delete(db_user)
+        # Bumped rather than deleted: a reused user id must not revive old ETags.
+        bump_data_version(db, user_scope(user_id))
+        db.commit()
+        return True
+
+    # Moods
+
+    def create_mood(self, user_id: int, mood: str, mood_date: date):
+        # uq_moods_user_date enforces one mood per day, so a duplicate surfaces as an
+        # IntegrityError instead of needing a racy existence check first.
+        db_mood = MoodDB(user_id=user_id, mood=mood, mood_date=mood_date, created_at=datetime.utcnow())
+        self.db.add(db_mood)
+        try:
+            self.db.flush()
+            record_mood(self.db, user_id, mood, mood_date)
+            bump_data_version(self.db, user_scope(user_id))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise DuplicateError(mood_date)
+        self.db.refresh(db_mood)
+        return db_mood
+
+    def list_moods(self, user_id: int, page: PageRequest) -> list:
+        query = self.db.query(*MOOD_COLUMNS).filter(MoodDB.user_id == user_id)
+        return apply_keyset(query, MoodDB.mood_date, MoodDB.id, page).all()
+
+    def get_mood(self, user_id: int, mood_id: int):
+        mood = self.db.get(MoodDB, mood_id)
+        return mood if mood is not None and mood.user_id == user_id else None
+
+    def update_mood(self, user_id: int, mood_id: int, mood: str, mood_date: date):
+        db_mood = self.get_mood(user_id, mood_id)
+        if db_mood is None:
+            return None
+        db_mood.mood = mood
+        db_mood.mood_date = mood_date
+        try:
+            self.db.flush()
+            # An edit can move a mood between buckets and split or join streaks,
+            # so this user's aggregates are recomputed rather than patched.
+            rebuild_mood_trends(self.db, user_id)
+            bump_data_version(self.db, user_scope(user_id))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise DuplicateError(mood_date)
+        self.db.refresh(db_mood)
+        return db_mood
+
+    def delete_mood(self, user_id: int, mood_id: int) -> bool:
+        db_mood = self.get_mood(user_id, mood_id)
+        if db_mood is None:
+            return False
+        self.db.delete(db_mood)
+        self.db.flush()
+        rebuild_mood_trends(self.db, user_id)
+        bump_data_version(self.db, user_scope(user_id))
+        self.db.commit()
+        return True
+
+    # Prompts
+
+    def list_prompts(self) -> list:
+        return self.db.query(*PROMPT_COLUMNS).all()
+
+    def get_prompt(self, prompt_id: int):
+        return self.db.get(PromptDB, prompt_id)
+
+    def create_prompt(self, prompt_text: str):
+        if self._prompt_text_taken(prompt_text):
+            raise DuplicateError(prompt_text)
+        db_prompt = PromptDB(prompt_text=prompt_text, created_at=datetime.utcnow())
+        self.db.add(db_prompt)
+        bump_data_version(self.db, PROMPTS_SCOPE)
+        self.db.commit()
+        self.db.refresh(db_prompt)
+        return db_prompt
+
+    def update_prompt(self, prompt_id: int, prompt_text: str):
+        db_prompt = self.db.get(PromptDB, prompt_id)
+        if db_prompt is None:
+            return None
+        if self._prompt_text_taken(prompt_text, prompt_id):
+            raise DuplicateError(prompt_text)
+        db_prompt.prompt_text = prompt_text
+        bump_data_version(self.db, PROMPTS_SCOPE)
+        self.db.commit()
+        self.db.refresh(db_prompt)
+        return db_prompt
+
+    def delete_prompt(self, prompt_id: int) -> bool:
+        db_prompt = self.db.get(PromptDB, prompt_id)
+        if db_prompt is None:
+            return False
+        owners = self.db.scalars(select(JournalDB.user_id).where(JournalDB.prompt_id == prompt_id).distinct()).all()
+        self.db.query(JournalDB).filter(JournalDB.prompt_id == prompt_id).update({JournalDB.prompt_id: None}, synchronize_session=False)
+        self.db.delete(db_prompt)
+        for owner in owners:
+            bump_data_version(self.db, user_scope(owner))
+        bump_data_version(self.db, PROMPTS_SCOPE)
+        self.db.commit()
+        return True
+
+    def _prompt_text_taken(self, prompt_text: str, prompt_id: Optional[int] = None) -> bool:
+        # prompts has no unique index on its text, so MemoryRepository's unique
+        # key is matched with a lookup and both backends reject the same duplicates.
+        query = select(PromptDB.id).where(PromptDB.prompt_text == prompt_text)
+        if prompt_id is not None:
+            query = query.where(PromptDB.id != prompt_id)
+        return self.db.execute(query.limit(1)).first() is not None
+
+    def add_missing_prompts(self, texts: Iterable[str]) -> int:
+        # One lookup for the whole set and one multi-row insert, not a round trip per prompt.
+        texts = list(dict.fromkeys(texts))
+        existing = set(self.db.scalars(select(PromptDB.prompt_text).where(PromptDB.prompt_text.in_(texts))))
+        created_at = datetime.utcnow()
+        missing = [{"prompt_text": text, "created_at": created_at} for text in texts if text not in existing]
+        if missing:
+            self.db.execute(insert(PromptDB), missing)
+            bump_data_version(self.db, PROMPTS_SCOPE)
+        self.db.commit()
+        return len(missing)
+
+    # Journals
+
+    def create_journal(self, user_id: int, prompt_id: Optional[int], entry_date: date, content: str):
+        db_journal = JournalDB(
+            user_id=user_id,
+            prompt_id=prompt_id,
+            entry_date=entry_date,
+            content=content,
+            created_at=datetime.utcnow()
+        )
+        self.db.add(db_journal)
+        self.db.flush()
+        return self._commit_journal(db_journal)
+
+    def list_journals(self, user_id: int, page: PageRequest) -> list:
+        query = self.db.query(*JOURNAL_COLUMNS).filter(JournalDB.user_id == user_id)
+        return apply_keyset(query, JournalDB.entry_date, JournalDB.id, page).all()
+
+    def get_journal(self, user_id: int, journal_id: int):
+        journal = self.db.get(JournalDB, journal_id)
+        return journal if journal is not None and journal.user_id == user_id else None
+
+    def update_journal(self, user_id: int, journal_id: int, prompt_id: Optional[int], entry_date: date, content: str):
+        db_journal = self.get_journal(user_id, journal_id)
+        if db_journal is None:
+            return None
+        db_journal.prompt_id = prompt_id
+        db_journal.entry_date = entry_date
+        db_journal.content = content
+        return self._commit_journal(db_journal)
+
+    def delete_journal(self, user_id: int, journal_id: int) -> bool:
+        journal = self.get_journal(user_id, journal_id)
+        if journal is None:
+            return False
+        self.db.query(FeedbackJobDB).filter(FeedbackJobDB.journal_id == journal_id).delete()
+        self.db.delete(journal)
+        self.db.flush()
+        forget_feedback(self.db, [journal.content])
+        bump_data_version(self.db, user_scope(user_id))
+        self.db.commit()
+        return True
+
+    def _commit_journal(self, db_journal: JournalDB) -> JournalDB:
+        if FEEDBACK_PRECOMPUTE:
+            queue_feedback_job(self.db, db_journal.id)
+        bump_data_version(self.db, user_scope(db_journal.user_id))
+        self.db.commit()
+        self.db.refresh(db_journal)
+        if FEEDBACK_PRECOMPUTE:
+            submit_feedback_job(self.db.get_bind(), db_journal.id)
+        return db_journal
+
+    def _commit(self, email: str):
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            raise DuplicateError(email)
+
 # =====================
 #   USERS ENDPOINTS
 # =====================
 
 @app.post("/users/", response_model=User)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(UserDB).filter(UserDB.email == user.email).first():
+async def create_user(user: UserCreate, repo: Repository = Depends(get_repository), read_repo: Repository = Depends(get_read_repository)):
+    # Storage calls go through the thread pool: on the event loop, waiting for
+    # the single write connection would stall the request that holds it. The
+    # email check reads from the read pool, so the writer is only checked out
+    # for the insert and not across the hash.
+    if await run_in_threadpool(read_repo.get_user_by_email, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await run_password_job(hash_password, user.password)
+    try:
+        return await run_in_threadpool(repo.create_user, user.email, password_hash, user.display_name)
+    except DuplicateError:
         raise HTTPException(status_code=400, detail="Email already registered")
-    now = datetime.utcnow()
-    db_user = UserDB(
-        email=user.email,
-        password_hash=hash_password(user.password),
-        display_name=user.display_name,
-        created_at=now,
-        updated_at=now,
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return User(**db_user.__dict__)
 
 @app.get("/users/me", response_model=User)
-def read_users_me(current_user: UserDB = Depends(get_current_user)):
-    return User(**{k: v for k, v in current_user.__dict__.items() if k != "password_hash" and not k.startswith("_")})
+def read_users_me(request: Request, response: Response, repo: Repository = Depends(get_read_repository), current_user: Principal = Depends(get_current_user)):
+    response.headers.update(etag_headers(conditional_etag(repo, request, user_scope(current_user.id))))
+    return User(**asdict(current_user))
 
-@app.get("/users/", response_model=List[User])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(UserDB).all()
-    return [User(**{k: v for k, v in u.__dict__.items() if k != "_sa_instance_state" and k != "password_hash"}) for u in users]
+@app.get("/users/", response_model=List[User], response_class=ORJSONResponse)
+def list_users(repo: Repository = Depends(get_read_repository)):
+    return rows_response(repo.list_users(), USER_FIELDS)
 
 
 @app.get("/users/{user_id}", response_model=User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserDB).filter(UserDB.id == user_id).first()
+def get_user(user_id: int, repo: Repository = Depends(get_read_repository)):
+    user = repo.get_user(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(**{k: v for k, v in user.__dict__.items() if k != "_sa_instance_state" and k != "password_hash"})
+    return user
 
 
 @app.put("/users/{user_id}", response_model=User)
-def update_user(user_id: int, user: UserBase, db: Session = Depends(get_db)):
-    db_user = db.query(UserDB).filter(UserDB.id == user_id).first()
+def update_user(user_id: int, user: UserBase, repo: Repository = Depends(get_repository)):
+    try:
+        db_user = repo.update_user(user_id, user.email, user.display_name)
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    db_user.email = user.email
-    db_user.display_name = user.display_name
-    db_user.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_user)
-    return User(**db_user.__dict__)
+    invalidate_principal(user_id)
+    return db_user
 
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(UserDB).filter(UserDB.id == user_id).first()
-    if not db_user:
+def delete_user(user_id: int, repo: Repository = Depends(get_repository)):
+    if not repo.delete_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    db.query(MoodDB).filter(MoodDB.user_id == user_id).delete()
-    db.query(JournalDB).filter(JournalDB.user_id == user_id).delete()
-    db.delete(db_user)
-    db.commit()
+    invalidate_principal(user_id)
     return {"msg": "Deleted"}
 
 @app.post("/login")
-def login(login: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(UserDB).filter(UserDB.email == login.email).first()
-    if not user or not verify_password(login.password, user.password_hash):
+async def login(login: LoginRequest, repo: Repository = Depends(get_repository), read_repo: Repository = Depends(get_read_repository)):
+    # Look up on the read pool; the writer is only needed for a rehash.
+    user = await run_in_threadpool(read_repo.get_user_by_email, login.email)
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    
+    verified, new_hash = await run_password_job(verify_and_update_password, login.password, user.password_hash)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # Stored hash predates the current bcrypt cost; upgrade it while we have the password.
+        await run_in_threadpool(repo.set_password_hash, user.id, new_hash)
+
     token = create_access_token(data={"sub": str(user.id)})
     return {
         "message": "Login successful",
@@ -292,135 +1267,1336 @@ def login(login: LoginRequest, db: Session = Depends(get_db)):
 @app.post("/moods/", response_model=dict)
 def create_mood(
     mood: MoodBase,
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user)
+    repo: Repository = Depends(get_repository),
+    current_user: Principal = Depends(get_current_user)
 ):
-    # Check if a mood already exists for this user on this date
-    existing_mood = db.query(MoodDB).filter(
-        MoodDB.user_id == current_user.id,
-        MoodDB.mood_date == mood.mood_date
-    ).first()
-
-    if existing_mood:
+    try:
+        db_mood = repo.create_mood(current_user.id, mood.mood.value, mood.mood_date)
+    except DuplicateError:
         raise HTTPException(
             status_code=400,
             detail=f"You've already logged a mood for {mood.mood_date}."
         )
 
-    # If not, continue as normal
-    db_mood = MoodDB(
-        user_id=current_user.id,
-        mood=mood.mood.value,
-        mood_date=mood.mood_date,
-        created_at=datetime.utcnow()
-    )
-    db.add(db_mood)
-    db.commit()
-    db.refresh(db_mood)
-
     prompt_text = MOOD_PROMPT_MAP[mood.mood.value]
     return {
-        "mood": Mood(**db_mood.__dict__),
+        "mood": Mood.model_validate(db_mood),
         "prompt": prompt_text
     }
 
 
-@app.get("/moods/", response_model=List[Mood])
+@app.get("/moods/", response_model=List[Mood], response_class=ORJSONResponse)
 def list_moods(
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user)
+    request: Request,
+    page: PageParams = Depends(),
+    repo: Repository = Depends(get_read_repository),
+    current_user: Principal = Depends(get_current_user)
+):
+    etag = conditional_etag(repo, request, user_scope(current_user.id))
+    rows, next_cursor = finish_page(repo.list_moods(current_user.id, page.request()), "mood_date", page)
+    return rows_response(rows, MOOD_FIELDS, next_cursor, etag=etag)
+
+
+# =====================
+#   MOOD TRENDS
+# =====================
+# Every logged mood is folded into per-user day/week/month buckets (counts per
+# MoodLevel plus a score total) and a per-user streak row, in the same
+# transaction as the mood itself. /moods/trends then reads a bounded number of
+# bucket rows no matter how long the user's history is. rebuild_mood_trends
+# recomputes everything from the moods table (`python manage.py rebuild-mood-trends`);
+# migration 5 runs the same aggregation in SQL for moods logged before the tables existed.
+
+# Matches the chart scale in MoodLogger.jsx; angry sits with sad.
+MOOD_SCORES = {"very_sad": 1, "angry": 2, "sad": 2, "neutral": 3, "happy": 4, "very_happy": 5}
+TREND_PERIODS = ("day", "week", "month")
+
+class TrendPeriod(str, Enum):
+    week = "week"
+    month = "month"
+
+class MoodTrendBucket(BaseModel):
+    start: date
+    entries: int
+    average: Optional[float]
+    distribution: Dict[str, int]
+
+class MoodRollingAverage(BaseModel):
+    date: date
+    average: float
+
+class MoodStreak(BaseModel):
+    current: int
+    longest: int
+    last_logged: Optional[date]
+
+class MoodTrends(BaseModel):
+    period: TrendPeriod
+    buckets: List[MoodTrendBucket]
+    rolling_average: List[MoodRollingAverage]
+    streak: MoodStreak
+
+def bucket_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def shift_bucket(start: date, period: str, count: int) -> date:
+    if period == "week":
+        return start + timedelta(weeks=count)
+    months = start.year * 12 + start.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+def record_mood(db: Session, user_id: int, mood: str, day: date):
+    """Fold one newly inserted mood into the user's buckets and streak."""
+    for period in TREND_PERIODS:
+        insert = sqlite_insert(MoodBucketDB).values(
+            user_id=user_id,
+            period=period,
+            bucket_start=bucket_start(day, period),
+            entries=1,
+            score_total=MOOD_SCORES[mood],
+            **{level.value: int(level.value == mood) for level in MoodLevel}
+        )
+        db.execute(insert.on_conflict_do_update(
+            index_elements=[MoodBucketDB.user_id, MoodBucketDB.period, MoodBucketDB.bucket_start],
+            set_={
+                "entries": MoodBucketDB.entries + 1,
+                "score_total": MoodBucketDB.score_total + MOOD_SCORES[mood],
+                mood: getattr(MoodBucketDB, mood) + 1,
+            }
+        ))
+    streak = db.get(MoodStreakDB, user_id)
+    if streak is None:
+        db.add(MoodStreakDB(user_id=user_id, run_start=day, run_end=day, longest=1))
+        return
+    if day > streak.run_end:
+        if day != streak.run_end + timedelta(days=1):
+            streak.run_start = day
+        streak.run_end = day
+        streak.longest = max(streak.longest, (streak.run_end - streak.run_start).days + 1)
+    else:
+        # A backfilled day can join older runs; recount this user from the day buckets.
+        db.flush()
+        rebuild_mood_streaks(db, user_id)
+
+def _streak_runs(days):
+    """Yield (start, end) for each run of consecutive days in an ascending sequence."""
+    start = end = None
+    for day in days:
+        if end is not None and day == end + timedelta(days=1):
+            end = day
+            continue
+        if start is not None:
+            yield start, end
+        start = end = day
+    if start is not None:
+        yield start, end
+
+def rebuild_mood_streaks(db: Session, user_id: Optional[int] = None):
+    query = db.query(MoodBucketDB.user_id, MoodBucketDB.bucket_start).filter(MoodBucketDB.period == "day")
+    streaks = db.query(MoodStreakDB)
+    if user_id is not None:
+        query = query.filter(MoodBucketDB.user_id == user_id)
+        streaks = streaks.filter(MoodStreakDB.user_id == user_id)
+    streaks.delete(synchronize_session="fetch")
+    rows = query.order_by(MoodBucketDB.user_id, MoodBucketDB.bucket_start).yield_per(10000)
+    for owner, owned in itertools.groupby(rows, key=lambda row: row.user_id):
+        runs = list(_streak_runs(row.bucket_start for row in owned))
+        last_start, last_end = runs[-1]
+        longest = max((end - start).days + 1 for start, end in runs)
+        db.add(MoodStreakDB(user_id=owner, run_start=last_start, run_end=last_end, longest=longest))
+
+def rebuild_mood_trends(db: Session, user_id: Optional[int] = None):
+    """Recompute buckets and streaks from the moods table, for one user or everyone."""
+    buckets = db.query(MoodBucketDB)
+    if user_id is not None:
+        buckets = buckets.filter(MoodBucketDB.user_id == user_id)
+    buckets.delete(synchronize_session=False)
+    starts = {
+        "day": MoodDB.mood_date,
+        # SQLite's %w is 0 for Sunday; weeks start on Monday like bucket_start().
+        "week": func.date(MoodDB.mood_date, "-" + cast((cast(func.strftime("%w", MoodDB.mood_date), Integer) + 6) % 7, String) + " days"),
+        "month": func.date(MoodDB.mood_date, "start of month"),
+    }
+    score = case(MOOD_SCORES, value=MoodDB.mood)
+    for period, start in starts.items():
+        select_buckets = select(
+            MoodDB.user_id,
+            literal(period),
+            start,
+            func.count(),
+            func.sum(score),
+            *[func.sum(case((MoodDB.mood == level.value, 1), else_=0)) for level in MoodLevel],
+        ).group_by(MoodDB.user_id, start)
+        if user_id is not None:
+            select_buckets = select_buckets.where(MoodDB.user_id == user_id)
+        columns = ["user_id", "period", "bucket_start", "entries", "score_total", *[level.value for level in MoodLevel]]
+        db.execute(MoodBucketDB.__table__.insert().from_select(columns, select_buckets))
+    rebuild_mood_streaks(db, user_id)
+
+@app.get("/moods/trends", response_model=MoodTrends, dependencies=[Depends(require_sql_storage)])
+def mood_trends(
+    period: TrendPeriod = TrendPeriod.week,
+    buckets: int = Query(12, ge=1, le=120),
+    to_date: Optional[date] = Query(None, alias="to"),
+    window: int = Query(7, ge=1, le=90),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    moods = db.query(MoodDB).filter(MoodDB.user_id == current_user.id).all()
-    return [Mood(**m.__dict__) for m in moods]
+    end = to_date or date.today()
+    first = shift_bucket(bucket_start(end, period.value), period.value, -(buckets - 1))
+    rows = db.query(MoodBucketDB).filter(
+        MoodBucketDB.user_id == current_user.id,
+        MoodBucketDB.period == period.value,
+        MoodBucketDB.bucket_start.between(first, end)
+    ).order_by(MoodBucketDB.bucket_start).all()
+    trend_buckets = [
+        MoodTrendBucket(
+            start=row.bucket_start,
+            entries=row.entries,
+            average=round(row.score_total / row.entries, 2) if row.entries else None,
+            distribution={level.value: getattr(row, level.value) for level in MoodLevel},
+        )
+        for row in rows
+    ]
+
+    # Trailing `window`-day average at each logged day, from the day buckets.
+    days = db.query(MoodBucketDB.bucket_start, MoodBucketDB.entries, MoodBucketDB.score_total).filter(
+        MoodBucketDB.user_id == current_user.id,
+        MoodBucketDB.period == "day",
+        MoodBucketDB.bucket_start.between(first - timedelta(days=window - 1), end)
+    ).order_by(MoodBucketDB.bucket_start).all()
+    rolling, in_window = [], deque()
+    entries = score = 0
+    for day in days:
+        in_window.append(day)
+        entries += day.entries
+        score += day.score_total
+        while in_window[0].bucket_start <= day.bucket_start - timedelta(days=window):
+            expired = in_window.popleft()
+            entries -= expired.entries
+            score -= expired.score_total
+        if day.bucket_start >= first:
+            rolling.append(MoodRollingAverage(date=day.bucket_start, average=round(score / entries, 2)))
+
+    streak = db.get(MoodStreakDB, current_user.id)
+    if streak is None:
+        streak_out = MoodStreak(current=0, longest=0, last_logged=None)
+    else:
+        alive = streak.run_end >= date.today() - timedelta(days=1)
+        streak_out = MoodStreak(
+            current=(streak.run_end - streak.run_start).days + 1 if alive else 0,
+            longest=streak.longest,
+            last_logged=streak.run_end,
+        )
+    return MoodTrends(period=period, buckets=trend_buckets, rolling_average=rolling, streak=streak_out)
+
+@app.get("/moods/{mood_id}", response_model=Mood)
+def get_mood(mood_id: int, repo: Repository = Depends(get_read_repository), current_user: Principal = Depends(get_current_user)):
+    mood = repo.get_mood(current_user.id, mood_id)
+    if not mood:
+        raise HTTPException(status_code=404, detail="Mood not found")
+    return mood
+
+@app.put("/moods/{mood_id}", response_model=Mood)
+def update_mood(mood_id: int, mood: MoodBase, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    try:
+        db_mood = repo.update_mood(current_user.id, mood_id, mood.mood.value, mood.mood_date)
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail=f"You've already logged a mood for {mood.mood_date}.")
+    if db_mood is None:
+        raise HTTPException(status_code=404, detail="Mood not found")
+    return db_mood
+
+@app.delete("/moods/{mood_id}")
+def delete_mood(mood_id: int, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    if not repo.delete_mood(current_user.id, mood_id):
+        raise HTTPException(status_code=404, detail="Mood not found")
+    return {"msg": "Deleted"}
 
 
 # =====================
 #   PROMPTS ENDPOINTS
 # =====================
 
-@app.get("/prompts/", response_model=List[Prompt])
-def list_prompts(db: Session = Depends(get_db)):
-    return [Prompt(**p.__dict__) for p in db.query(PromptDB).all()]
+@app.get("/prompts/", response_model=List[Prompt], response_class=ORJSONResponse)
+def list_prompts(request: Request, repo: Repository = Depends(get_read_repository)):
+    etag = conditional_etag(repo, request, PROMPTS_SCOPE)
+    return rows_response(repo.list_prompts(), PROMPT_FIELDS, etag=etag)
 
 
 @app.get("/prompts/{prompt_id}", response_model=Prompt)
-def get_prompt(prompt_id: int, db: Session = Depends(get_db)):
-    prompt = db.query(PromptDB).filter(PromptDB.id == prompt_id).first()
+def get_prompt(prompt_id: int, repo: Repository = Depends(get_read_repository)):
+    prompt = repo.get_prompt(prompt_id)
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    return Prompt(**prompt.__dict__)
+    return prompt
+
+@app.post("/prompts/", response_model=Prompt)
+def create_prompt(prompt: PromptCreate, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    try:
+        return repo.create_prompt(prompt.prompt_text)
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="Prompt already exists")
+
+@app.put("/prompts/{prompt_id}", response_model=Prompt)
+def update_prompt(prompt_id: int, prompt: PromptBase, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    try:
+        db_prompt = repo.update_prompt(prompt_id, prompt.prompt_text)
+    except DuplicateError:
+        raise HTTPException(status_code=400, detail="Prompt already exists")
+    if db_prompt is None:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return db_prompt
+
+@app.delete("/prompts/{prompt_id}")
+def delete_prompt(prompt_id: int, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    if not repo.delete_prompt(prompt_id):
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return {"msg": "Deleted"}
 
 # =====================
 #   JOURNAL ENDPOINTS
 # =====================
 
-@app.post("/journal/", response_model=Journal)
-def create_journal(journal: JournalCreate, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    if journal.prompt_id and not db.query(PromptDB).filter(PromptDB.id == journal.prompt_id).first():
+def check_prompt_exists(repo: Repository, prompt_id: Optional[int]):
+    if prompt_id and repo.get_prompt(prompt_id) is None:
         raise HTTPException(status_code=400, detail="Prompt does not exist")
-    db_journal = JournalDB(
-        user_id=current_user.id,
-        prompt_id=journal.prompt_id,
-        entry_date=journal.entry_date,
-        content=journal.content,
-        created_at=datetime.utcnow()
-    )
-    db.add(db_journal)
-    db.commit()
-    db.refresh(db_journal)
-    return Journal(**db_journal.__dict__)
 
-@app.get("/journal/", response_model=List[Journal])
-def list_journals(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    return [Journal(**j.__dict__) for j in db.query(JournalDB).filter(JournalDB.user_id == current_user.id).all()]
+@app.post("/journal/", response_model=Journal)
+def create_journal(journal: JournalCreate, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    check_prompt_exists(repo, journal.prompt_id)
+    return repo.create_journal(current_user.id, journal.prompt_id, journal.entry_date, journal.content)
+
+@app.get("/journal/", response_model=List[Journal], response_class=ORJSONResponse)
+def list_journals(request: Request, page: PageParams = Depends(), repo: Repository = Depends(get_read_repository), current_user: Principal = Depends(get_current_user)):
+    etag = conditional_etag(repo, request, user_scope(current_user.id))
+    rows, next_cursor = finish_page(repo.list_journals(current_user.id, page.request()), "entry_date", page)
+    return rows_response(rows, JOURNAL_FIELDS, next_cursor, etag=etag)
+
+# Ranked search over the journal_fts index (migration 6). Results are ordered by
+# bm25 relevance, so pages are offsets rather than a (date, id) keyset; the
+# X-Next-Cursor header carries the next offset.
+SEARCH_PAGE_SIZE_DEFAULT = 20
+SEARCH_PAGE_SIZE_MAX = 100
+SEARCH_SNIPPET_TOKENS = 16
+
+SEARCH_SQL = """
+    SELECT journal.id, journal.prompt_id, journal.entry_date, journal.created_at,
+           snippet(journal_fts, 0, '<mark>', '</mark>', '…', :tokens) AS snippet,
+           bm25(journal_fts, 1.0, 0.0) AS rank
+    FROM journal_fts JOIN journal ON journal.id = journal_fts.rowid
+    WHERE journal_fts MATCH :match AND journal.user_id = :user_id {filters}
+    ORDER BY rank, journal.id
+    LIMIT :limit OFFSET :offset
+"""
+
+def fts_match_expression(q: str, user_id: int) -> str:
+    """Quote each term so user input is matched as words, never parsed as FTS5 syntax."""
+    terms = " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+    return f'user_id:"{user_id}" AND content:({terms})' if terms else ""
+
+@app.get("/journal/search", response_model=List[JournalSearchHit], response_class=ORJSONResponse, dependencies=[Depends(require_sql_storage)])
+def search_journals(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SEARCH_PAGE_SIZE_DEFAULT, ge=1, le=SEARCH_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    match = fts_match_expression(q, current_user.id)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    filters, params = "", {
+        "match": match,
+        "user_id": current_user.id,
+        "tokens": SEARCH_SNIPPET_TOKENS,
+        "limit": limit + 1,
+        "offset": offset,
+    }
+    if from_date:
+        filters += " AND journal.entry_date >= :from_date"
+        params["from_date"] = from_date
+    if to_date:
+        filters += " AND journal.entry_date <= :to_date"
+        params["to_date"] = to_date
+    query = text(SEARCH_SQL.format(filters=filters)).columns(entry_date=Date, created_at=DateTime)
+    rows = db.execute(query, params).all()
+    next_cursor = str(offset + limit) if len(rows) > limit else None
+    return rows_response(rows[:limit], SEARCH_HIT_FIELDS, next_cursor)
 
 @app.get("/journal/{journal_id}", response_model=Journal)
-def get_journal(journal_id: int, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    journal = db.query(JournalDB).filter(JournalDB.id == journal_id, JournalDB.user_id == current_user.id).first()
+def get_journal(journal_id: int, repo: Repository = Depends(get_read_repository), current_user: Principal = Depends(get_current_user)):
+    journal = repo.get_journal(current_user.id, journal_id)
     if not journal:
         raise HTTPException(status_code=404, detail="Journal not found")
-    return Journal(**journal.__dict__)
+    return journal
 
 @app.put("/journal/{journal_id}", response_model=Journal)
-def update_journal(journal_id: int, journal: JournalBase, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    db_journal = db.query(JournalDB).filter(JournalDB.id == journal_id, JournalDB.user_id == current_user.id).first()
-    if not db_journal:
+def update_journal(journal_id: int, journal: JournalBase, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    if not repo.get_journal(current_user.id, journal_id):
         raise HTTPException(status_code=404, detail="Journal not found")
-    if journal.prompt_id and not db.query(PromptDB).filter(PromptDB.id == journal.prompt_id).first():
-        raise HTTPException(status_code=400, detail="Prompt does not exist")
-    db_journal.prompt_id = journal.prompt_id
-    db_journal.entry_date = journal.entry_date
-    db_journal.content = journal.content
-    db.commit()
-    db.refresh(db_journal)
-    return Journal(**db_journal.__dict__)
+    check_prompt_exists(repo, journal.prompt_id)
+    return repo.update_journal(current_user.id, journal_id, journal.prompt_id, journal.entry_date, journal.content)
 
 @app.delete("/journal/{journal_id}")
-def delete_journal(journal_id: int, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    journal = db.query(JournalDB).filter(JournalDB.id == journal_id, JournalDB.user_id == current_user.id).first()
-    if not journal:
+def delete_journal(journal_id: int, repo: Repository = Depends(get_repository), current_user: Principal = Depends(get_current_user)):
+    if not repo.delete_journal(current_user.id, journal_id):
         raise HTTPException(status_code=404, detail="Journal not found")
-    db.delete(journal)
-    db.commit()
     return {"msg": "Deleted"}
 
-@app.post("/journal/feedback", response_model=dict)
-async def get_journal_feedback(entry: dict):
-    journal_text = entry.get("content")
-    if not journal_text:
-        raise HTTPException(status_code=400, detail="Missing journal content")
+# =====================
+#   BULK IMPORT
+# =====================
+# POST /moods/import and /journal/import take an NDJSON or CSV body and parse it
+# as it arrives. Valid rows are inserted with one executemany per batch, each batch
+# in its own transaction, so a bad row is reported instead of aborting the load
+# and no database connection is held while the client is still uploading.
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+class DataFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+def import_format(request: Request, format: Optional[DataFormat] = None) -> DataFormat:
+    if format:
+        return format
+    return DataFormat.csv if "csv" in request.headers.get("content-type", "") else DataFormat.ndjson
+
+async def iter_lines(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (line number, line) from the request body as chunks arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending, number = "", 0
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            number += 1
+            yield number, line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+async def iter_import_rows(request: Request, fmt: DataFormat) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row number, dict) per record, or (row number, error message) if it can't be parsed."""
+    if fmt == DataFormat.ndjson:
+        async for number, line in iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, f"Invalid JSON: {exc}"
+                continue
+            yield number, row if isinstance(row, dict) else "Expected a JSON object"
+        return
+
+    # A CSV record can span lines inside a quoted field; it is complete once its
+    # quote characters balance.
+    header, record, start = None, [], 0
+    async for number, line in iter_lines(request):
+        if not record:
+            start = number
+        record.append(line)
+        joined = "\n".join(record)
+        if joined.count('"') % 2:
+            continue
+        record = []
+        if not joined.strip():
+            continue
+        values = next(csv.reader([joined]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty CSV cells mean "not given", e.g. a journal entry without a prompt.
+        yield start, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield start, "Unterminated quoted field"
+
+def describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
 
-    prompt = f"""You are a helpful AI assistant for mental health journaling.
+def insert_mood_batch(db: Session, user_id: int, batch: List[Tuple[int, MoodBase]]) -> Tuple[int, List[ImportRowError]]:
+    errors, seen = [], set()
+    days = [mood.mood_date for _, mood in batch]
+    taken = set(db.scalars(select(MoodDB.mood_date).where(MoodDB.user_id == user_id, MoodDB.mood_date.in_(days))))
+    rows, now = [], datetime.utcnow()
+    for number, mood in batch:
+        if mood.mood_date in taken or mood.mood_date in seen:
+            errors.append(ImportRowError(row=number, error=f"You've already logged a mood for {mood.mood_date}."))
+            continue
+        seen.add(mood.mood_date)
+        rows.append({"user_id": user_id, "mood": mood.mood.value, "mood_date": mood.mood_date, "created_at": now})
+    if rows:
+        db.execute(insert(MoodDB), rows)
+        bump_data_version(db, user_scope(user_id))
+    db.commit()
+    return len(rows), errors
+
+def insert_journal_batch(db: Session, user_id: int, batch: List[Tuple[int, JournalCreate]]) -> Tuple[int, List[ImportRowError]]:
+    errors = []
+    prompt_ids = {entry.prompt_id for _, entry in batch if entry.prompt_id}
+    known = set(db.scalars(select(PromptDB.id).where(PromptDB.id.in_(prompt_ids)))) if prompt_ids else set()
+    rows, now = [], datetime.utcnow()
+    for number, entry in batch:
+        if entry.prompt_id and entry.prompt_id not in known:
+            errors.append(ImportRowError(row=number, error="Prompt does not exist"))
+            continue
+        rows.append({
+            "user_id": user_id,
+            "prompt_id": entry.prompt_id,
+            "entry_date": entry.entry_date,
+            "content": entry.content,
+            "created_at": now,
+        })
+    if rows:
+        db.execute(insert(JournalDB), rows)
+        bump_data_version(db, user_scope(user_id))
+    db.commit()
+    return len(rows), errors
+
+async def run_import(request: Request, fmt: DataFormat, model, insert_batch, db: Session, user_id: int) -> ImportResult:
+    imported = failed = 0
+    errors: List[ImportRowError] = []
+
+    def record_errors(new_errors):
+        nonlocal failed
+        failed += len(new_errors)
+        errors.extend(new_errors[:max(0, IMPORT_MAX_ERRORS - len(errors))])
+
+    async def flush(batch):
+        nonlocal imported
+        try:
+            count, batch_errors = await run_in_threadpool(insert_batch, db, user_id, batch)
+        except IntegrityError:
+            # Lost a race with a concurrent write; retry row by row to pin the error down.
+            await run_in_threadpool(db.rollback)
+            count, batch_errors = 0, []
+            for row in batch:
+                try:
+                    row_count, row_errors = await run_in_threadpool(insert_batch, db, user_id, [row])
+                except IntegrityError as exc:
+                    await run_in_threadpool(db.rollback)
+                    row_count, row_errors = 0, [ImportRowError(row=row[0], error=str(exc.orig))]
+                count += row_count
+                batch_errors += row_errors
+        imported += count
+        record_errors(batch_errors)
+
+    batch = []
+    async for number, row in iter_import_rows(request, fmt):
+        if isinstance(row, str):
+            record_errors([ImportRowError(row=number, error=row)])
+            continue
+        try:
+            batch.append((number, model.model_validate(row)))
+        except ValidationError as exc:
+            record_errors([ImportRowError(row=number, error=describe_validation_error(exc))])
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    # Parse errors are found before batch errors; report them in row order.
+    return ImportResult(imported=imported, failed=failed, errors=sorted(errors, key=lambda e: e.row))
+
+@app.post("/moods/import", response_model=ImportResult, dependencies=[Depends(require_sql_storage)])
+async def import_moods(
+    request: Request,
+    fmt: DataFormat = Depends(import_format),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    result = await run_import(request, fmt, MoodBase, insert_mood_batch, db, current_user.id)
+    if result.imported:
+        # One pass over the user's moods instead of per-row bucket upserts.
+        def refresh_trends():
+            rebuild_mood_trends(db, current_user.id)
+            db.commit()
+        await run_in_threadpool(refresh_trends)
+    return result
+
+@app.post("/journal/import", response_model=ImportResult, dependencies=[Depends(require_sql_storage)])
+async def import_journals(
+    request: Request,
+    fmt: DataFormat = Depends(import_format),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Imported history is not queued for AI feedback; GET /journal/{id}/feedback
+    # still generates it on demand.
+    return await run_import(request, fmt, JournalCreate, insert_journal_batch, db, current_user.id)
+
+# =====================
+#   EXPORT
+# =====================
+# GET /export streams the user's profile, moods and journal entries as NDJSON
+# (one {"type": ...} object per line) or a single CSV, optionally gzipped on the
+# fly. Rows come off a server-side cursor EXPORT_BATCH_SIZE at a time and leave
+# as soon as they are encoded, so memory use does not grow with history length.
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CSV_FIELDS = ["type", "id", "date", "mood", "prompt_id", "content", "created_at", "email", "display_name"]
+
+def export_records(db: Session, user_id: int):
+    """Yield (type, row dict) for everything the user owns, oldest first."""
+    user = db.execute(select(*USER_COLUMNS).where(UserDB.id == user_id)).one()
+    yield "user", user._asdict()
+    for kind, columns, date_column, id_column, owner_column in (
+        ("mood", MOOD_COLUMNS, MoodDB.mood_date, MoodDB.id, MoodDB.user_id),
+        ("journal", JOURNAL_COLUMNS, JournalDB.entry_date, JournalDB.id, JournalDB.user_id),
+    ):
+        rows = db.execute(
+            select(*columns).where(owner_column == user_id).order_by(date_column, id_column)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for row in rows:
+            yield kind, row._asdict()
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def encode_export(records, fmt: DataFormat):
+    """Encode records into chunks of roughly EXPORT_BATCH_SIZE records each."""
+    if fmt == DataFormat.ndjson:
+        chunk = []
+        for kind, row in records:
+            chunk.append(orjson.dumps({"type": kind, **row}))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for count, (kind, row) in enumerate(records, 1):
+        row = {**row, "date": row.get("mood_date") or row.get("entry_date"), "type": kind}
+        writer.writerow({k: _csv_value(v) for k, v in row.items()})
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@app.get("/export", dependencies=[Depends(require_sql_storage)])
+def export_history(
+    format: DataFormat = DataFormat.ndjson,
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    user_id = current_user.id
+
+    def body():
+        # The request session is closed before the body is streamed, so the
+        # export reads through a session of its own.
+        export_db = session_like(db)
+        try:
+            chunks = encode_export(export_records(export_db, user_id), format)
+            yield from gzip_chunks(chunks) if gzip else chunks
+        finally:
+            export_db.close()
+
+    filename = f"mindfulday-export.{format.value}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if format == DataFormat.csv else "application/x-ndjson")
+    return StreamingResponse(body(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# =====================
+#   FEEDBACK CACHE
+# =====================
+# Feedback is cached by a hash of (model, prompt template version, journal content):
+# an in-process LRU answers repeat views without I/O and the feedback_cache table
+# keeps results across restarts and workers. Bump FEEDBACK_PROMPT_VERSION whenever
+# FEEDBACK_PROMPT_TEMPLATE changes so stale feedback is never served.
+# FEEDBACK_CACHE_PERSIST=0 keeps only the LRU tier; it is the default with
+# STORAGE_BACKEND=memory so that mode runs without a migrated database.
+
+FEEDBACK_MODEL = os.getenv("FEEDBACK_MODEL", "gpt-4.1")
+FEEDBACK_PROMPT_VERSION = "1"
+FEEDBACK_PROMPT_TEMPLATE = """You are a helpful AI assistant for mental health journaling.
     
     Here is a journal entry from a user:
     "{journal_text}"
     
     Summarize this journal in 1–2 sentences, and provide two reflective follow-up questions to help the user think more deeply."""
 
-    response = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[{"role": "user", "content": prompt}]
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "1024"))
+FEEDBACK_CACHE_TTL_SECONDS = int(os.getenv("FEEDBACK_CACHE_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+FEEDBACK_CACHE_MAX_ROWS = int(os.getenv("FEEDBACK_CACHE_MAX_ROWS", "100000"))
+FEEDBACK_CACHE_PRUNE_EVERY = 100
+FEEDBACK_CACHE_PERSIST = os.getenv("FEEDBACK_CACHE_PERSIST", "0" if STORAGE_BACKEND == "memory" else "1") == "1"
+FEEDBACK_BATCH_WORKERS = int(os.getenv("FEEDBACK_BATCH_WORKERS", "4"))
+FEEDBACK_PRECOMPUTE = os.getenv("FEEDBACK_PRECOMPUTE", "1") == "1"
+FEEDBACK_WORKERS = int(os.getenv("FEEDBACK_WORKERS", "2"))
+FEEDBACK_JOB_MAX_ATTEMPTS = int(os.getenv("FEEDBACK_JOB_MAX_ATTEMPTS", "3"))
+FEEDBACK_JOB_RETRY_BASE_SECONDS = float(os.getenv("FEEDBACK_JOB_RETRY_BASE_SECONDS", "2"))
+FEEDBACK_JOB_RETRY_MAX_SECONDS = float(os.getenv("FEEDBACK_JOB_RETRY_MAX_SECONDS", "300"))
+
+feedback_memory_cache = LRUCache(maxsize=FEEDBACK_CACHE_SIZE, ttl=FEEDBACK_CACHE_TTL_SECONDS)
+feedback_cache_counters = {"db_hits": 0, "misses": 0, "stores": 0, "db_evictions": 0}
+_feedback_counters_lock = threading.Lock()
+
+def _count_feedback(name: str, amount: int = 1) -> int:
+    with _feedback_counters_lock:
+        feedback_cache_counters[name] += amount
+        return feedback_cache_counters[name]
+
+def build_feedback_prompt(journal_text: str) -> str:
+    return FEEDBACK_PROMPT_TEMPLATE.format(journal_text=journal_text)
+
+def feedback_cache_key(journal_text: str, model: str = None, prompt_version: str = None) -> str:
+    parts = (model or FEEDBACK_MODEL, prompt_version or FEEDBACK_PROMPT_VERSION, journal_text)
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+def lookup_feedback(db: Session, key: str) -> Optional[str]:
+    feedback = feedback_memory_cache.get(key)
+    if feedback is not None:
+        return feedback
+    if not FEEDBACK_CACHE_PERSIST:
+        _count_feedback("misses")
+        return None
+    cutoff = datetime.utcnow() - timedelta(seconds=FEEDBACK_CACHE_TTL_SECONDS)
+    row = db.query(FeedbackCacheDB.feedback).filter(
+        FeedbackCacheDB.key == key,
+        FeedbackCacheDB.created_at > cutoff
+    ).first()
+    if row is None:
+        _count_feedback("misses")
+        return None
+    _count_feedback("db_hits")
+    feedback_memory_cache.set(key, row.feedback)
+    return row.feedback
+
+def store_feedback(db: Session, key: str, feedback: str):
+    feedback_memory_cache.set(key, feedback)
+    if not FEEDBACK_CACHE_PERSIST:
+        _count_feedback("stores")
+        return
+    db.merge(FeedbackCacheDB(
+        key=key,
+        model=FEEDBACK_MODEL,
+        prompt_version=FEEDBACK_PROMPT_VERSION,
+        feedback=feedback,
+        created_at=datetime.utcnow()
+    ))
+    db.commit()
+    if _count_feedback("stores") % FEEDBACK_CACHE_PRUNE_EVERY == 0:
+        prune_feedback_cache(db)
+
+def prune_feedback_cache(db: Session) -> int:
+    """Drop expired rows, then the oldest rows beyond FEEDBACK_CACHE_MAX_ROWS."""
+    cutoff = datetime.utcnow() - timedelta(seconds=FEEDBACK_CACHE_TTL_SECONDS)
+    removed = db.query(FeedbackCacheDB).filter(FeedbackCacheDB.created_at <= cutoff).delete(synchronize_session=False)
+    overflow = db.query(FeedbackCacheDB.key).count() - FEEDBACK_CACHE_MAX_ROWS
+    if overflow > 0:
+        oldest = db.query(FeedbackCacheDB.key).order_by(FeedbackCacheDB.created_at).limit(overflow)
+        removed += db.query(FeedbackCacheDB).filter(FeedbackCacheDB.key.in_(oldest.scalar_subquery())).delete(synchronize_session=False)
+    db.commit()
+    _count_feedback("db_evictions", removed)
+    return removed
+
+def forget_feedback(db: Session, contents: Iterable[str]):
+    """Drop the cached feedback for deleted journal text; call it once the journals are
+    deleted and flushed, and the caller commits.
+
+    Feedback is keyed by text alone, so text that another journal still has keeps
+    its entry (ix_journal_content makes that check an index lookup).
+    """
+    contents = list(set(contents))
+    kept = set()
+    # Chunked to stay under SQLite's bound-parameter limit.
+    for start in range(0, len(contents), 500):
+        kept.update(db.scalars(select(JournalDB.content).where(JournalDB.content.in_(contents[start:start + 500]))))
+    purge_feedback(db, [content for content in contents if content not in kept])
+
+def purge_feedback(db: Optional[Session], contents: Iterable[str]):
+    """Drop the cached feedback for `contents` from both tiers; the caller commits.
+
+    Only keys for the current model and prompt version are known here; older
+    ones expire with FEEDBACK_CACHE_TTL_SECONDS.
+    """
+    keys = list({feedback_cache_key(content) for content in contents})
+    for key in keys:
+        feedback_memory_cache.pop(key)
+    if not FEEDBACK_CACHE_PERSIST:
+        return
+    # Chunked to stay under SQLite's bound-parameter limit.
+    for start in range(0, len(keys), 500):
+        db.query(FeedbackCacheDB).filter(FeedbackCacheDB.key.in_(keys[start:start + 500])).delete(synchronize_session=False)
+
+def forget_memory_backend_feedback(contents: Iterable[str]):
+    # MemoryRepository only reports text that no remaining journal has.
+    if not FEEDBACK_CACHE_PERSIST:
+        purge_feedback(None, contents)
+        return
+    db = SessionLocal()
+    try:
+        purge_feedback(db, contents)
+        db.commit()
+    finally:
+        db.close()
+
+if memory_repository is not None:
+    memory_repository.on_journals_deleted = forget_memory_backend_feedback
+
+def feedback_cache_stats() -> dict:
+    with _feedback_counters_lock:
+        counters = dict(feedback_cache_counters)
+    return {"memory": feedback_memory_cache.stats(), **counters}
+
+@app.get("/journal/feedback/cache", response_model=dict)
+def get_feedback_cache_stats():
+    return feedback_cache_stats()
+
+async def generate_feedback(db: Session, journal_text: str) -> dict:
+    key = feedback_cache_key(journal_text)
+    # Cache reads and writes are blocking SQLite calls, so they run in the
+    # thread pool alongside the awaited LLM call instead of on the event loop.
+    cached = await run_in_threadpool(lookup_feedback, db, key)
+    if cached is not None:
+        return {"feedback": cached, "cached": True}
+    # Hand the connection back to the pool rather than holding it across the LLM call.
+    await run_in_threadpool(db.rollback)
+
+    result = await complete_chat(build_feedback_prompt(journal_text), model=FEEDBACK_MODEL)
+    await run_in_threadpool(store_feedback, db, key, result)
+    return {"feedback": result, "cached": False}
+
+@app.post("/journal/feedback", response_model=dict)
+async def get_journal_feedback(entry: dict, db: Session = Depends(get_db)):
+    journal_text = entry.get("content")
+    if not journal_text:
+        raise HTTPException(status_code=400, detail="Missing journal content")
+    return await generate_feedback(db, journal_text)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/journal/feedback/stream")
+async def stream_journal_feedback(entry: dict, db: Session = Depends(get_db)):
+    """Relay feedback as Server-Sent Events: `delta` events carry text as it is
+    generated and a final `done` event carries the full, cached feedback."""
+    journal_text = entry.get("content")
+    if not journal_text:
+        raise HTTPException(status_code=400, detail="Missing journal content")
+
+    key = feedback_cache_key(journal_text)
+    cached = await run_in_threadpool(lookup_feedback, db, key)
+
+    async def events():
+        if cached is not None:
+            yield _sse("delta", {"text": cached})
+            yield _sse("done", {"feedback": cached, "cached": True})
+            return
+        parts = []
+        try:
+            async for delta in stream_chat(build_feedback_prompt(journal_text), model=FEEDBACK_MODEL):
+                parts.append(delta)
+                yield _sse("delta", {"text": delta})
+        except HTTPException as exc:
+            yield _sse("error", {"detail": exc.detail})
+            return
+        except Exception:
+            yield _sse("error", {"detail": "Feedback generation failed"})
+            return
+        result = "".join(parts).strip()
+        # The request session is closed before the body is streamed, so the
+        # result is stored through a session of its own.
+        def store():
+            store_db = session_like(db)
+            try:
+                store_feedback(store_db, key, result)
+            finally:
+                store_db.close()
+        await run_in_threadpool(store)
+        yield _sse("done", {"feedback": result, "cached": False})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/journal/feedback/batch", response_model=dict, dependencies=[Depends(require_sql_storage)])
+async def get_journal_feedback_batch(batch: FeedbackBatchRequest, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    journal_ids = list(dict.fromkeys(batch.journal_ids))
+    journals = await run_in_threadpool(lambda: db.query(JournalDB.id, JournalDB.content).filter(
+        JournalDB.id.in_(journal_ids),
+        JournalDB.user_id == current_user.id
+    ).all())
+    missing = set(journal_ids) - {j.id for j in journals}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Journal not found: {sorted(missing)}")
+
+    # Serve cached entries straight away and group the rest by cache key so
+    # journals with identical content share one LLM call.
+    feedback, errors, uncached = {}, {}, {}
+
+    def split_cached():
+        for journal in journals:
+            key = feedback_cache_key(journal.content)
+            cached = lookup_feedback(db, key)
+            if cached is not None:
+                feedback[journal.id] = cached
+            else:
+                uncached.setdefault(key, (journal.content, []))[1].append(journal.id)
+        db.rollback()
+    await run_in_threadpool(split_cached)
+
+    workers = asyncio.Semaphore(FEEDBACK_BATCH_WORKERS)
+
+    async def generate(journal_text: str) -> str:
+        async with workers:
+            return await complete_chat(build_feedback_prompt(journal_text), model=FEEDBACK_MODEL)
+
+    keys = list(uncached)
+    results = await asyncio.gather(*(generate(uncached[key][0]) for key in keys), return_exceptions=True)
+    for key, result in zip(keys, results):
+        ids = uncached[key][1]
+        if isinstance(result, Exception):
+            detail = result.detail if isinstance(result, HTTPException) else "Feedback generation failed"
+            errors.update({journal_id: detail for journal_id in ids})
+            continue
+        await run_in_threadpool(store_feedback, db, key, result)
+        feedback.update({journal_id: result for journal_id in ids})
+    return {"feedback": feedback, "errors": errors}
+
+# =====================
+#   FEEDBACK JOBS
+# =====================
+# Creating or editing a journal queues a feedback_jobs row in the same transaction
+# and hands the journal to a small in-process worker pool, so feedback is usually
+# ready before the dashboard asks for it. Rows left pending or running by a restart
+# are picked up again on startup. A failed job is retried with exponential backoff
+# on a timer, so waiting out a rate limit doesn't tie up a worker.
+
+feedback_job_executor = ThreadPoolExecutor(max_workers=FEEDBACK_WORKERS, thread_name_prefix="feedback-job")
+feedback_retry_timers = set()
+_feedback_retry_lock = threading.Lock()
+
+def queue_feedback_job(db: Session, journal_id: int):
+    """Mark the journal's job pending; the caller commits."""
+    now = datetime.utcnow()
+    job = db.query(FeedbackJobDB).filter(FeedbackJobDB.journal_id == journal_id).first()
+    if job is None:
+        db.add(FeedbackJobDB(journal_id=journal_id, status="pending", attempts=0, created_at=now, updated_at=now))
+    else:
+        job.status = "pending"
+        job.attempts = 0
+        job.last_error = None
+        job.updated_at = now
+
+def feedback_retry_delay(attempts: int) -> float:
+    """Seconds to wait after the `attempts`-th failure: base * 2^(attempts - 1), capped."""
+    return min(FEEDBACK_JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), FEEDBACK_JOB_RETRY_MAX_SECONDS)
+
+def submit_feedback_job(bind, journal_id: int, delay: float = 0):
+    if delay <= 0:
+        feedback_job_executor.submit(run_feedback_job, bind, journal_id)
+        return
+
+    def resubmit():
+        with _feedback_retry_lock:
+            feedback_retry_timers.discard(timer)
+        feedback_job_executor.submit(run_feedback_job, bind, journal_id)
+
+    timer = threading.Timer(delay, resubmit)
+    timer.daemon = True
+    with _feedback_retry_lock:
+        feedback_retry_timers.add(timer)
+    timer.start()
+
+def run_feedback_job(bind, journal_id: int):
+    db = Session(bind=bind, autoflush=False)
+    try:
+        job = db.query(FeedbackJobDB).filter(FeedbackJobDB.journal_id == journal_id).first()
+        journal = db.query(JournalDB).filter(JournalDB.id == journal_id).first()
+        if job is None or journal is None:
+            return
+        content = journal.content
+        job.status = "running"
+        job.attempts += 1
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+        key = feedback_cache_key(content)
+        try:
+            if lookup_feedback(db, key) is None:
+                # Don't hold a pooled connection for the length of the LLM call.
+                db.rollback()
+                began = time.perf_counter()
+                try:
+                    response = get_llm_client().chat.completions.create(
+                        model=FEEDBACK_MODEL,
+                        messages=[{"role": "user", "content": build_feedback_prompt(content)}]
+                    )
+                except Exception:
+                    record_llm_call(FEEDBACK_MODEL, "job", "error", began)
+                    raise
+                record_llm_call(FEEDBACK_MODEL, "job", "ok", began, getattr(response, "usage", None))
+                store_feedback(db, key, response.choices[0].message.content.strip())
+        except Exception as exc:
+            db.rollback()
+            retry = job.attempts < FEEDBACK_JOB_MAX_ATTEMPTS
+            job.status = "pending" if retry else "failed"
+            job.last_error = str(exc)[:500]
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            if retry:
+                submit_feedback_job(bind, journal_id, delay=feedback_retry_delay(job.attempts))
+            return
+        job.status = "done"
+        job.last_error = None
+        job.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def resume_feedback_jobs():
+    if memory_repository is not None:
+        return
+    db = SessionLocal()
+    try:
+        pending = db.query(FeedbackJobDB.journal_id).filter(FeedbackJobDB.status.in_(["pending", "running"])).all()
+    finally:
+        db.close()
+    for job in pending:
+        submit_feedback_job(engine, job.journal_id)
+
+@app.on_event("shutdown")
+def stop_feedback_workers():
+    # Jobs still queued or backing off stay "pending" in the table and resume on next startup.
+    with _feedback_retry_lock:
+        for timer in feedback_retry_timers:
+            timer.cancel()
+        feedback_retry_timers.clear()
+    feedback_job_executor.shutdown(wait=False, cancel_futures=True)
+
+@app.get("/journal/{journal_id}/feedback", response_model=dict, dependencies=[Depends(require_sql_storage)])
+def get_precomputed_feedback(journal_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    journal = db.query(JournalDB).filter(JournalDB.id == journal_id, JournalDB.user_id == current_user.id).first()
+    if not journal:
+        raise HTTPException(status_code=404, detail="Journal not found")
+    feedback = lookup_feedback(db, feedback_cache_key(journal.content))
+    if feedback is not None:
+        return {"status": "ready", "feedback": feedback}
+
+    job = db.query(FeedbackJobDB).filter(FeedbackJobDB.journal_id == journal_id).first()
+    if job is not None and job.status == "failed":
+        return {"status": "failed", "detail": job.last_error}
+    if job is None or job.status == "done":
+        # Journals written before precompute existed, or whose cached feedback expired.
+        queue_feedback_job(db, journal_id)
+        db.commit()
+        submit_feedback_job(db.get_bind(), journal_id)
+    return {"status": "pending"}
+
+# =====================
+#   ASYNC DATABASE MODE
+# =====================
+# Async twins of the user, mood, prompt and journal endpoints. With DB_MODE=async
+# they take the place of the sync routes (same paths, same responses), so a request
+# waiting on SQLite suspends on the event loop instead of occupying one of
+# Starlette's threadpool threads. Principal caching, keyset paging, the password
+# pool and feedback precompute behave exactly as in the sync handlers.
+
+async_router = APIRouter()
+
+def sql_etag(db: Session, request: Request, scope: str) -> str:
+    return conditional_etag(SqlRepository(db), request, scope)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_read_db)):
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    try:
+        user_id = decode_token(token)
+    except (JWTError, KeyError, ValueError):
+        raise credentials_exception
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        user = await db.get(UserDB, user_id)
+        if user is None:
+            raise credentials_exception
+        principal = Principal(
+            id=user.id,
+            email=user.email,
+            display_name=user.display_name,
+            created_at=user.created_at,
+            updated_at=user.updated_at
+        )
+        principal_cache.set(user_id, principal)
+    return principal
+
+@async_router.post("/users/", response_model=User)
+async def create_user_async(user: UserCreate, db: AsyncSession = Depends(get_async_db), read_db: AsyncSession = Depends(get_async_read_db)):
+    if (await read_db.execute(select(UserDB.id).where(UserDB.email == user.email))).first():
+        raise HTTPException(status_code=400, detail="Email already registered")
+    password_hash = await run_password_job(hash_password, user.password)
+    now = datetime.utcnow()
+    db_user = UserDB(
+        email=user.email,
+        password_hash=password_hash,
+        display_name=user.display_name,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another signup took the email while the password was hashing.
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return db_user
+
+@async_router.get("/users/me", response_model=User)
+async def read_users_me_async(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_user_async)):
+    response.headers.update(etag_headers(await db.run_sync(sql_etag, request, user_scope(current_user.id))))
+    return User(**asdict(current_user))
+
+@async_router.get("/users/", response_model=List[User], response_class=ORJSONResponse)
+async def list_users_async(db: AsyncSession = Depends(get_async_read_db)):
+    return rows_response((await db.execute(select(*USER_COLUMNS))).all(), USER_FIELDS)
+
+@async_router.get("/users/{user_id}", response_model=User)
+async def get_user_async(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    user = await db.get(UserDB, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@async_router.put("/users/{user_id}", response_model=User)
+async def update_user_async(user_id: int, user: UserBase, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.get(UserDB, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    db_user.email = user.email
+    db_user.display_name = user.display_name
+    db_user.updated_at = datetime.utcnow()
+    try:
+        # bump_data_version autoflushes, so the unique email can fail there too.
+        await db.run_sync(bump_data_version, user_scope(user_id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
+    invalidate_principal(user_id)
+    return db_user
+
+@async_router.delete("/users/{user_id}")
+async def delete_user_async(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.get(UserDB, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_journals = select(JournalDB.id).where(JournalDB.user_id == user_id).scalar_subquery()
+    await db.execute(delete(MoodDB).where(MoodDB.user_id == user_id))
+    await db.execute(delete(MoodBucketDB).where(MoodBucketDB.user_id == user_id))
+    await db.execute(delete(MoodStreakDB).where(MoodStreakDB.user_id == user_id))
+    await db.execute(delete(FeedbackJobDB).where(FeedbackJobDB.journal_id.in_(user_journals)))
+    contents = (await db.scalars(select(JournalDB.content).where(JournalDB.user_id == user_id))).all()
+    await db.execute(delete(JournalDB).where(JournalDB.user_id == user_id))
+    await db.run_sync(forget_feedback, contents)
+    await db.delete(db_user)
+    await db.run_sync(bump_data_version, user_scope(user_id))
+    await db.commit()
+    invalidate_principal(user_id)
+    return {"msg": "Deleted"}
+
+@async_router.post("/login")
+async def login_async(login: LoginRequest, db: AsyncSession = Depends(get_async_db), read_db: AsyncSession = Depends(get_async_read_db)):
+    user = (await read_db.execute(select(UserDB).where(UserDB.email == login.email))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    verified, new_hash = await run_password_job(verify_and_update_password, login.password, user.password_hash)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        await db.execute(update(UserDB).where(UserDB.id == user.id).values(password_hash=new_hash))
+        await db.commit()
+
+    token = create_access_token(data={"sub": str(user.id)})
+    return {
+        "message": "Login successful",
+        "user_id": user.id,
+        "display_name": user.display_name,
+        "token": token
+    }
+
+@async_router.post("/moods/", response_model=dict)
+async def create_mood_async(
+    mood: MoodBase,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    db_mood = MoodDB(
+        user_id=current_user.id,
+        mood=mood.mood.value,
+        mood_date=mood.mood_date,
+        created_at=datetime.utcnow()
+    )
+    db.add(db_mood)
+    try:
+        await db.flush()
+        await db.run_sync(record_mood, current_user.id, db_mood.mood, db_mood.mood_date)
+        await db.run_sync(bump_data_version, user_scope(current_user.id))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"You've already logged a mood for {mood.mood_date}."
+        )
+    return {
+        "mood": Mood.model_validate(db_mood),
+        "prompt": MOOD_PROMPT_MAP[mood.mood.value]
+    }
+
+@async_router.get("/moods/", response_model=List[Mood], response_class=ORJSONResponse)
+async def list_moods_async(
+    request: Request,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user_async)
+):
+    etag = await db.run_sync(sql_etag, request, user_scope(current_user.id))
+    query = apply_keyset(select(*MOOD_COLUMNS).where(MoodDB.user_id == current_user.id), MoodDB.mood_date, MoodDB.id, page.request())
+    rows, next_cursor = finish_page((await db.execute(query)).all(), "mood_date", page)
+    return rows_response(rows, MOOD_FIELDS, next_cursor, etag=etag)
+
+@async_router.get("/prompts/", response_model=List[Prompt], response_class=ORJSONResponse)
+async def list_prompts_async(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    etag = await db.run_sync(sql_etag, request, PROMPTS_SCOPE)
+    return rows_response((await db.execute(select(*PROMPT_COLUMNS))).all(), PROMPT_FIELDS, etag=etag)
+
+@async_router.get("/prompts/{prompt_id}", response_model=Prompt)
+async def get_prompt_async(prompt_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    prompt = await db.get(PromptDB, prompt_id)
+    if not prompt:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return prompt
+
+async def _owned_journal(db: AsyncSession, journal_id: int, user_id: int) -> JournalDB:
+    journal = (await db.execute(
+        select(JournalDB).where(JournalDB.id == journal_id, JournalDB.user_id == user_id)
+    )).scalars().first()
+    if not journal:
+        raise HTTPException(status_code=404, detail="Journal not found")
+    return journal
+
+async def _check_prompt_exists(db: AsyncSession, prompt_id: Optional[int]):
+    if prompt_id and await db.get(PromptDB, prompt_id) is None:
+        raise HTTPException(status_code=400, detail="Prompt does not exist")
+
+@async_router.post("/journal/", response_model=Journal)
+async def create_journal_async(journal: JournalCreate, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user_async)):
+    await _check_prompt_exists(db, journal.prompt_id)
+    db_journal = JournalDB(
+        user_id=current_user.id,
+        prompt_id=journal.prompt_id,
+        entry_date=journal.entry_date,
+        content=journal.content,
+        created_at=datetime.utcnow()
     )
+    db.add(db_journal)
+    await db.flush()
+    if FEEDBACK_PRECOMPUTE:
+        await db.run_sync(queue_feedback_job, db_journal.id)
+    await db.run_sync(bump_data_version, user_scope(current_user.id))
+    await db.commit()
+    if FEEDBACK_PRECOMPUTE:
+        submit_feedback_job(engine, db_journal.id)
+    return db_journal
+
+@async_router.get("/journal/", response_model=List[Journal], response_class=ORJSONResponse)
+async def list_journals_async(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_user_async)):
+    etag = await db.run_sync(sql_etag, request, user_scope(current_user.id))
+    query = apply_keyset(select(*JOURNAL_COLUMNS).where(JournalDB.user_id == current_user.id), JournalDB.entry_date, JournalDB.id, page.request())
+    rows, next_cursor = finish_page((await db.execute(query)).all(), "entry_date", page)
+    return rows_response(rows, JOURNAL_FIELDS, next_cursor, etag=etag)
+
+@async_router.get("/journal/{journal_id}", response_model=Journal)
+async def get_journal_async(journal_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: Principal = Depends(get_current_user_async)):
+    return await _owned_journal(db, journal_id, current_user.id)
+
+@async_router.put("/journal/{journal_id}", response_model=Journal)
+async def update_journal_async(journal_id: int, journal: JournalBase, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user_async)):
+    db_journal = await _owned_journal(db, journal_id, current_user.id)
+    await _check_prompt_exists(db, journal.prompt_id)
+    db_journal.prompt_id = journal.prompt_id
+    db_journal.entry_date = journal.entry_date
+    db_journal.content = journal.content
+    if FEEDBACK_PRECOMPUTE:
+        await db.run_sync(queue_feedback_job, db_journal.id)
+    await db.run_sync(bump_data_version, user_scope(current_user.id))
+    await db.commit()
+    if FEEDBACK_PRECOMPUTE:
+        submit_feedback_job(engine, db_journal.id)
+    return db_journal
+
+@async_router.delete("/journal/{journal_id}")
+async def delete_journal_async(journal_id: int, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_user_async)):
+    journal = await _owned_journal(db, journal_id, current_user.id)
+    await db.execute(delete(FeedbackJobDB).where(FeedbackJobDB.journal_id == journal_id))
+    await db.delete(journal)
+    await db.flush()
+    await db.run_sync(forget_feedback, [journal.content])
+    await db.run_sync(bump_data_version, user_scope(current_user.id))
+    await db.commit()
+    return {"msg": "Deleted"}
 
-    result = response.choices[0].message.content.strip()
-    return {"feedback": result}
+def use_async_routes(target: FastAPI, router: APIRouter):
+    """Swap each sync route for its async twin in place, keeping match order."""
+    replacements = {(r.path, frozenset(r.methods)): r for r in router.routes}
+    target.router.routes = [
+        replacements.pop((r.path, frozenset(r.methods)), r) if isinstance(r, APIRoute) else r
+        for r in target.router.routes
+    ]
+    if replacements:
+        raise RuntimeError(f"Async routes without a sync counterpart: {sorted(p for p, _ in replacements)}")
+
+if DB_MODE == "async":
+    use_async_routes(app, async_router)
+
+@app.on_event("shutdown")
+async def dispose_async_engines():
+    if async_engine is not None:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
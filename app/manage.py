@@ -0,0 +1,55 @@
+import argparse
+
+from migrations import MIGRATIONS, applied_versions, run_migrations
+
+
+def cmd_migrate(args):
+    from main import engine
+    applied = run_migrations(engine, target=args.target)
+    if applied:
+        for version in applied:
+            print(f"Applied migration {version}")
+    else:
+        print("Database is up to date.")
+
+
+def cmd_showmigrations(args):
+    from main import engine
+    applied = set(applied_versions(engine))
+    for migration in MIGRATIONS:
+        mark = "x" if migration.version in applied else " "
+        print(f"[{mark}] {migration.version:04d} {migration.description}")
+
+
+def cmd_rebuild_mood_trends(args):
+    from main import SessionLocal, rebuild_mood_trends
+    db = SessionLocal()
+    try:
+        rebuild_mood_trends(db, args.user)
+        db.commit()
+    finally:
+        db.close()
+    print("Rebuilt mood trends" + (f" for user {args.user}." if args.user else "."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MindfulDay management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate.add_argument("--target", type=int, help="stop after this migration version")
+    migrate.set_defaults(func=cmd_migrate)
+
+    show = commands.add_parser("showmigrations", help="list migrations and whether they are applied")
+    show.set_defaults(func=cmd_showmigrations)
+
+    trends = commands.add_parser("rebuild-mood-trends", help="recompute mood trend aggregates from the moods table")
+    trends.add_argument("--user", type=int, help="only rebuild this user's aggregates")
+    trends.set_defaults(func=cmd_rebuild_mood_trends)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import pickle
+import struct
+import threading
+import zlib
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+# =====================
+#   Write-Ahead Log and Snapshots
+# =====================
+# Durability for memstore. Every mutation is appended to a log segment as a
+# length- and CRC-framed pickle record; its log sequence number (LSN) is the
+# segment's first LSN plus its position. A snapshot written at LSN n holds the
+# state after records 0..n-1 and starts a fresh segment at n, after which older
+# snapshots and segments are deleted. Recovery loads the newest snapshot and
+# replays the segments after it, stopping at the first torn or corrupt record.
+#
+# Durability levels:
+#   off    - nothing is written; state lives only in memory
+#   async  - records are buffered and fsynced every fsync interval; a crash can
+#            lose up to one interval of writes, callers never wait
+#   group  - callers wait until a background flusher has fsynced their record;
+#            concurrent writers share one fsync (group commit)
+#   sync   - each writer fsyncs before returning
+#
+# Only open data directories you trust: records are pickles.
+
+DURABILITY_LEVELS = ("off", "async", "group", "sync")
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+_SEGMENT_SUFFIX = ".wal"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+def _segment_path(directory: str, start_lsn: int) -> str:
+    return os.path.join(directory, f"{start_lsn:020d}{_SEGMENT_SUFFIX}")
+
+
+def _snapshot_path(directory: str, lsn: int) -> str:
+    return os.path.join(directory, f"{_SNAPSHOT_PREFIX}{lsn:020d}.bin")
+
+
+def list_segments(directory: str) -> List[Tuple[int, str]]:
+    return sorted(
+        (int(name[:-len(_SEGMENT_SUFFIX)]), os.path.join(directory, name))
+        for name in os.listdir(directory) if name.endswith(_SEGMENT_SUFFIX)
+    )
+
+
+def list_snapshots(directory: str) -> List[Tuple[int, str]]:
+    return sorted(
+        (int(name[len(_SNAPSHOT_PREFIX):-4]), os.path.join(directory, name))
+        for name in os.listdir(directory) if name.startswith(_SNAPSHOT_PREFIX) and name.endswith(".bin")
+    )
+
+
+def _fsync_directory(directory: str):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def encode_record(record: Any) -> bytes:
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: str) -> Iterator[Tuple[Any, int]]:
+    """Yield (record, end offset) for each intact record; stop at a torn or corrupt tail."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, offset)
+        start, end = offset + _HEADER.size, offset + _HEADER.size + length
+        if end > len(data) or zlib.crc32(data[start:end]) != crc:
+            return
+        yield pickle.loads(data[start:end]), end
+        offset = end
+
+
+def write_snapshot(directory: str, lsn: int, state: Any):
+    """Atomically write a snapshot, then drop the snapshots and segments it supersedes."""
+    path = _snapshot_path(directory, lsn)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_directory(directory)
+    for snapshot_lsn, old in list_snapshots(directory):
+        if snapshot_lsn < lsn:
+            os.remove(old)
+    for segment_lsn, old in list_segments(directory):
+        if segment_lsn < lsn:
+            os.remove(old)
+
+
+def read_latest_snapshot(directory: str) -> Tuple[int, Optional[Any]]:
+    snapshots = list_snapshots(directory)
+    if not snapshots:
+        return 0, None
+    lsn, path = snapshots[-1]
+    with open(path, "rb") as f:
+        return lsn, pickle.load(f)
+
+
+def replay(directory: str, from_lsn: int, apply: Callable[[Any], None]) -> int:
+    """Apply records with LSN >= from_lsn and return the next LSN.
+
+    A torn tail on the last segment (a crash mid-append) is truncated so new
+    writes start clean; damage anywhere else is an error.
+    """
+    next_lsn = from_lsn
+    segments = list_segments(directory)
+    for position, (start_lsn, path) in enumerate(segments):
+        lsn, good_until = start_lsn, 0
+        for record, end in read_segment(path):
+            if lsn >= from_lsn:
+                apply(record)
+            lsn += 1
+            good_until = end
+        next_lsn = max(next_lsn, lsn)
+        if good_until < os.path.getsize(path):
+            if position != len(segments) - 1:
+                raise ValueError(f"Corrupt write-ahead log segment {path}")
+            with open(path, "r+b") as f:
+                f.truncate(good_until)
+    return next_lsn
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str, next_lsn: int, durability: str = "group", fsync_interval: float = 0.005):
+        if durability not in DURABILITY_LEVELS or durability == "off":
+            raise ValueError(f"WriteAheadLog needs durability async, group or sync, not {durability!r}")
+        self.directory = directory
+        self.durability = durability
+        self.fsync_interval = fsync_interval
+        self.next_lsn = next_lsn
+        self.durable_lsn = next_lsn
+        self._cond = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._file = open(_segment_path(directory, next_lsn), "ab")
+        self._closed = False
+        self._flusher = None
+        if durability in ("async", "group"):
+            self._wakeup = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_loop, name="memstore-wal-flusher", daemon=True)
+            self._flusher.start()
+
+    def append(self, record: Any) -> int:
+        """Buffer a record and return its LSN; call wait(lsn) to make it durable."""
+        data = encode_record(record)
+        with self._cond:
+            self._file.write(data)
+            lsn = self.next_lsn
+            self.next_lsn += 1
+            return lsn
+
+    def wait(self, lsn: int):
+        if self.durability == "sync":
+            self._sync(lsn)
+        elif self.durability == "group":
+            with self._cond:
+                while self.durable_lsn <= lsn and not self._closed:
+                    self._wakeup.set()
+                    self._cond.wait()
+
+    def rotate(self, start_lsn: int):
+        """Make everything so far durable and continue in a new segment starting at start_lsn."""
+        with self._sync_lock, self._cond:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self.next_lsn = self.durable_lsn = start_lsn
+            self._file = open(_segment_path(self.directory, start_lsn), "ab")
+            self._cond.notify_all()
+
+    def close(self):
+        with self._sync_lock, self._cond:
+            if self._closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.durable_lsn = self.next_lsn
+            self._closed = True
+            self._file.close()
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._wakeup.set()
+            self._flusher.join()
+
+    def _sync(self, lsn: Optional[int] = None):
+        """fsync outside the append lock, so writers keep appending while the disk works.
+
+        One fsync covers every record appended before it started; a caller that
+        finds its record already covered returns without syncing again.
+        """
+        with self._sync_lock:
+            with self._cond:
+                if self._closed or (lsn is not None and self.durable_lsn > lsn):
+                    return
+                self._file.flush()
+                target = self.next_lsn
+                fd = self._file.fileno()
+            os.fsync(fd)
+            with self._cond:
+                self.durable_lsn = max(self.durable_lsn, target)
+                self._cond.notify_all()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.fsync_interval)
+            self._wakeup.clear()
+            if self.durable_lsn < self.next_lsn:
+                self._sync()
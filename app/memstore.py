@@ -0,0 +1,324 @@
+import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import memlog
+
+# =====================
+#   In-Memory Storage Engine
+# =====================
+# Tables keep rows in an id-keyed dict (insertion order == id order) and maintain
+# secondary indexes on every write, so lookups by id, unique key or foreign key
+# cost the same at a thousand rows as at a million. Rows are __slots__ objects:
+# roughly a third the size of the equivalent dict, and readable by Pydantic
+# models with from_attributes.
+#
+# A store opened on a data directory logs every mutation to memlog's write-ahead
+# log and snapshots itself every `snapshot_every` records, so it survives
+# restarts. Mutate inside `store.write()` to get the configured durability.
+
+
+class Row:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+def row_class(name: str, fields: Tuple[str, ...]) -> type:
+    slots = ("id",) + tuple(fields)
+    cls = type(f"{name.title()}Row", (Row,), {"__slots__": slots})
+    # Positional constructor for bulk loads, generated the way namedtuple builds
+    # __new__: a per-field setattr loop is about three times slower.
+    namespace = {"new": object.__new__, "cls": cls}
+    body = "".join(f"    row.{field} = {field}\n" for field in slots)
+    exec(f"def from_values({', '.join(slots)}):\n    row = new(cls)\n{body}    return row\n", namespace)
+    cls.from_values = staticmethod(namespace["from_values"])
+    return cls
+
+
+# A unique key is one field or a tuple of fields (a composite key such as
+# ("user_id", "mood_date")); rows with a None in the key are not indexed.
+Key = Union[str, Tuple[str, ...]]
+
+
+def key_value(key: Key, get: Callable[[str], Any]):
+    if isinstance(key, str):
+        return get(key)
+    values = tuple(get(field) for field in key)
+    return None if None in values else values
+
+
+class Table:
+    def __init__(self, name: str, fields: Iterable[str], unique: Iterable[Key] = (), indexes: Iterable[str] = ()):
+        self.name = name
+        self.fields = tuple(fields)
+        self.row_type = row_class(name, self.fields)
+        self.rows: Dict[int, Row] = {}
+        self.next_id = 1
+        # unique key -> {value: id}; indexed field -> {value: {id: None}} (an
+        # insertion-ordered set, so index scans come back in id order).
+        self.unique: Dict[Key, Dict[Any, int]] = {key: {} for key in unique}
+        self.indexes: Dict[str, Dict[Any, Dict[int, None]]] = {field: {} for field in indexes}
+        # Set by MemoryStore; receives one record per mutation.
+        self.log: Optional[Callable[[tuple], None]] = None
+        # Replaced by the store's lock, so index scans never see a write half-applied.
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Row]:
+        with self.lock:
+            return iter(list(self.rows.values()))
+
+    def get(self, id_: int) -> Optional[Row]:
+        return self.rows.get(id_)
+
+    def get_by(self, key: Key, value) -> Optional[Row]:
+        with self.lock:
+            id_ = self.unique[key].get(value)
+            return None if id_ is None else self.rows[id_]
+
+    def find(self, field: str, value) -> List[Row]:
+        with self.lock:
+            return [self.rows[id_] for id_ in self.indexes[field].get(value, ())]
+
+    def ids_by(self, field: str, value) -> List[int]:
+        with self.lock:
+            return list(self.indexes[field].get(value, ()))
+
+    def insert(self, values: Dict[str, Any], id_: Optional[int] = None) -> Row:
+        id_ = self.next_id if id_ is None else id_
+        for key, index in self.unique.items():
+            value = key_value(key, values.get)
+            if value is not None and value in index:
+                raise KeyError(f"{self.name}.{key} already exists: {value!r}")
+        row = self.row_type(id=id_, **values)
+        self.rows[id_] = row
+        self.next_id = max(self.next_id, id_ + 1)
+        self._index(row)
+        if self.log is not None:
+            self.log(("insert", self.name, id_, values))
+        return row
+
+    def update(self, id_: int, changes: Dict[str, Any]) -> Row:
+        row = self.rows[id_]
+        current = partial(getattr, row)
+        for key, index in self.unique.items():
+            value = key_value(key, lambda field: changes[field] if field in changes else current(field))
+            if value is not None and value != key_value(key, current) and value in index:
+                raise KeyError(f"{self.name}.{key} already exists: {value!r}")
+        self._unindex(row)
+        for field, value in changes.items():
+            setattr(row, field, value)
+        self._index(row)
+        if self.log is not None:
+            self.log(("update", self.name, id_, changes))
+        return row
+
+    def delete(self, id_: int) -> Optional[Row]:
+        row = self.rows.pop(id_, None)
+        if row is not None:
+            self._unindex(row)
+            if self.log is not None:
+                self.log(("delete", self.name, id_))
+        return row
+
+    def delete_by(self, field: str, value) -> List[Row]:
+        """Delete every row whose indexed `field` equals `value`; cost is O(matches)."""
+        return [self.delete(id_) for id_ in self.ids_by(field, value)]
+
+    def load(self, rows: Iterable[tuple], next_id: int):
+        """Replace the contents with `rows` (id, then one value per field) and rebuild the indexes."""
+        self.clear()
+        make = self.row_type.from_values
+        self.rows = {row[0]: make(*row) for row in rows}
+        self.next_id = max(next_id, max(self.rows, default=0) + 1)
+        for row in self.rows.values():
+            self._index(row)
+
+    def clear(self):
+        self.rows.clear()
+        self.next_id = 1
+        for index in self.unique.values():
+            index.clear()
+        for index in self.indexes.values():
+            index.clear()
+        if self.log is not None:
+            self.log(("clear", self.name))
+
+    def _index(self, row: Row):
+        get = partial(getattr, row)
+        for key, index in self.unique.items():
+            value = key_value(key, get)
+            if value is not None:
+                index[value] = row.id
+        for field, index in self.indexes.items():
+            value = getattr(row, field)
+            if value is not None:
+                index.setdefault(value, {})[row.id] = None
+
+    def _unindex(self, row: Row):
+        get = partial(getattr, row)
+        for key, index in self.unique.items():
+            index.pop(key_value(key, get), None)
+        for field, index in self.indexes.items():
+            value = getattr(row, field)
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(row.id, None)
+                if not bucket:
+                    del index[value]
+
+
+class MemoryStore:
+    """A set of tables sharing one lock: writers hold it across multi-step
+    operations (check, then write) and index lookups take it to read a consistent copy."""
+
+    def __init__(self):
+        self.tables: Dict[str, Table] = {}
+        self.lock = threading.RLock()
+        self.directory: Optional[str] = None
+        self.wal: Optional[memlog.WriteAheadLog] = None
+        self.snapshot_every = 0
+        self._since_snapshot = 0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+
+    def create_table(self, name: str, fields: Iterable[str], unique: Iterable[Key] = (), indexes: Iterable[str] = ()) -> Table:
+        table = Table(name, fields, unique, indexes)
+        table.log = self._log
+        table.lock = self.lock
+        self.tables[name] = table
+        return table
+
+    def __getitem__(self, name: str) -> Table:
+        return self.tables[name]
+
+    def clear(self):
+        with self.write():
+            for table in self.tables.values():
+                table.clear()
+
+    @contextmanager
+    def write(self):
+        """Hold the lock for a read-modify-write, then wait until its records are durable."""
+        local = self._local
+        with self.lock:
+            depth = getattr(local, "depth", 0)
+            if depth == 0:
+                local.lsn = None
+            local.depth = depth + 1
+            try:
+                yield
+            finally:
+                local.depth = depth
+            lsn = local.lsn
+        if depth == 0 and lsn is not None and self.wal is not None:
+            self.wal.wait(lsn)
+            if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+                self._start_snapshot()
+
+    def _log(self, record: tuple):
+        if self.wal is not None:
+            self._local.lsn = self.wal.append(record)
+            self._since_snapshot += 1
+
+    # ---- persistence ----
+
+    def open(self, directory: str, durability: str = "group", fsync_interval: float = 0.005, snapshot_every: int = 100_000):
+        """Load the latest snapshot and log tail from `directory`, then log new writes there."""
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            snapshot_lsn, state = memlog.read_latest_snapshot(directory)
+            if state is not None:
+                self._restore(state)
+            next_lsn = memlog.replay(directory, snapshot_lsn, self._apply)
+            self.directory = directory
+            self.snapshot_every = snapshot_every
+            self._since_snapshot = next_lsn - snapshot_lsn
+            self.wal = memlog.WriteAheadLog(directory, next_lsn, durability, fsync_interval)
+
+    def snapshot(self):
+        """Write a snapshot of the current state and start a new log segment after it."""
+        if self.wal is None:
+            return
+        with self.lock:
+            lsn = self.wal.next_lsn
+            state = self._dump()
+            self.wal.rotate(lsn)
+            self._since_snapshot = 0
+        # Rows were copied to tuples under the lock; pickling and fsync happen
+        # outside it so writers only pause for the copy.
+        memlog.write_snapshot(self.directory, lsn, state)
+
+    def close(self, snapshot: bool = True):
+        """Stop logging, optionally snapshotting first so the next open has no log to replay."""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self.wal is None:
+            return
+        if snapshot:
+            self.snapshot()
+        self.wal.close()
+        self.wal = None
+
+    def _start_snapshot(self):
+        with self.lock:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return
+            # Count the records as handled now so writers don't pile up more threads.
+            self._since_snapshot = 0
+            self._snapshot_thread = threading.Thread(target=self.snapshot, name="memstore-snapshot", daemon=True)
+            self._snapshot_thread.start()
+
+    def _dump(self) -> Dict[str, Any]:
+        tables = {}
+        for name, table in self.tables.items():
+            get = attrgetter("id", *table.fields)
+            tables[name] = {
+                "fields": table.fields,
+                "next_id": table.next_id,
+                "rows": [get(row) for row in table.rows.values()],
+            }
+        return {"version": 1, "tables": tables}
+
+    def _restore(self, state: Dict[str, Any]):
+        for name, data in state["tables"].items():
+            table = self.tables.get(name)
+            if table is None:
+                continue
+            fields = data["fields"]
+            if tuple(fields) == table.fields:
+                table.load(data["rows"], data["next_id"])
+                continue
+            # The table's fields changed since the snapshot: map values by name.
+            table.clear()
+            for row in data["rows"]:
+                table.insert(dict(zip(fields, row[1:])), id_=row[0])
+            table.next_id = max(table.next_id, data["next_id"])
+
+    def _apply(self, record: tuple):
+        op, name = record[0], record[1]
+        table = self.tables.get(name)
+        if table is None:
+            return
+        if op == "insert":
+            table.insert(record[3], id_=record[2])
+        elif op == "update":
+            table.update(record[2], record[3])
+        elif op == "delete":
+            table.delete(record[2])
+        elif op == "clear":
+            table.clear()
@@ -0,0 +1,219 @@
+import bisect
+import math
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# =====================
+#   Metrics
+# =====================
+# In-process counters, gauges and histograms rendered in the Prometheus text
+# exposition format, so any scraper (or curl) can read them from /metrics
+# without a metrics service or client library. Values are per process: with
+# several workers, each one reports its own.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    """A value that can go up and down, such as requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """Observations counted into cumulative `le` buckets, plus their count and sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), total count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), count, total) for key, (counts, count, total) in self._series.items())
+        names = self.label_names + ("le",)
+        lines = []
+        for key, counts, count, total in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# ---- per-request query accounting ----
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request. Starlette copies the
+# context into its thread pool, so queries from sync handlers land here too;
+# work outside a request (background jobs, startup) sees None.
+current_queries: ContextVar[Optional[QueryStats]] = ContextVar("current_queries", default=None)
+
+# Set by ProfilingMiddleware (profiling.py) for a profiled request. Each statement
+# is appended as (started, seconds, sql); parameters are left out because they
+# can carry journal text.
+current_statements: ContextVar[Optional[list]] = ContextVar("current_statements", default=None)
+
+
+def track_queries(engine, on_query: Callable[[float], None]):
+    """Time every statement on a (sync) engine, add it to the current request's
+    QueryStats (and statement log, when profiled) and report its duration to
+    `on_query`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        seconds = time.perf_counter() - started
+        stats = current_queries.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += seconds
+        statements = current_statements.get()
+        if statements is not None:
+            statements.append((started, seconds, statement))
+        on_query(seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times each HTTP request, including a streamed body,
+    and hands (scope, status, seconds, QueryStats) to `on_request`."""
+
+    def __init__(self, app, on_request: Callable[[dict, int, float, QueryStats], None], in_progress: Optional[Gauge] = None):
+        self.app = app
+        self.on_request = on_request
+        self.in_progress = in_progress
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        stats = QueryStats()
+        token = current_queries.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        if self.in_progress is not None:
+            self.in_progress.inc()
+        began = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - began
+            current_queries.reset(token)
+            if self.in_progress is not None:
+                self.in_progress.dec()
+            self.on_request(scope, status, seconds, stats)
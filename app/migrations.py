@@ -0,0 +1,252 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# =====================
+#   Schema Migrations
+# =====================
+# Each migration is applied once, in version order, and recorded in
+# schema_migrations. Statements are idempotent (IF NOT EXISTS) so databases created
+# before this runner existed, by Base.metadata.create_all or schema.sql, upgrade
+# cleanly. Never edit a released migration; append a new one instead, and keep
+# the SQLAlchemy models in main.py in step with the resulting schema.
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+
+
+# Trend buckets as SQL over moods, matching main.MOOD_SCORES and main.bucket_start
+# (weeks start on Monday; SQLite's %w is 0 for Sunday).
+MOOD_SCORE_SQL = (
+    "CASE mood WHEN 'very_sad' THEN 1 WHEN 'angry' THEN 2 WHEN 'sad' THEN 2 "
+    "WHEN 'neutral' THEN 3 WHEN 'happy' THEN 4 WHEN 'very_happy' THEN 5 END"
+)
+TREND_BUCKET_STARTS = {
+    "day": "mood_date",
+    "week": "date(mood_date, '-' || ((CAST(strftime('%w', mood_date) AS INTEGER) + 6) % 7) || ' days')",
+    "month": "date(mood_date, 'start of month')",
+}
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", (
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER NOT NULL,
+            email VARCHAR NOT NULL,
+            password_hash VARCHAR NOT NULL,
+            display_name VARCHAR,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME,
+            PRIMARY KEY (id),
+            UNIQUE (email)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+        """CREATE TABLE IF NOT EXISTS prompts (
+            id INTEGER NOT NULL,
+            prompt_text VARCHAR NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_prompts_id ON prompts (id)",
+        """CREATE TABLE IF NOT EXISTS moods (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            mood VARCHAR NOT NULL,
+            mood_date DATE NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_moods_id ON moods (id)",
+        """CREATE TABLE IF NOT EXISTS journal (
+            id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            prompt_id INTEGER,
+            entry_date DATE NOT NULL,
+            content TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(user_id) REFERENCES users (id),
+            FOREIGN KEY(prompt_id) REFERENCES prompts (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_journal_id ON journal (id)",
+    )),
+    Migration(2, "feedback cache and job tables", (
+        """CREATE TABLE IF NOT EXISTS feedback_cache (
+            "key" VARCHAR(64) NOT NULL,
+            model VARCHAR NOT NULL,
+            prompt_version VARCHAR NOT NULL,
+            feedback TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY ("key")
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_cache_created_at ON feedback_cache (created_at)",
+        """CREATE TABLE IF NOT EXISTS feedback_jobs (
+            id INTEGER NOT NULL,
+            journal_id INTEGER NOT NULL,
+            status VARCHAR NOT NULL,
+            attempts INTEGER NOT NULL,
+            last_error TEXT,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            UNIQUE (journal_id),
+            FOREIGN KEY(journal_id) REFERENCES journal (id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_jobs_id ON feedback_jobs (id)",
+        "CREATE INDEX IF NOT EXISTS ix_feedback_jobs_status ON feedback_jobs (status)",
+    )),
+    Migration(3, "index journal by owner and entry date", (
+        # Serves per-user listing, date-range filters and the (entry_date, id)
+        # keyset without touching the table.
+        "CREATE INDEX IF NOT EXISTS ix_journal_user_entry_date ON journal (user_id, entry_date, id)",
+    )),
+    Migration(4, "one mood per user per day", (
+        # Keep the earliest entry for any day logged twice before the constraint existed.
+        """DELETE FROM moods WHERE id NOT IN (
+            SELECT MIN(id) FROM moods GROUP BY user_id, mood_date
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_moods_user_date ON moods (user_id, mood_date)",
+    )),
+    Migration(5, "mood trend aggregates", (
+        # Kept current as moods are logged. Moods that predate the tables are
+        # folded in here with the same aggregation main.rebuild_mood_trends uses.
+        """CREATE TABLE IF NOT EXISTS mood_buckets (
+            user_id INTEGER NOT NULL,
+            period VARCHAR NOT NULL,
+            bucket_start DATE NOT NULL,
+            entries INTEGER NOT NULL,
+            score_total INTEGER NOT NULL,
+            angry INTEGER NOT NULL,
+            very_sad INTEGER NOT NULL,
+            sad INTEGER NOT NULL,
+            neutral INTEGER NOT NULL,
+            happy INTEGER NOT NULL,
+            very_happy INTEGER NOT NULL,
+            PRIMARY KEY (user_id, period, bucket_start),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS mood_streaks (
+            user_id INTEGER NOT NULL,
+            run_start DATE NOT NULL,
+            run_end DATE NOT NULL,
+            longest INTEGER NOT NULL,
+            PRIMARY KEY (user_id),
+            FOREIGN KEY(user_id) REFERENCES users (id)
+        )""",
+        # A full recompute, so tables that schema.sql or create_all made earlier are safe too.
+        "DELETE FROM mood_buckets",
+        "DELETE FROM mood_streaks",
+        *(
+            f"""INSERT INTO mood_buckets
+                (user_id, period, bucket_start, entries, score_total, angry, very_sad, sad, neutral, happy, very_happy)
+            SELECT user_id, '{period}', {start}, COUNT(*), SUM({MOOD_SCORE_SQL}),
+                   SUM(mood = 'angry'), SUM(mood = 'very_sad'), SUM(mood = 'sad'),
+                   SUM(mood = 'neutral'), SUM(mood = 'happy'), SUM(mood = 'very_happy')
+            FROM moods GROUP BY user_id, {start}"""
+            for period, start in TREND_BUCKET_STARTS.items()
+        ),
+        # Streaks from the day buckets: consecutive days share julianday - row number,
+        # and each user keeps their latest run plus their longest.
+        """INSERT INTO mood_streaks (user_id, run_start, run_end, longest)
+        SELECT user_id, run_start, run_end, longest FROM (
+            SELECT user_id, run_start, run_end,
+                   MAX(days) OVER (PARTITION BY user_id) AS longest,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY run_end DESC) AS latest
+            FROM (
+                SELECT user_id, MIN(bucket_start) AS run_start, MAX(bucket_start) AS run_end, COUNT(*) AS days
+                FROM (
+                    SELECT user_id, bucket_start,
+                           julianday(bucket_start) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY bucket_start) AS island
+                    FROM mood_buckets WHERE period = 'day'
+                )
+                GROUP BY user_id, island
+            )
+        ) WHERE latest = 1""",
+    )),
+    Migration(6, "full-text index over journal content", (
+        # External-content FTS5 table: journal stays the source of truth and the
+        # triggers keep the index in step with every insert, update and delete.
+        # user_id is indexed too, so a per-user search intersects two posting
+        # lists instead of ranking every user's matches and filtering afterwards.
+        """CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+            content, user_id, content='journal', content_rowid='id', tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS journal_fts_insert AFTER INSERT ON journal BEGIN
+            INSERT INTO journal_fts (rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS journal_fts_delete AFTER DELETE ON journal BEGIN
+            INSERT INTO journal_fts (journal_fts, rowid, content, user_id) VALUES ('delete', old.id, old.content, old.user_id);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS journal_fts_update AFTER UPDATE OF content, user_id ON journal BEGIN
+            INSERT INTO journal_fts (journal_fts, rowid, content, user_id) VALUES ('delete', old.id, old.content, old.user_id);
+            INSERT INTO journal_fts (rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+        END""",
+        "INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')",
+    )),
+    Migration(7, "data versions for conditional GETs", (
+        """CREATE TABLE IF NOT EXISTS data_versions (
+            scope VARCHAR NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (scope)
+        )""",
+    )),
+    # Lets a journal delete check whether other journals share its text (and so
+    # its cached feedback) without scanning the table.
+    Migration(8, "index journal by content", (
+        "CREATE INDEX IF NOT EXISTS ix_journal_content ON journal (content)",
+    )),
+]
+
+
+def _ensure_version_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            """CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER NOT NULL PRIMARY KEY,
+                description VARCHAR NOT NULL,
+                applied_at DATETIME NOT NULL
+            )"""
+        ))
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def current_version(engine: Engine) -> int:
+    versions = applied_versions(engine)
+    return versions[-1] if versions else 0
+
+
+def pending_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    applied = set(applied_versions(engine))
+    return [
+        m for m in MIGRATIONS
+        if m.version not in applied and (target is None or m.version <= target)
+    ]
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: latest); return the versions applied."""
+    applied = []
+    for migration in pending_migrations(engine, target):
+        with engine.begin() as conn:
+            for statement in migration.statements:
+                conn.execute(text(statement))
+            # OR IGNORE: another worker may have applied the same migration concurrently.
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": migration.version, "d": migration.description, "t": datetime.utcnow()}
+            )
+        applied.append(migration.version)
+    return applied
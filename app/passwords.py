@@ -0,0 +1,27 @@
+import os
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+# Kept free of app imports: these functions run inside the password-hashing
+# process pool, whose workers import only this module.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Hashes below the configured cost are flagged by verify_and_update, which lets
+# login transparently upgrade them after a cost increase.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a replacement hash if the stored one is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
@@ -0,0 +1,285 @@
+import hmac
+import json
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import current_statements
+
+# =====================
+#   Request profiling
+# =====================
+# Opt-in profiles of single HTTP requests, written to a directory as speedscope
+# JSON (https://www.speedscope.app) or a pstats file, each with a JSON sidecar
+# listing the request's SQL statements and their timings.
+#
+# cProfile only sees the thread it is enabled on, and most handlers here run on
+# Starlette's thread pool, so profiles come from a sampler thread instead: it
+# reads every thread's stack each `interval` and keeps a stack when it belongs
+# to the request. On the event loop that means the request's own coroutine is
+# running; on a pool thread, that the matched route's endpoint or one of its
+# dependencies is on the stack. Concurrent requests to the same route therefore
+# share samples from the pool; profile on a quiet instance when that matters.
+# While any profile runs, the interpreter's GIL switch interval is lowered to
+# the sampling interval, or a busy handler would only let the sampler in every
+# 5 ms. Requests that are not picked cost a header scan and a random() call.
+
+FORMATS = ("speedscope", "pstats")
+
+FrameKey = Tuple[str, int, str]
+
+
+def _frame_key(code) -> FrameKey:
+    return code.co_filename, code.co_firstlineno, getattr(code, "co_qualname", code.co_name)
+
+
+def _dependency_codes(dependant, codes: set) -> set:
+    call = dependant.call
+    code = getattr(call, "__code__", None) or getattr(getattr(call, "__call__", None), "__code__", None)
+    if code is not None:
+        codes.add(code)
+    for dependency in dependant.dependencies:
+        _dependency_codes(dependency, codes)
+    return codes
+
+
+class Sampler(threading.Thread):
+    """Samples the stacks that belong to one request until stopped (or
+    `max_seconds` have passed). Stacks are kept root-first, starting at the
+    request's own frame, with the wall time since the previous sample."""
+
+    def __init__(self, interval: float, loop_thread: int, request_frame, route_codes, max_seconds: float = 60.0):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.request_frame = request_frame
+        self.route_codes = route_codes  # () -> set of code objects, empty until routed
+        self.max_seconds = max_seconds
+        self.samples: Dict[int, List[Tuple[Tuple[FrameKey, ...], float]]] = defaultdict(list)
+        self._stop_event = threading.Event()
+
+    # Switch interval shared by every running sampler: (active samplers, interval to restore).
+    _switching = [0, None]
+    _switching_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._switching_lock:
+            if self._switching[0] == 0:
+                self._switching[1] = sys.getswitchinterval()
+            self._switching[0] += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        super().start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        with self._switching_lock:
+            self._switching[0] -= 1
+            if self._switching[0] == 0:
+                sys.setswitchinterval(self._switching[1])
+
+    def run(self) -> None:
+        began = last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            codes = self.route_codes()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = self._request_stack(thread_id, frame, codes)
+                if stack:
+                    self.samples[thread_id].append((stack, weight))
+            if now - began > self.max_seconds:
+                return
+
+    def _request_stack(self, thread_id: int, frame, codes) -> Tuple[FrameKey, ...]:
+        stack, root = [], None
+        while frame is not None:
+            stack.append(frame.f_code)
+            if thread_id == self.loop_thread:
+                if frame is self.request_frame:
+                    root = len(stack)
+            elif frame.f_code in codes:
+                root = len(stack)
+            frame = frame.f_back
+        if root is None:
+            return ()
+        return tuple(_frame_key(code) for code in reversed(stack[:root]))
+
+
+def speedscope_profile(samples: Dict[int, list], thread_names: Dict[int, str], name: str) -> dict:
+    frames, index = [], {}
+    profiles = []
+    for thread_id, stacks in samples.items():
+        encoded, weights = [], []
+        for stack, weight in stacks:
+            ids = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": key[2], "file": key[0], "line": key[1]})
+                ids.append(index[key])
+            encoded.append(ids)
+            weights.append(round(weight * 1000, 3))
+        profiles.append({
+            "type": "sampled",
+            "name": thread_names.get(thread_id, str(thread_id)),
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": encoded,
+            "weights": weights,
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "mindfulday-profiling",
+    }
+
+
+def pstats_data(samples: Dict[int, list]) -> dict:
+    """Sampled stacks in the layout pstats.Stats loads: call counts are sample
+    counts, and times are sampled wall time in seconds."""
+    # func -> [cc, nc, tt, ct, {caller: [cc, nc, tt, ct]}]
+    stats: Dict[FrameKey, list] = {}
+    for stacks in samples.values():
+        for stack, weight in stacks:
+            seen = set()
+            for depth, key in enumerate(stack):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+                leaf = depth == len(stack) - 1
+                if key not in seen:
+                    seen.add(key)
+                    entry[0] += 1
+                    entry[1] += 1
+                    entry[3] += weight
+                if leaf:
+                    entry[2] += weight
+                if depth:
+                    caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += 1
+                    caller[1] += 1
+                    caller[3] += weight
+                    if leaf:
+                        caller[2] += weight
+    return {
+        key: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles a request when it carries `X-Profile: <token>`
+    or is drawn at `sample_rate`, and writes the profile and its SQL timings to
+    `directory`. The response names the files in an `X-Profile-Id` header;
+    `X-Profile-Format` picks speedscope or pstats for one request. A request
+    too short to be sampled only gets its SQL sidecar."""
+
+    def __init__(self, app, directory: str, token: str = "", sample_rate: float = 0.0,
+                 default_format: str = "speedscope", interval: float = 0.001):
+        if default_format not in FORMATS:
+            raise ValueError(f"Unknown profile format {default_format!r}; expected one of {', '.join(FORMATS)}")
+        self.app = app
+        self.directory = directory
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.default_format = default_format
+        self.interval = interval
+        self._route_codes: Dict = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _selected(self, scope) -> Optional[str]:
+        """The output format when this request should be profiled, else None."""
+        picked, fmt = False, self.default_format
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and self.token:
+                picked = picked or hmac.compare_digest(value, self.token)
+            elif name == b"x-profile-format" and value.decode("latin-1") in FORMATS:
+                fmt = value.decode("latin-1")
+        if picked or (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return fmt
+        return None
+
+    def _codes_for(self, scope) -> set:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return set()
+        codes = self._route_codes.get(endpoint)
+        if codes is None:
+            codes = set()
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint and hasattr(route, "dependant"):
+                    _dependency_codes(route.dependant, codes)
+            self._route_codes[endpoint] = codes
+        return codes
+
+    async def __call__(self, scope, receive, send):
+        fmt = self._selected(scope) if scope["type"] == "http" else None
+        if fmt is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method'].lower()}-" \
+                     f"{re.sub(r'[^A-Za-z0-9]+', '_', scope['path']).strip('_') or 'root'}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())])
+            await send(message)
+
+        statements: list = []
+        token = current_statements.set(statements)
+        sampler = Sampler(self.interval, threading.get_ident(), sys._getframe(), lambda: self._codes_for(scope))
+        began = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            seconds = time.perf_counter() - began
+            current_statements.reset(token)
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(seconds * 1000, 3),
+                "samples": sum(len(stacks) for stacks in sampler.samples.values()),
+                "sql_ms": round(sum(duration for _, duration, _ in statements) * 1000, 3),
+                "queries": [
+                    {"start_ms": round((started - began) * 1000, 3), "duration_ms": round(duration * 1000, 3), "sql": sql}
+                    for started, duration, sql in statements
+                ],
+            }
+            await run_in_threadpool(self._write, profile_id, fmt, sampler, summary)
+
+    def _write(self, profile_id: str, fmt: str, sampler: Sampler, summary: dict) -> None:
+        base = os.path.join(self.directory, profile_id)
+        # Neither pstats nor speedscope loads an empty profile, so a request that
+        # ended before the first sample only gets its SQL sidecar.
+        if sampler.samples and fmt == "speedscope":
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            names[sampler.loop_thread] = "event loop"
+            with open(base + ".speedscope.json", "w") as f:
+                json.dump(speedscope_profile(sampler.samples, names, f"{summary['method']} {summary['path']}"), f)
+        elif sampler.samples:
+            with open(base + ".pstats", "wb") as f:
+                marshal.dump(pstats_data(sampler.samples), f)
+        with open(base + ".sql.json", "w") as f:
+            json.dump(summary, f, indent=2)
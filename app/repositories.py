@@ -0,0 +1,357 @@
+import heapq
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Callable, Iterable, Optional, Tuple
+
+from memstore import MemoryStore
+
+# =====================
+#   Storage Repositories
+# =====================
+# The user, mood, prompt and journal endpoints in main.py talk to storage only
+# through Repository, so one app can run on SQLite (SqlRepository, in main.py
+# next to the ORM models) or on the in-memory engine (MemoryRepository, below),
+# chosen with STORAGE_BACKEND. Each mutating method is one unit of work: it
+# bumps the owner's data version (which drives ETags) and commits before
+# returning. Rows come back as objects with the response models' attributes.
+
+PROMPTS_SCOPE = "prompts"
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class DuplicateError(Exception):
+    """A write would break a uniqueness rule (email, one mood per day)."""
+
+
+@dataclass(frozen=True)
+class PageRequest:
+    """A decoded keyset page: rows strictly after `after` == (date, id) in sort order."""
+    limit: int
+    after: Optional[Tuple[date, int]] = None
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+    descending: bool = True
+
+
+class Repository(ABC):
+    @abstractmethod
+    def data_version(self, scope: str) -> int: ...
+
+    # Users
+    @abstractmethod
+    def get_user(self, user_id: int): ...
+
+    @abstractmethod
+    def get_user_by_email(self, email: str): ...
+
+    @abstractmethod
+    def list_users(self) -> list: ...
+
+    @abstractmethod
+    def create_user(self, email: str, password_hash: str, display_name: Optional[str]): ...
+
+    @abstractmethod
+    def update_user(self, user_id: int, email: str, display_name: Optional[str]):
+        """Return the updated user, or None if there is no such user."""
+
+    @abstractmethod
+    def set_password_hash(self, user_id: int, password_hash: str): ...
+
+    @abstractmethod
+    def delete_user(self, user_id: int) -> bool:
+        """Delete the user with their moods and journals; False if there is no such user."""
+
+    # Moods
+    @abstractmethod
+    def create_mood(self, user_id: int, mood: str, mood_date: date): ...
+
+    @abstractmethod
+    def list_moods(self, user_id: int, page: PageRequest) -> list:
+        """Up to page.limit + 1 moods; the extra row tells the caller another page follows."""
+
+    @abstractmethod
+    def get_mood(self, user_id: int, mood_id: int): ...
+
+    @abstractmethod
+    def update_mood(self, user_id: int, mood_id: int, mood: str, mood_date: date):
+        """Return the updated mood, or None if the user has no such mood."""
+
+    @abstractmethod
+    def delete_mood(self, user_id: int, mood_id: int) -> bool: ...
+
+    # Prompts
+    @abstractmethod
+    def list_prompts(self) -> list: ...
+
+    @abstractmethod
+    def get_prompt(self, prompt_id: int): ...
+
+    @abstractmethod
+    def create_prompt(self, prompt_text: str): ...
+
+    @abstractmethod
+    def update_prompt(self, prompt_id: int, prompt_text: str):
+        """Return the updated prompt, or None if there is no such prompt."""
+
+    @abstractmethod
+    def delete_prompt(self, prompt_id: int) -> bool:
+        """Delete the prompt and detach the journals that used it; False if there is no such prompt."""
+
+    @abstractmethod
+    def add_missing_prompts(self, texts: Iterable[str]) -> int:
+        """Insert the prompts not stored yet and return how many were added."""
+
+    # Journals
+    @abstractmethod
+    def create_journal(self, user_id: int, prompt_id: Optional[int], entry_date: date, content: str): ...
+
+    @abstractmethod
+    def list_journals(self, user_id: int, page: PageRequest) -> list: ...
+
+    @abstractmethod
+    def get_journal(self, user_id: int, journal_id: int): ...
+
+    @abstractmethod
+    def update_journal(self, user_id: int, journal_id: int, prompt_id: Optional[int], entry_date: date, content: str):
+        """Return the updated journal, or None if the user has no such journal."""
+
+    @abstractmethod
+    def delete_journal(self, user_id: int, journal_id: int) -> bool: ...
+
+
+def create_memory_store() -> MemoryStore:
+    store = MemoryStore()
+    store.create_table("users", ("email", "password_hash", "display_name", "created_at", "updated_at"), unique=("email",))
+    store.create_table("moods", ("user_id", "mood", "mood_date", "created_at"), unique=(("user_id", "mood_date"),), indexes=("user_id",))
+    store.create_table("prompts", ("prompt_text", "created_at"), unique=("prompt_text",))
+    store.create_table("journal", ("user_id", "prompt_id", "entry_date", "content", "created_at"), indexes=("user_id", "prompt_id", "content"))
+    store.create_table("data_versions", ("scope", "version"), unique=("scope",))
+    return store
+
+
+def keyset_page(rows: list, date_field: str, page: PageRequest) -> list:
+    """The in-memory equivalent of main.apply_keyset over one user's rows."""
+    day = attrgetter(date_field)
+    if page.from_date:
+        rows = [row for row in rows if day(row) >= page.from_date]
+    if page.to_date:
+        rows = [row for row in rows if day(row) <= page.to_date]
+    key = attrgetter(date_field, "id")
+    if page.after:
+        after = page.after
+        rows = [row for row in rows if (key(row) < after if page.descending else key(row) > after)]
+    pick = heapq.nlargest if page.descending else heapq.nsmallest
+    return pick(page.limit + 1, rows, key=key)
+
+
+class MemoryRepository(Repository):
+    def __init__(self, store: Optional[MemoryStore] = None):
+        self.store = store if store is not None else create_memory_store()
+        self.users = self.store["users"]
+        self.moods = self.store["moods"]
+        self.prompts = self.store["prompts"]
+        self.journal = self.store["journal"]
+        self.versions = self.store["data_versions"]
+        # Set by main; receives the text of deleted journals that no remaining
+        # journal shares, so the AI feedback cached for it can be purged too.
+        self.on_journals_deleted: Optional[Callable[[Iterable[str]], None]] = None
+
+    def data_version(self, scope: str) -> int:
+        row = self.versions.get_by("scope", scope)
+        return row.version if row else 0
+
+    def _bump(self, scope: str):
+        row = self.versions.get_by("scope", scope)
+        if row is None:
+            self.versions.insert({"scope": scope, "version": 1})
+        else:
+            self.versions.update(row.id, {"version": row.version + 1})
+
+    # Users
+
+    def get_user(self, user_id: int):
+        return self.users.get(user_id)
+
+    def get_user_by_email(self, email: str):
+        return self.users.get_by("email", email)
+
+    def list_users(self) -> list:
+        return list(self.users)
+
+    def create_user(self, email: str, password_hash: str, display_name: Optional[str]):
+        now = datetime.utcnow()
+        with self.store.write():
+            try:
+                return self.users.insert({
+                    "email": email,
+                    "password_hash": password_hash,
+                    "display_name": display_name,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            except KeyError:
+                raise DuplicateError(email)
+
+    def update_user(self, user_id: int, email: str, display_name: Optional[str]):
+        with self.store.write():
+            if self.users.get(user_id) is None:
+                return None
+            try:
+                user = self.users.update(user_id, {"email": email, "display_name": display_name, "updated_at": datetime.utcnow()})
+            except KeyError:
+                raise DuplicateError(email)
+            self._bump(user_scope(user_id))
+            return user
+
+    def set_password_hash(self, user_id: int, password_hash: str):
+        with self.store.write():
+            self.users.update(user_id, {"password_hash": password_hash})
+
+    def delete_user(self, user_id: int) -> bool:
+        with self.store.write():
+            if self.users.delete(user_id) is None:
+                return False
+            self.moods.delete_by("user_id", user_id)
+            deleted = self.journal.delete_by("user_id", user_id)
+            self._bump(user_scope(user_id))
+        self._journals_deleted(deleted)
+        return True
+
+    # Moods
+
+    def create_mood(self, user_id: int, mood: str, mood_date: date):
+        with self.store.write():
+            try:
+                row = self.moods.insert({"user_id": user_id, "mood": mood, "mood_date": mood_date, "created_at": datetime.utcnow()})
+            except KeyError:
+                raise DuplicateError(mood_date)
+            self._bump(user_scope(user_id))
+            return row
+
+    def list_moods(self, user_id: int, page: PageRequest) -> list:
+        # Under the lock so an update cannot move a row's date mid-sort.
+        with self.store.lock:
+            return keyset_page(self.moods.find("user_id", user_id), "mood_date", page)
+
+    def get_mood(self, user_id: int, mood_id: int):
+        with self.store.lock:
+            mood = self.moods.get(mood_id)
+            return mood if mood is not None and mood.user_id == user_id else None
+
+    def update_mood(self, user_id: int, mood_id: int, mood: str, mood_date: date):
+        with self.store.write():
+            if self.get_mood(user_id, mood_id) is None:
+                return None
+            try:
+                row = self.moods.update(mood_id, {"mood": mood, "mood_date": mood_date})
+            except KeyError:
+                raise DuplicateError(mood_date)
+            self._bump(user_scope(user_id))
+            return row
+
+    def delete_mood(self, user_id: int, mood_id: int) -> bool:
+        with self.store.write():
+            if self.get_mood(user_id, mood_id) is None:
+                return False
+            self.moods.delete(mood_id)
+            self._bump(user_scope(user_id))
+            return True
+
+    # Prompts
+
+    def list_prompts(self) -> list:
+        return list(self.prompts)
+
+    def get_prompt(self, prompt_id: int):
+        return self.prompts.get(prompt_id)
+
+    def create_prompt(self, prompt_text: str):
+        with self.store.write():
+            try:
+                row = self.prompts.insert({"prompt_text": prompt_text, "created_at": datetime.utcnow()})
+            except KeyError:
+                raise DuplicateError(prompt_text)
+            self._bump(PROMPTS_SCOPE)
+            return row
+
+    def update_prompt(self, prompt_id: int, prompt_text: str):
+        with self.store.write():
+            if self.prompts.get(prompt_id) is None:
+                return None
+            try:
+                row = self.prompts.update(prompt_id, {"prompt_text": prompt_text})
+            except KeyError:
+                raise DuplicateError(prompt_text)
+            self._bump(PROMPTS_SCOPE)
+            return row
+
+    def delete_prompt(self, prompt_id: int) -> bool:
+        with self.store.write():
+            if self.prompts.delete(prompt_id) is None:
+                return False
+            owners = {self.journal.update(id_, {"prompt_id": None}).user_id for id_ in self.journal.ids_by("prompt_id", prompt_id)}
+            for owner in owners:
+                self._bump(user_scope(owner))
+            self._bump(PROMPTS_SCOPE)
+            return True
+
+    def add_missing_prompts(self, texts: Iterable[str]) -> int:
+        with self.store.write():
+            missing = [text for text in texts if self.prompts.get_by("prompt_text", text) is None]
+            for text in missing:
+                self.prompts.insert({"prompt_text": text, "created_at": datetime.utcnow()})
+            if missing:
+                self._bump(PROMPTS_SCOPE)
+            return len(missing)
+
+    # Journals
+
+    def create_journal(self, user_id: int, prompt_id: Optional[int], entry_date: date, content: str):
+        with self.store.write():
+            row = self.journal.insert({
+                "user_id": user_id,
+                "prompt_id": prompt_id,
+                "entry_date": entry_date,
+                "content": content,
+                "created_at": datetime.utcnow(),
+            })
+            self._bump(user_scope(user_id))
+            return row
+
+    def list_journals(self, user_id: int, page: PageRequest) -> list:
+        with self.store.lock:
+            return keyset_page(self.journal.find("user_id", user_id), "entry_date", page)
+
+    def get_journal(self, user_id: int, journal_id: int):
+        with self.store.lock:
+            journal = self.journal.get(journal_id)
+            return journal if journal is not None and journal.user_id == user_id else None
+
+    def update_journal(self, user_id: int, journal_id: int, prompt_id: Optional[int], entry_date: date, content: str):
+        with self.store.write():
+            if self.get_journal(user_id, journal_id) is None:
+                return None
+            journal = self.journal.update(journal_id, {"prompt_id": prompt_id, "entry_date": entry_date, "content": content})
+            self._bump(user_scope(user_id))
+            return journal
+
+    def delete_journal(self, user_id: int, journal_id: int) -> bool:
+        with self.store.write():
+            if self.get_journal(user_id, journal_id) is None:
+                return False
+            deleted = [self.journal.delete(journal_id)]
+            self._bump(user_scope(user_id))
+        self._journals_deleted(deleted)
+        return True
+
+    def _journals_deleted(self, rows: list):
+        # Outside the store lock: the hook does SQLite I/O.
+        if self.on_journals_deleted is None:
+            return
+        unused = {row.content for row in rows if not self.journal.ids_by("content", row.content)}
+        if unused:
+            self.on_journals_deleted(list(unused))
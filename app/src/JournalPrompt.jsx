@@ -1,5 +1,6 @@
-import React from 'react';
+import React, { useState } from 'react';
 import { useLocation, useNavigate } from 'react-router-dom';
+import { streamJournalFeedback } from './services/api';
 
 const moodEmojiMap = {
   very_sad: '😢',
@@ -13,6 +14,9 @@ const JournalPrompt = () => {
   const location = useLocation();
   const navigate = useNavigate();
   const { promptId, promptText, mood } = location.state || {};
+  const [feedback, setFeedback] = useState('');
+  const [feedbackDone, setFeedbackDone] = useState(false);
+  const [reflecting, setReflecting] = useState(false);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -36,25 +40,25 @@ const JournalPrompt = () => {
 
       if (!res.ok) throw new Error('Failed to save journal');
       const saved = await res.json();
+      e.target.reset();
+      setReflecting(true);
 
-      // Fetch AI feedback
-      const feedbackRes = await fetch('http://localhost:8000/journal/feedback', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ content }),
-      });
-
-      const feedbackData = await feedbackRes.json();
-
-      // Store feedback in localStorage by journal ID
-      const feedbackMap = JSON.parse(localStorage.getItem('journal_feedback') || '{}');
-      feedbackMap[saved.id] = feedbackData.feedback;
-      localStorage.setItem('journal_feedback', JSON.stringify(feedbackMap));
+      // Stream AI feedback so the reflection appears as it is written
+      try {
+        setFeedback('');
+        const fullFeedback = await streamJournalFeedback(content, delta => setFeedback(prev => prev + delta));
+        setFeedback(fullFeedback);
 
-      e.target.reset();
-      navigate('/mood');
+        // Store feedback in localStorage by journal ID
+        const feedbackMap = JSON.parse(localStorage.getItem('journal_feedback') || '{}');
+        feedbackMap[saved.id] = fullFeedback;
+        localStorage.setItem('journal_feedback', JSON.stringify(feedbackMap));
+        setFeedbackDone(true);
+      } catch (err) {
+        // The entry is saved; feedback is optional.
+        console.warn('Feedback failed:', err);
+        navigate('/mood');
+      }
     } catch (err) {
       console.error('Journal error:', err);
       alert('Failed to submit journal entry');
@@ -88,11 +92,28 @@ const JournalPrompt = () => {
           />
           <button
             type='submit'
-            className='w-full bg-blue-500 text-white p-3 rounded-lg hover:bg-blue-600 transition'
+            disabled={reflecting}
+            className={`w-full bg-blue-500 text-white p-3 rounded-lg transition ${reflecting ? 'opacity-50 cursor-not-allowed' : 'hover:bg-blue-600'}`}
           >
             Submit
           </button>
         </form>
+
+        {reflecting && (
+          <div className='mt-6 space-y-4'>
+            <div className='text-sm text-blue-600 italic'>
+              💬 {feedback || 'Reflecting on your entry…'}
+            </div>
+            {feedbackDone && (
+              <button
+                onClick={() => navigate('/mood')}
+                className='w-full bg-gray-200 text-gray-800 p-3 rounded-lg hover:bg-gray-300 transition'
+              >
+                Continue
+              </button>
+            )}
+          </div>
+        )}
       </div>
     </div>
   );
@@ -3,6 +3,10 @@ import {
   LineChart, Line, XAxis, YAxis, Tooltip, ResponsiveContainer, PieChart, Pie, Cell, Legend
 } from 'recharts';
 import { useNavigate } from 'react-router-dom';
+import { getMoodTrends } from './services/api';
+
+const MOOD_HISTORY_DAYS = 90;
+const JOURNAL_PAGE_SIZE = 20;
 
 const MoodLogger = () => {
   const [selectedMood, setSelectedMood] = useState(null);
@@ -10,8 +14,10 @@ const MoodLogger = () => {
   const [journals, setJournals] = useState([]);
   const [feedbackMap, setFeedbackMap] = useState({});
   const [showAll, setShowAll] = useState(false);
+  const [journalCursor, setJournalCursor] = useState(null);
   const [userName, setUserName] = useState('');
   const [moodAlreadyLogged, setMoodAlreadyLogged] = useState(false);
+  const [streak, setStreak] = useState(null);
   const navigate = useNavigate();
 
   const moods = [
@@ -28,6 +34,7 @@ const MoodLogger = () => {
     if (name) setUserName(name);
     fetchMoodHistory();
     fetchJournals();
+    fetchStreak();
   }, []);
 
   const handleMoodClick = (mood) => setSelectedMood(mood);
@@ -35,11 +42,20 @@ const MoodLogger = () => {
   const fetchMoodHistory = async () => {
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch('http://localhost:8000/moods/', {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (!res.ok) throw new Error('Failed to fetch mood history');
-      const data = await res.json();
+      const from = new Date(Date.now() - MOOD_HISTORY_DAYS * 24 * 60 * 60 * 1000)
+        .toISOString().split('T')[0];
+      let data = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ from, order: 'asc', limit: '1000' });
+        if (cursor) params.set('cursor', cursor);
+        const res = await fetch(`http://localhost:8000/moods/?${params}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!res.ok) throw new Error('Failed to fetch mood history');
+        data = data.concat(await res.json());
+        cursor = res.headers.get('X-Next-Cursor');
+      } while (cursor);
       setMoodHistory(data);
 
       const today = new Date().toISOString().split('T')[0];
@@ -50,17 +66,32 @@ const MoodLogger = () => {
     }
   };
 
-  const fetchJournals = async () => {
+  const fetchStreak = async () => {
+    try {
+      // Streaks come from the server's trend aggregates, which cover every
+      // logged mood rather than just the charted window.
+      const trends = await getMoodTrends('week', 1);
+      setStreak(trends.streak);
+    } catch (err) {
+      // Trends are unavailable on the in-memory backend; the charts still work.
+      console.warn('Mood trends unavailable');
+    }
+  };
+
+  const fetchJournals = async (cursor = null) => {
     try {
       const token = localStorage.getItem('token');
-      const res = await fetch('http://localhost:8000/journal/', {
+      const params = new URLSearchParams({ limit: String(JOURNAL_PAGE_SIZE) });
+      if (cursor) params.set('cursor', cursor);
+      const res = await fetch(`http://localhost:8000/journal/?${params}`, {
         headers: { Authorization: `Bearer ${token}` },
       });
       if (!res.ok) throw new Error('Failed to fetch journals');
+      // The server returns entries newest first.
       const data = await res.json();
-      const sorted = data.sort((a, b) => new Date(b.entry_date) - new Date(a.entry_date));
-      setJournals(sorted);
-      fetchFeedbackForJournals(sorted);
+      setJournals(prev => (cursor ? [...prev, ...data] : data));
+      setJournalCursor(res.headers.get('X-Next-Cursor'));
+      fetchFeedbackForJournals(data);
     } catch (err) {
       console.error('Error fetching journals:', err);
     }
@@ -68,22 +99,24 @@ const MoodLogger = () => {
 
   const fetchFeedbackForJournals = async (journalEntries) => {
     const token = localStorage.getItem('token');
-    for (const j of journalEntries) {
+    const BATCH_SIZE = 100;
+    for (let i = 0; i < journalEntries.length; i += BATCH_SIZE) {
+      const batch = journalEntries.slice(i, i + BATCH_SIZE);
       try {
-        const res = await fetch('http://localhost:8000/journal/feedback', {
+        const res = await fetch('http://localhost:8000/journal/feedback/batch', {
           method: 'POST',
           headers: {
             'Content-Type': 'application/json',
             Authorization: `Bearer ${token}`,
           },
-          body: JSON.stringify({ content: j.content }),
+          body: JSON.stringify({ journal_ids: batch.map(j => j.id) }),
         });
         if (res.ok) {
           const data = await res.json();
-          setFeedbackMap(prev => ({ ...prev, [j.id]: data.feedback }));
+          setFeedbackMap(prev => ({ ...prev, ...data.feedback }));
         }
       } catch (err) {
-        console.warn(`Feedback failed for journal ${j.id}`);
+        console.warn('Feedback failed for journal batch');
       }
     }
   };
@@ -144,6 +177,11 @@ const MoodLogger = () => {
         <h1 className="text-2xl font-bold text-gray-800 mb-6">
           Welcome, {userName} 👋
         </h1>
+        {streak && streak.longest > 0 && (
+          <p className="text-gray-600 -mt-4 mb-6">
+            🔥 {streak.current}-day streak · longest {streak.longest} days
+          </p>
+        )}
       </div>
 
       {/* Mood Logger */}
@@ -253,6 +291,14 @@ const MoodLogger = () => {
                 {showAll ? 'Show Less' : 'Show More'}
               </button>
             )}
+            {showAll && journalCursor && (
+              <button
+                onClick={() => fetchJournals(journalCursor)}
+                className="text-blue-600 hover:underline mt-2 ml-4"
+              >
+                Load Older Entries
+              </button>
+            )}
           </div>
         )}
       </div>
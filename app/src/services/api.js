@@ -42,6 +42,12 @@ export const getMoodHistory = async () => {
   return res.data;
 };
 
+// Server-side streaks, per-week/month distributions and rolling averages.
+export const getMoodTrends = async (period = 'week', buckets = 12) => {
+  const res = await API.get('/moods/trends', { params: { period, buckets } });
+  return res.data;
+};
+
 // ==== Journal ====
 export const submitJournal = async entry => {
   const res = await API.post('/journal/', entry);
@@ -51,4 +57,35 @@ export const submitJournal = async entry => {
 export const getJournals = async () => {
   const res = await API.get('/journal/');
   return res.data;
-};
\ No newline at end of file
+};
+
+// Streams AI feedback as Server-Sent Events, calling onDelta with each text chunk.
+// Resolves with the complete feedback once the server sends its `done` event.
+export const streamJournalFeedback = async (content, onDelta) => {
+  const res = await fetch(`${API.defaults.baseURL}/journal/feedback/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ content }),
+  });
+  if (!res.ok) throw new Error('Failed to stream feedback');
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const blocks = buffer.split('\n\n');
+    buffer = blocks.pop();
+    for (const block of blocks) {
+      const [eventLine, dataLine] = block.split('\n');
+      const event = eventLine.replace('event: ', '');
+      const data = JSON.parse(dataLine.replace('data: ', ''));
+      if (event === 'delta') onDelta(data.text);
+      if (event === 'done') return data.feedback;
+      if (event === 'error') throw new Error(data.detail);
+    }
+  }
+  throw new Error('Feedback stream ended early');
+};
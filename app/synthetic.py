@@ -0,0 +1,146 @@
+"""Deterministic synthetic MindfulDay populations for seeding, benchmarks and load tests.
+
+Every user's history is drawn from its own RNG seeded by (seed, user id), so a
+given --seed always yields the same dataset and any one user can be regenerated
+without the rest. Moods follow a sticky random walk with skipped days; journal
+entries have log-normally distributed lengths (median ~120 words) of sentences
+over a Zipf-weighted vocabulary of everyday words and a long tail of rarer ones.
+
+    python synthetic.py --users 3 --years 0.05
+"""
+import argparse
+import itertools
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Tuple
+
+MOOD_LEVELS = ("very_sad", "sad", "neutral", "happy", "very_happy")
+
+COMMON_WORDS = """
+i the and to a of my was it today in that for with me felt feel but so had
+about at work really not time just this day more some out like good bit after
+morning night sleep walk friend family coffee tired better calm anxious happy
+again still tomorrow week meeting talked call lunch dinner home weekend run
+project rest quiet long hard grateful stress energy focus music book read
+mind body breath slow small win thought kind weather rain sun park evening
+proud worried hopeful heavy light progress plan busy break early late mom dad
+partner dog cat team email deadline gym yoga tea laugh cry sad excited moment
+""".split()
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "ta", "vo", "sel", "dra", "pin", "ou", "zen", "bri", "hal", "mu", "tor", "ne"]
+SENTENCE_POOL_SIZE = 20000
+
+
+def _tail_words(count: int, seed: int) -> List[str]:
+    rng = random.Random(f"vocabulary:{seed}")
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+@dataclass
+class Population:
+    users: int = 100
+    years: float = 1.0
+    journals_per_week: float = 3.0
+    mood_log_rate: float = 0.85
+    prompts: int = 5
+    seed: int = 42
+    end: date = date(2025, 6, 30)
+    vocabulary: List[str] = field(init=False, repr=False)
+    sentences: List[Tuple[str, int]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.vocabulary = COMMON_WORDS + _tail_words(20000, self.seed)
+        # Entries are stitched from a fixed pool of Zipf-worded sentences:
+        # drawing every word of millions of entries dominated seeding time.
+        rng = random.Random(f"sentences:{self.seed}")
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.vocabulary))))
+        self.sentences = []
+        for _ in range(SENTENCE_POOL_SIZE):
+            length = rng.randint(6, 20)
+            words = rng.choices(self.vocabulary, cum_weights=cum_weights, k=length)
+            self.sentences.append((" ".join(words).capitalize() + ".", length))
+
+    @property
+    def start(self) -> date:
+        return self.end - timedelta(days=max(1, round(self.years * 365)) - 1)
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def email(self, user_id: int) -> str:
+        return f"user{user_id}@example.com"
+
+    def user_rows(self) -> Iterator[Tuple[int, str, str, datetime]]:
+        """(id, email, display_name, created_at) for users 1..users."""
+        joined = datetime.combine(self.start, datetime.min.time())
+        for user_id in range(1, self.users + 1):
+            yield user_id, self.email(user_id), f"User {user_id}", joined
+
+    def prompt_rows(self) -> Iterator[Tuple[int, str]]:
+        for prompt_id in range(1, self.prompts + 1):
+            yield prompt_id, f"Synthetic reflection prompt {prompt_id}"
+
+    def mood_rows(self, user_id: int) -> Iterator[Tuple[int, str, date, datetime]]:
+        """(user_id, mood, mood_date, created_at): at most one per day, some days skipped."""
+        rng = random.Random(f"{self.seed}:{user_id}:moods")
+        level, top = rng.randrange(len(MOOD_LEVELS)), len(MOOD_LEVELS) - 1
+        for offset in range(self.days):
+            step = rng.random()
+            if step < 0.2:
+                level = max(0, level - 1)
+            elif step >= 0.8:
+                level = min(top, level + 1)
+            if rng.random() < self.mood_log_rate:
+                day = self.start + timedelta(days=offset)
+                yield user_id, MOOD_LEVELS[level], day, datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(7, 23))
+
+    def journal_rows(self, user_id: int) -> Iterator[Tuple[int, int, date, str, datetime]]:
+        """(user_id, prompt_id or None, entry_date, content, created_at)."""
+        rng = random.Random(f"{self.seed}:{user_id}:journal")
+        rate = self.journals_per_week / 7
+        for offset in range(self.days):
+            if rng.random() < rate:
+                day = self.start + timedelta(days=offset)
+                prompt_id = rng.randint(1, self.prompts) if self.prompts and rng.random() < 0.7 else None
+                yield user_id, prompt_id, day, self.text(rng), datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randint(7, 23))
+
+    def text(self, rng: random.Random) -> str:
+        words = min(2000, max(5, int(rng.lognormvariate(math.log(120), 0.6))))
+        parts, count = [], 0
+        while count < words:
+            sentence, length = self.sentences[int(rng.random() * SENTENCE_POOL_SIZE)]
+            parts.append(sentence)
+            count += length
+        return " ".join(parts)
+
+    def search_terms(self, count: int) -> List[str]:
+        """Words common enough to match but not stop-word frequent, for search queries."""
+        rng = random.Random(f"{self.seed}:search")
+        return rng.sample(self.vocabulary[20:400], count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--years", type=float, default=0.05)
+    parser.add_argument("--journals-per-week", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    population = Population(users=args.users, years=args.years, journals_per_week=args.journals_per_week, seed=args.seed)
+    for user in population.user_rows():
+        print(user)
+        for mood in population.mood_rows(user[0]):
+            print("  mood", mood[1], mood[2])
+        for entry in population.journal_rows(user[0]):
+            print("  journal", entry[2], f"{len(entry[3].split())} words:", entry[3][:70] + "…")
+
+
+if __name__ == "__main__":
+    main()
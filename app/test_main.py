@@ -1,11 +1,18 @@
+import asyncio
+import json
 import os
 import tempfile
+import time
+from types import SimpleNamespace
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
 
-from main import app, Base, get_db
+import main
+from main import app, Base, get_db, get_read_db
+from migrations import run_migrations, current_version, MIGRATIONS
+from repositories import DuplicateError, MemoryRepository, PageRequest, user_scope
 
 # ✅ Create a temporary SQLite DB file
 temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
@@ -24,12 +31,15 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+# Background feedback jobs are switched on per test.
+main.FEEDBACK_PRECOMPUTE = False
 
 client = TestClient(app)
 
 @pytest.fixture(scope="module", autouse=True)
 def setup_test_db():
-    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     yield
     TestingSessionLocal().close()
     Base.metadata.drop_all(bind=engine)
@@ -86,3 +96,1000 @@ def test_delete_user():
 def test_delete_user_not_found():
     response = client.delete("/users/999")
     assert response.status_code == 404
+
+class FakeCompletions:
+    usage = None
+
+    def __init__(self):
+        self.calls = 0
+
+    def _respond(self):
+        self.calls += 1
+        message = SimpleNamespace(content=f" Feedback #{self.calls} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+
+    def create(self, **kwargs):
+        return self._respond()
+
+class FakeAsyncCompletions(FakeCompletions):
+    delay = 0
+
+    async def create(self, stream=False, **kwargs):
+        await asyncio.sleep(self.delay)
+        if stream:
+            return self._stream()
+        return self._respond()
+
+    async def _stream(self):
+        self.calls += 1
+        for token in ["Streamed ", "feedback", " #", str(self.calls), " "]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    completions = FakeAsyncCompletions()
+    monkeypatch.setattr(main, "async_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(main, "client", None)
+    main.feedback_memory_cache.clear()
+    return completions
+
+def test_journal_feedback_is_cached(fake_llm):
+    first = client.post("/journal/feedback", json={"content": "A calm walk by the lake."})
+    second = client.post("/journal/feedback", json={"content": "A calm walk by the lake."})
+    assert first.status_code == 200
+    assert first.json() == {"feedback": "Feedback #1", "cached": False}
+    assert second.json() == {"feedback": "Feedback #1", "cached": True}
+    assert fake_llm.calls == 1
+
+def test_journal_feedback_survives_memory_eviction(fake_llm):
+    client.post("/journal/feedback", json={"content": "Stressful deadline today."})
+    main.feedback_memory_cache.clear()
+    response = client.post("/journal/feedback", json={"content": "Stressful deadline today."})
+    assert response.json()["cached"] is True
+    assert fake_llm.calls == 1
+    assert client.get("/journal/feedback/cache").json()["db_hits"] >= 1
+
+def test_deleting_journals_purges_their_cached_feedback(fake_llm):
+    headers = auth_headers("forgetful@example.com")
+    contents = ["Kept only briefly.", "Gone with the account."]
+    ids = [client.post("/journal/", headers=headers, json={"entry_date": "2025-06-01", "content": c}).json()["id"] for c in contents]
+    sharer = auth_headers("sharer@example.com")
+    shared = client.post("/journal/", headers=sharer, json={"entry_date": "2025-06-01", "content": contents[1]}).json()["id"]
+    for content in contents:
+        client.post("/journal/feedback", json={"content": content})
+    keys = [main.feedback_cache_key(content) for content in contents]
+    db = TestingSessionLocal()
+    cached = lambda: {row.key for row in db.query(main.FeedbackCacheDB.key).filter(main.FeedbackCacheDB.key.in_(keys))}
+    try:
+        assert cached() == set(keys)
+        client.delete(f"/journal/{ids[0]}", headers=headers)
+        assert cached() == {keys[1]} and main.feedback_memory_cache.get(keys[0]) is None
+        me = client.get("/users/me", headers=headers).json()
+        client.delete(f"/users/{me['id']}")
+        # Another user's journal still has this text, so its feedback stays.
+        assert cached() == {keys[1]} and main.feedback_memory_cache.get(keys[1]) is not None
+        client.delete(f"/journal/{shared}", headers=sharer)
+        assert cached() == set() and main.feedback_memory_cache.get(keys[1]) is None
+    finally:
+        db.close()
+
+    repo = MemoryRepository()
+    forgotten = []
+    repo.on_journals_deleted = forgotten.extend
+    user = repo.create_user("forgetful@example.com", "hash", None)
+    entry = repo.create_journal(user.id, None, main.date(2025, 6, 1), "First")
+    repo.create_journal(user.id, None, main.date(2025, 6, 2), "Second")
+    other = repo.create_user("sharer@example.com", "hash", None)
+    repo.create_journal(other.id, None, main.date(2025, 6, 2), "Second")
+    repo.delete_journal(user.id, entry.id)
+    repo.delete_user(user.id)
+    assert forgotten == ["First"]
+    repo.delete_user(other.id)
+    assert forgotten == ["First", "Second"]
+
+def test_journal_feedback_missing_content():
+    response = client.post("/journal/feedback", json={})
+    assert response.status_code == 400
+
+def test_journal_feedback_thread_mode(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(main, "LLM_CLIENT_MODE", "thread")
+    monkeypatch.setattr(main, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    main.feedback_memory_cache.clear()
+    response = client.post("/journal/feedback", json={"content": "Written from the thread pool."})
+    assert response.json() == {"feedback": "Feedback #1", "cached": False}
+    assert completions.calls == 1
+
+def test_journal_feedback_timeout(fake_llm, monkeypatch):
+    monkeypatch.setattr(main, "LLM_TIMEOUT_SECONDS", 0.01)
+    fake_llm.delay = 1
+    response = client.post("/journal/feedback", json={"content": "This one takes too long."})
+    assert response.status_code == 504
+
+def auth_headers(email: str) -> dict:
+    client.post("/users/", json={"email": email, "password": "testpass123", "display_name": "Tester"})
+    token = client.post("/login", json={"email": email, "password": "testpass123"}).json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_journal_feedback_batch(fake_llm):
+    headers = auth_headers("batch@example.com")
+    ids = [
+        client.post("/journal/", headers=headers, json={"entry_date": "2025-08-0" + str(day), "content": content}).json()["id"]
+        for day, content in [(1, "Slept well."), (2, "Busy day at work."), (3, "Slept well.")]
+    ]
+    client.post("/journal/feedback", json={"content": "Busy day at work."})
+
+    response = client.post("/journal/feedback/batch", headers=headers, json={"journal_ids": ids})
+    assert response.status_code == 200
+    feedback = response.json()["feedback"]
+    assert set(feedback) == {str(i) for i in ids}
+    assert feedback[str(ids[0])] == feedback[str(ids[2])]
+    assert fake_llm.calls == 2
+
+def test_journal_feedback_batch_rejects_foreign_journals(fake_llm):
+    owner = auth_headers("owner@example.com")
+    other = auth_headers("other@example.com")
+    journal_id = client.post("/journal/", headers=owner, json={"entry_date": "2025-08-01", "content": "Private."}).json()["id"]
+    response = client.post("/journal/feedback/batch", headers=other, json={"journal_ids": [journal_id]})
+    assert response.status_code == 404
+    assert fake_llm.calls == 0
+
+def sse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_journal_feedback_stream(fake_llm):
+    response = client.post("/journal/feedback/stream", json={"content": "Streaming thoughts."})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    assert "".join(data["text"] for event, data in events if event == "delta") == "Streamed feedback #1 "
+    assert events[-1] == ("done", {"feedback": "Streamed feedback #1", "cached": False})
+
+    cached = client.post("/journal/feedback", json={"content": "Streaming thoughts."})
+    assert cached.json() == {"feedback": "Streamed feedback #1", "cached": True}
+    assert fake_llm.calls == 1
+
+def test_metrics_report_routes_queries_and_llm_calls(fake_llm):
+    import metrics
+    headers = auth_headers("metrics@example.com")
+    journal_id = client.post("/journal/", headers=headers, json={"entry_date": "2025-08-01", "content": "Measured."}).json()["id"]
+    client.get(f"/journal/{journal_id}", headers=headers)
+    fake_llm.usage = SimpleNamespace(prompt_tokens=12, completion_tokens=5)
+    client.post("/journal/feedback", json={"content": "Counting tokens."})
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/journal/{journal_id}",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/journal/",le="+Inf"}' in body
+    assert f'llm_request_duration_seconds_count{{model="{main.FEEDBACK_MODEL}",mode="complete",outcome="ok"}}' in body
+    assert f'llm_tokens_total{{model="{main.FEEDBACK_MODEL}",kind="prompt"}} 12' in body
+
+    query_engine = create_engine("sqlite://")
+    timings = []
+    metrics.track_queries(query_engine, timings.append)
+    stats = metrics.QueryStats()
+    token = metrics.current_queries.set(stats)
+    try:
+        with query_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        metrics.current_queries.reset(token)
+    assert stats.queries == 2 and len(timings) == 2 and stats.seconds == pytest.approx(sum(timings))
+
+def test_profiling_writes_profiles_for_authorized_requests(tmp_path):
+    import metrics
+    import pstats
+    import profiling
+    metrics.track_queries(engine, lambda seconds: None)  # the tests' own engine
+    headers = auth_headers("profiled@example.com")
+    profiled = TestClient(profiling.ProfilingMiddleware(app, str(tmp_path), token="letmein"))
+
+    assert "x-profile-id" not in profiled.get("/moods/", headers=headers).headers
+    assert "x-profile-id" not in profiled.get("/moods/", headers={**headers, "X-Profile": "guess"}).headers
+    assert list(tmp_path.iterdir()) == []
+
+    response = profiled.get("/moods/", headers={**headers, "X-Profile": "letmein"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    summary = json.loads((tmp_path / f"{profile_id}.sql.json").read_text())
+    assert summary["status"] == 200 and summary["path"] == "/moods/"
+    assert any("FROM moods" in query["sql"] for query in summary["queries"])
+    assert (tmp_path / f"{profile_id}.speedscope.json").exists() == (summary["samples"] > 0)
+
+    response = profiled.get("/moods/", headers={**headers, "X-Profile": "letmein", "X-Profile-Format": "pstats"})
+    pstats_file = tmp_path / f"{response.headers['x-profile-id']}.pstats"
+    if pstats_file.exists():
+        pstats.Stats(str(pstats_file))
+
+    samples = {1: [((("a.py", 1, "handler"), ("b.py", 5, "query")), 0.002), ((("a.py", 1, "handler"),), 0.001)]}
+    stats = profiling.pstats_data(samples)
+    assert stats[("a.py", 1, "handler")][:4] == (2, 2, 0.001, 0.003)
+    assert stats[("b.py", 5, "query")][4] == {("a.py", 1, "handler"): (1, 1, 0.002, 0.002)}
+    speedscope = profiling.speedscope_profile(samples, {1: "worker"}, "GET /moods/")
+    assert [frame["name"] for frame in speedscope["shared"]["frames"]] == ["handler", "query"]
+    assert speedscope["profiles"][0]["samples"] == [[0, 1], [0]]
+    assert speedscope["profiles"][0]["weights"] == [2.0, 1.0]
+
+def wait_for_feedback(journal_id: int, headers: dict, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(f"/journal/{journal_id}/feedback", headers=headers).json()
+        if body["status"] != "pending" or time.monotonic() > deadline:
+            return body
+        time.sleep(0.02)
+
+def test_feedback_precomputed_on_create_and_update(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(main, "FEEDBACK_PRECOMPUTE", True)
+    monkeypatch.setattr(main, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    main.feedback_memory_cache.clear()
+    headers = auth_headers("jobs@example.com")
+
+    journal_id = client.post("/journal/", headers=headers, json={"entry_date": "2025-08-01", "content": "Queued entry."}).json()["id"]
+    assert wait_for_feedback(journal_id, headers) == {"status": "ready", "feedback": "Feedback #1"}
+
+    client.put(f"/journal/{journal_id}", headers=headers, json={"entry_date": "2025-08-01", "content": "Edited entry."})
+    assert wait_for_feedback(journal_id, headers) == {"status": "ready", "feedback": "Feedback #2"}
+    assert completions.calls == 2
+
+def test_feedback_job_marked_failed_after_retries(monkeypatch):
+    attempts = []
+    def fail(**kwargs):
+        attempts.append(time.monotonic())
+        raise RuntimeError("provider down")
+    monkeypatch.setattr(main, "FEEDBACK_PRECOMPUTE", True)
+    monkeypatch.setattr(main, "FEEDBACK_JOB_RETRY_BASE_SECONDS", 0.1)
+    monkeypatch.setattr(main, "client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fail))))
+    headers = auth_headers("jobs-fail@example.com")
+
+    journal_id = client.post("/journal/", headers=headers, json={"entry_date": "2025-08-01", "content": "Never summarised."}).json()["id"]
+    assert wait_for_feedback(journal_id, headers) == {"status": "failed", "detail": "provider down"}
+    # Backs off 0.1s, then 0.2s, between the three attempts.
+    assert len(attempts) == main.FEEDBACK_JOB_MAX_ATTEMPTS == 3
+    assert attempts[1] - attempts[0] >= 0.1 and attempts[2] - attempts[1] >= 0.2
+    monkeypatch.setattr(main, "FEEDBACK_JOB_RETRY_MAX_SECONDS", 0.3)
+    assert [main.feedback_retry_delay(n) for n in (1, 2, 3)] == [0.1, 0.2, 0.3]
+
+def test_current_user_served_from_principal_cache():
+    headers = auth_headers("principal@example.com")
+    client.get("/users/me", headers=headers)
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/journal/", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    # The ETag's data_versions lookup and the journal page; never the users table.
+    assert len(statements) == 2
+    assert "data_versions" in statements[0] and "FROM journal" in statements[1]
+
+def test_principal_cache_invalidated_on_update_and_delete():
+    headers = auth_headers("rename@example.com")
+    me = client.get("/users/me", headers=headers).json()
+    client.put(f"/users/{me['id']}", json={"email": "renamed@example.com", "display_name": "Renamed"})
+    assert client.get("/users/me", headers=headers).json()["display_name"] == "Renamed"
+    client.delete(f"/users/{me['id']}")
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+def test_invalid_token_rejected():
+    response = client.get("/users/me", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
+def test_password_hashing_sheds_load_when_queue_full(monkeypatch):
+    monkeypatch.setattr(main, "PASSWORD_HASH_QUEUE_LIMIT", 0)
+    response = client.post("/users/", json={"email": "busy@example.com", "password": "testpass123"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_login_rehashes_outdated_password():
+    auth_headers("rehash@example.com")
+    db = TestingSessionLocal()
+    user = db.query(main.UserDB).filter(main.UserDB.email == "rehash@example.com").one()
+    user.password_hash = main.pwd_context.hash("testpass123", rounds=4)
+    db.commit()
+
+    response = client.post("/login", json={"email": "rehash@example.com", "password": "testpass123"})
+    assert response.status_code == 200
+    db.refresh(user)
+    assert main.pwd_context.needs_update(user.password_hash) is False
+    assert main.pwd_context.verify("testpass123", user.password_hash)
+    db.close()
+
+def test_login_wrong_password():
+    auth_headers("wrongpass@example.com")
+    response = client.post("/login", json={"email": "wrongpass@example.com", "password": "nope-nope"})
+    assert response.status_code == 401
+
+def test_moods_keyset_pagination_and_date_filter():
+    headers = auth_headers("pager@example.com")
+    for day in range(1, 8):
+        client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": f"2025-07-0{day}"})
+
+    first = client.get("/moods/?limit=3", headers=headers)
+    assert [m["mood_date"] for m in first.json()] == ["2025-07-07", "2025-07-06", "2025-07-05"]
+    cursor = first.headers["x-next-cursor"]
+    second = client.get(f"/moods/?limit=3&cursor={cursor}", headers=headers)
+    assert [m["mood_date"] for m in second.json()] == ["2025-07-04", "2025-07-03", "2025-07-02"]
+    last = client.get(f"/moods/?limit=3&cursor={second.headers['x-next-cursor']}", headers=headers)
+    assert [m["mood_date"] for m in last.json()] == ["2025-07-01"]
+    assert "x-next-cursor" not in last.headers
+
+    ranged = client.get("/moods/?from=2025-07-02&to=2025-07-04&order=asc", headers=headers)
+    assert [m["mood_date"] for m in ranged.json()] == ["2025-07-02", "2025-07-03", "2025-07-04"]
+
+def test_journal_pagination_orders_same_day_entries_by_id():
+    headers = auth_headers("journal-pager@example.com")
+    ids = [
+        client.post("/journal/", headers=headers, json={"entry_date": "2025-07-01", "content": f"Entry {n}"}).json()["id"]
+        for n in range(3)
+    ]
+    first = client.get("/journal/?limit=2", headers=headers)
+    second = client.get(f"/journal/?limit=2&cursor={first.headers['x-next-cursor']}", headers=headers)
+    assert [j["id"] for j in first.json() + second.json()] == ids[::-1]
+
+def test_invalid_cursor_rejected():
+    headers = auth_headers("journal-pager@example.com")
+    assert client.get("/journal/?cursor=bogus", headers=headers).status_code == 400
+
+def test_duplicate_mood_rejected_by_unique_index():
+    headers = auth_headers("dup-mood@example.com")
+    first = client.post("/moods/", headers=headers, json={"mood": "sad", "mood_date": "2025-07-10"})
+    second = client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": "2025-07-10"})
+    assert first.status_code == 200
+    assert first.json()["prompt"] == main.MOOD_PROMPT_MAP["sad"]
+    assert second.status_code == 400
+    assert second.json()["detail"] == "You've already logged a mood for 2025-07-10."
+
+def test_migrations_match_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    assert run_migrations(migrated) == [m.version for m in MIGRATIONS]
+    assert run_migrations(migrated) == []
+    inspector = inspect(migrated)
+    for table in Base.metadata.sorted_tables:
+        assert {c.name for c in table.columns} == {c["name"] for c in inspector.get_columns(table.name)}
+        assert {i.name for i in table.indexes} <= {i["name"] for i in inspector.get_indexes(table.name)}
+    migrated.dispose()
+
+def test_unique_mood_migration_removes_existing_duplicates(tmp_path):
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    run_migrations(legacy, target=3)
+    with legacy.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'a@example.com', 'x', '2025-01-01')"))
+        for mood in ("sad", "happy"):
+            conn.execute(text("INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (1, :m, '2025-07-01', '2025-07-01')"), {"m": mood})
+    run_migrations(legacy)
+    assert current_version(legacy) == MIGRATIONS[-1].version
+    with legacy.connect() as conn:
+        assert conn.execute(text("SELECT mood FROM moods")).scalars().all() == ["sad"]
+    legacy.dispose()
+
+def test_mood_trend_migration_backfills_existing_moods(tmp_path):
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    run_migrations(legacy, target=4)
+    with legacy.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'a@example.com', 'x', '2025-01-01')"))
+        for day, mood in (("06-29", "sad"), ("06-30", "happy"), ("07-01", "sad"), ("07-02", "very_happy"), ("07-04", "neutral"), ("07-05", "angry")):
+            conn.execute(text("INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (1, :m, :d, :d)"), {"m": mood, "d": f"2025-{day}"})
+    run_migrations(legacy)
+
+    def snapshot(db):
+        buckets = db.query(main.MoodBucketDB).order_by(main.MoodBucketDB.period, main.MoodBucketDB.bucket_start).all()
+        streak = db.get(main.MoodStreakDB, 1)
+        return (
+            [(b.period, b.bucket_start, b.entries, b.score_total, *[getattr(b, level.value) for level in main.MoodLevel]) for b in buckets],
+            (streak.run_start, streak.run_end, streak.longest),
+        )
+
+    with sessionmaker(bind=legacy)() as db:
+        migrated = snapshot(db)
+        trends = main.mood_trends(
+            period=main.TrendPeriod.week, buckets=2, to_date=main.date(2025, 7, 6), window=3,
+            db=db, current_user=SimpleNamespace(id=1),
+        )
+        main.rebuild_mood_trends(db)
+        assert snapshot(db) == migrated
+    assert [(b.start.isoformat(), b.entries, b.average) for b in trends.buckets] == [("2025-06-23", 1, 2.0), ("2025-06-30", 5, 3.2)]
+    assert trends.streak.longest == 4
+    assert trends.streak.current == 0
+    assert trends.streak.last_logged.isoformat() == "2025-07-05"
+    legacy.dispose()
+
+def test_production_engine_profile(tmp_path):
+    write_engine, read_engine = main.create_engines(f"sqlite:///{tmp_path / 'prod.db'}", "production")
+    run_migrations(write_engine)
+    with write_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 0
+    with read_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(Exception):
+            conn.execute(text("DELETE FROM users"))
+    assert write_engine.pool.size() == 1
+    write_engine.dispose()
+    read_engine.dispose()
+
+def test_async_db_mode_endpoints(tmp_path):
+    from fastapi import FastAPI
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    db_url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(db_url)
+    run_migrations(sync_engine)
+    sync_engine.dispose()
+    async_engine = create_async_engine(db_url.replace("sqlite://", "sqlite+aiosqlite://", 1), poolclass=NullPool)
+    AsyncTestingSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(main.async_router)
+    async_app.dependency_overrides[main.get_async_db] = override_get_async_db
+    async_app.dependency_overrides[main.get_async_read_db] = override_get_async_db
+    with TestClient(async_app) as async_client:
+        user = async_client.post("/users/", json={"email": "async@example.com", "password": "testpass123"}).json()
+        token = async_client.post("/login", json={"email": "async@example.com", "password": "testpass123"}).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        assert async_client.get("/users/me", headers=headers).json()["id"] == user["id"]
+
+        # A racing signup passes the read-side check against a database that
+        # does not have the row yet; the insert's unique constraint still turns it into a 400.
+        empty_engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+        run_migrations(empty_engine)
+        empty_engine.dispose()
+        EmptySession = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}", poolclass=NullPool))
+        async def override_get_stale_read_db():
+            async with EmptySession() as db:
+                yield db
+        async_app.dependency_overrides[main.get_async_read_db] = override_get_stale_read_db
+        raced = async_client.post("/users/", json={"email": "async@example.com", "password": "testpass123"})
+        assert raced.status_code == 400 and raced.json()["detail"] == "Email already registered"
+        async_app.dependency_overrides[main.get_async_read_db] = override_get_async_db
+
+        other = async_client.post("/users/", json={"email": "other@example.com", "password": "testpass123"}).json()
+        taken = async_client.put(f"/users/{other['id']}", json={"email": "async@example.com"})
+        assert taken.status_code == 400 and taken.json()["detail"] == "Email already registered"
+        assert async_client.put(f"/users/{other['id']}", json={"email": "renamed@example.com"}).json()["email"] == "renamed@example.com"
+
+        for day in ("2025-07-01", "2025-07-02", "2025-07-03"):
+            assert async_client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": day}).status_code == 200
+        duplicate = async_client.post("/moods/", headers=headers, json={"mood": "sad", "mood_date": "2025-07-01"})
+        assert duplicate.status_code == 400
+        first = async_client.get("/moods/?limit=2", headers=headers)
+        assert [m["mood_date"] for m in first.json()] == ["2025-07-03", "2025-07-02"]
+        rest = async_client.get(f"/moods/?limit=2&cursor={first.headers['x-next-cursor']}", headers=headers)
+        assert [m["mood_date"] for m in rest.json()] == ["2025-07-01"]
+
+        journal = async_client.post("/journal/", headers=headers, json={"entry_date": "2025-07-01", "content": "Async entry"}).json()
+        updated = async_client.put(f"/journal/{journal['id']}", headers=headers, json={"entry_date": "2025-07-01", "content": "Edited"})
+        assert updated.json()["content"] == "Edited"
+        assert async_client.post("/journal/", headers=headers, json={"entry_date": "2025-07-01", "content": "x", "prompt_id": 999}).status_code == 400
+        assert async_client.delete(f"/journal/{journal['id']}", headers=headers).status_code == 200
+        assert async_client.get(f"/journal/{journal['id']}", headers=headers).status_code == 404
+
+        assert async_client.delete(f"/users/{user['id']}").status_code == 200
+        assert async_client.get("/users/me", headers=headers).status_code == 401
+    asyncio.run(async_engine.dispose())
+
+def test_async_routes_replace_sync_routes_in_place():
+    from fastapi import FastAPI
+    swapped = FastAPI()
+    swapped.router.routes = list(app.router.routes)
+    main.use_async_routes(swapped, main.async_router)
+    paths = [(r.path, r.endpoint.__name__) for r in swapped.router.routes if hasattr(r, "endpoint")]
+    assert [p for p, _ in paths] == [r.path for r in app.router.routes if hasattr(r, "endpoint")]
+    assert ("/moods/", "list_moods_async") in paths
+    assert ("/journal/feedback", "get_journal_feedback") in paths
+
+def test_list_endpoints_serialize_model_fields_only():
+    headers = auth_headers("serializer@example.com")
+    client.post("/journal/", headers=headers, json={"entry_date": "2025-08-01", "content": "Shape check"})
+    users = client.get("/users/")
+    assert users.headers["content-type"] == "application/json"
+    assert all(set(u) == set(main.User.model_fields) for u in users.json())
+    journals = client.get("/journal/", headers=headers).json()
+    assert set(journals[0]) == set(main.Journal.model_fields)
+    assert journals[0]["entry_date"] == "2025-08-01"
+    assert journals[0] == client.get(f"/journal/{journals[0]['id']}", headers=headers).json()
+
+def test_mood_trends_from_incremental_aggregates():
+    headers = auth_headers("trends@example.com")
+    logged = {"2025-03-03": "happy", "2025-03-04": "sad", "2025-03-05": "very_happy", "2025-03-10": "neutral", "2025-03-01": "very_sad"}
+    for day, mood in logged.items():
+        assert client.post("/moods/", headers=headers, json={"mood": mood, "mood_date": day}).status_code == 200
+
+    weekly = client.get("/moods/trends?period=week&buckets=3&to=2025-03-16&window=3", headers=headers).json()
+    assert [b["start"] for b in weekly["buckets"]] == ["2025-02-24", "2025-03-03", "2025-03-10"]
+    assert weekly["buckets"][1]["entries"] == 3
+    assert weekly["buckets"][1]["distribution"]["sad"] == 1
+    assert weekly["buckets"][1]["average"] == round((4 + 2 + 5) / 3, 2)
+    assert weekly["rolling_average"][-1] == {"date": "2025-03-10", "average": 3.0}
+    assert weekly["rolling_average"][3] == {"date": "2025-03-05", "average": round((4 + 2 + 5) / 3, 2)}
+    assert weekly["streak"]["longest"] == 3
+    assert weekly["streak"]["last_logged"] == "2025-03-10"
+    assert weekly["streak"]["current"] == 0
+
+    monthly = client.get("/moods/trends?period=month&buckets=1&to=2025-03-31", headers=headers).json()
+    assert monthly["buckets"][0]["entries"] == 5
+
+    # Backfilling 2025-03-02 joins 03-01 to the 03-03..05 run.
+    client.post("/moods/", headers=headers, json={"mood": "neutral", "mood_date": "2025-03-02"})
+    assert client.get("/moods/trends", headers=headers).json()["streak"]["longest"] == 5
+
+    db = TestingSessionLocal()
+    user_id = db.query(main.UserDB.id).filter(main.UserDB.email == "trends@example.com").scalar()
+    snapshot = lambda: sorted(
+        tuple(getattr(b, c.name) for c in main.MoodBucketDB.__table__.columns)
+        for b in db.query(main.MoodBucketDB).filter(main.MoodBucketDB.user_id == user_id)
+    )
+    incremental = snapshot()
+    main.rebuild_mood_trends(db, user_id)
+    db.commit()
+    assert snapshot() == incremental
+    assert db.get(main.MoodStreakDB, user_id).longest == 5
+    db.close()
+
+def test_mood_and_prompt_routes_by_id():
+    headers = auth_headers("editor@example.com")
+    other = auth_headers("other-editor@example.com")
+    ids = [
+        client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": day}).json()["mood"]["id"]
+        for day in ("2025-04-01", "2025-04-02", "2025-04-04")
+    ]
+    assert client.get(f"/moods/{ids[0]}", headers=other).status_code == 404
+    assert client.put(f"/moods/{ids[2]}", headers=headers, json={"mood": "sad", "mood_date": "2025-04-01"}).status_code == 400
+    moved = client.put(f"/moods/{ids[2]}", headers=headers, json={"mood": "sad", "mood_date": "2025-04-03"})
+    assert moved.json()["mood_date"] == "2025-04-03" and client.get(f"/moods/{ids[2]}", headers=headers).json()["mood"] == "sad"
+    # Edits and deletes recompute the aggregates the trends endpoint reads.
+    assert client.get("/moods/trends", headers=headers).json()["streak"]["longest"] == 3
+    assert client.delete(f"/moods/{ids[1]}", headers=headers).json() == {"msg": "Deleted"}
+    assert client.get("/moods/trends", headers=headers).json()["streak"]["longest"] == 1
+    assert client.delete(f"/moods/{ids[1]}", headers=headers).status_code == 404
+
+    assert client.post("/prompts/", json={"prompt_text": "Who helped you today?"}).status_code == 401
+    prompt = client.post("/prompts/", headers=headers, json={"prompt_text": "Who helped you today?"}).json()
+    assert client.post("/prompts/", headers=headers, json={"prompt_text": "Who helped you today?"}).status_code == 400
+    assert client.put(f"/prompts/{prompt['id']}", headers=headers, json={"prompt_text": "Who helped you?"}).json()["prompt_text"] == "Who helped you?"
+    journal = client.post("/journal/", headers=other, json={"prompt_id": prompt["id"], "entry_date": "2025-04-05", "content": "Asked for help"}).json()
+    assert client.delete(f"/prompts/{prompt['id']}", headers=headers).json() == {"msg": "Deleted"}
+    assert client.get(f"/prompts/{prompt['id']}").status_code == 404
+    assert client.get(f"/journal/{journal['id']}", headers=other).json()["prompt_id"] is None
+
+def test_journal_search_ranks_and_scopes_to_owner():
+    headers = auth_headers("searcher@example.com")
+    other = auth_headers("other-searcher@example.com")
+    client.post("/journal/", headers=other, json={"entry_date": "2025-09-01", "content": "Walking by the ocean"})
+    ids = {
+        text_: client.post("/journal/", headers=headers, json={"entry_date": f"2025-09-0{n + 1}", "content": text_}).json()["id"]
+        for n, text_ in enumerate([
+            "Walked to the ocean at dawn, the ocean was calm",
+            "Long day at work, no walk",
+            "Thinking about the ocean trip",
+        ])
+    }
+    hits = client.get("/journal/search?q=ocean", headers=headers).json()
+    assert [h["id"] for h in hits] == [ids["Walked to the ocean at dawn, the ocean was calm"], ids["Thinking about the ocean trip"]]
+    assert "<mark>ocean</mark>" in hits[0]["snippet"]
+
+    # Porter stemming matches walk/walked; quoting keeps FTS5 operators inert.
+    assert len(client.get("/journal/search?q=walking", headers=headers).json()) == 2
+    assert client.get('/journal/search?q=ocean" OR "work', headers=headers).json() == []
+
+    first = client.get("/journal/search?q=ocean&limit=1", headers=headers)
+    second = client.get(f"/journal/search?q=ocean&limit=1&cursor={first.headers['x-next-cursor']}", headers=headers)
+    assert [h["id"] for h in first.json() + second.json()] == [h["id"] for h in hits]
+    assert "x-next-cursor" not in second.headers
+
+    edited = ids["Long day at work, no walk"]
+    client.put(f"/journal/{edited}", headers=headers, json={"entry_date": "2025-09-02", "content": "Ocean swim after work"})
+    assert edited in [h["id"] for h in client.get("/journal/search?q=swim", headers=headers).json()]
+    client.delete(f"/journal/{edited}", headers=headers)
+    assert client.get("/journal/search?q=swim", headers=headers).json() == []
+
+def test_bulk_import_moods_ndjson_reports_row_errors(monkeypatch):
+    monkeypatch.setattr(main, "IMPORT_BATCH_SIZE", 2)
+    headers = auth_headers("importer@example.com")
+    client.post("/moods/", headers=headers, json={"mood": "sad", "mood_date": "2024-01-02"})
+    body = "\n".join([
+        json.dumps({"mood": "happy", "mood_date": "2024-01-01"}),
+        json.dumps({"mood": "happy", "mood_date": "2024-01-02"}),
+        "",
+        "{not json",
+        json.dumps({"mood": "ecstatic", "mood_date": "2024-01-03"}),
+        json.dumps({"mood": "neutral", "mood_date": "2024-01-03"}),
+        json.dumps({"mood": "neutral", "mood_date": "2024-01-03"}),
+    ])
+    result = client.post("/moods/import", headers={**headers, "Content-Type": "application/x-ndjson"}, content=body).json()
+    assert result["imported"] == 2
+    assert [e["row"] for e in result["errors"]] == [2, 4, 5, 7]
+    assert result["errors"][0]["error"] == "You've already logged a mood for 2024-01-02."
+    assert result["errors"][2]["error"].startswith("mood:")
+    trends = client.get("/moods/trends?period=month&buckets=1&to=2024-01-31", headers=headers).json()
+    assert trends["buckets"][0]["entries"] == 3
+    assert trends["streak"]["longest"] == 3
+
+def test_bulk_import_journal_csv():
+    headers = auth_headers("csv-importer@example.com")
+    db = TestingSessionLocal()
+    prompt = main.PromptDB(prompt_text="What are you growing?", created_at=main.datetime.utcnow())
+    db.add(prompt)
+    db.commit()
+    prompt_id = prompt.id
+    db.close()
+    body = (
+        "entry_date,content,prompt_id\r\n"
+        f'2024-02-01,"First line\nsecond line, with a comma",{prompt_id}\r\n'
+        "2024-02-02,Plain entry about gardening,\r\n"
+        "2024-02-03,Bad prompt,999\r\n"
+        "2024-02-04,too,many,columns\r\n"
+    )
+    result = client.post("/journal/import", headers={**headers, "Content-Type": "text/csv"}, content=body.encode()).json()
+    assert result["imported"] == 2
+    assert result["errors"] == [
+        {"row": 5, "error": "Prompt does not exist"},
+        {"row": 6, "error": "Expected 3 columns, got 4"},
+    ]
+    journals = client.get("/journal/?order=asc", headers=headers).json()
+    assert journals[0]["content"] == "First line\nsecond line, with a comma"
+    assert journals[0]["prompt_id"] == prompt_id and journals[1]["prompt_id"] is None
+    assert len(client.get("/journal/search?q=gardening", headers=headers).json()) == 1
+
+def test_export_streams_ndjson_csv_and_gzip():
+    import csv as csv_module
+    import gzip as gzip_module
+    headers = auth_headers("exporter@example.com")
+    client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": "2024-05-01"})
+    client.post("/journal/", headers=headers, json={"entry_date": "2024-05-01", "content": "Line one\nline two, with comma"})
+
+    ndjson = client.get("/export", headers=headers)
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [r["type"] for r in records] == ["user", "mood", "journal"]
+    assert records[0]["email"] == "exporter@example.com" and "password_hash" not in records[0]
+    assert records[1]["mood_date"] == "2024-05-01"
+
+    rows = list(csv_module.DictReader(client.get("/export?format=csv", headers=headers).text.splitlines(True)))
+    assert [(r["type"], r["date"]) for r in rows] == [("user", ""), ("mood", "2024-05-01"), ("journal", "2024-05-01")]
+    assert rows[2]["content"] == "Line one\nline two, with comma"
+
+    gzipped = client.get("/export?gzip=true", headers=headers)
+    assert gzipped.headers["content-type"] == "application/gzip"
+    assert gzip_module.decompress(gzipped.content).decode() == ndjson.text
+
+def test_conditional_get_returns_304_until_data_changes():
+    headers = auth_headers("etag@example.com")
+    first = client.get("/moods/", headers=headers)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        cached = client.get("/moods/", headers={**headers, "If-None-Match": f'W/{etag}'})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert len(statements) == 1 and "data_versions" in statements[0]
+
+    # Different query parameters are a different representation.
+    assert client.get("/moods/?limit=5", headers={**headers, "If-None-Match": etag}).status_code == 200
+    # Another user's ETag never matches.
+    other = auth_headers("etag-other@example.com")
+    assert client.get("/moods/", headers={**other, "If-None-Match": etag}).status_code == 200
+
+    journal_etag = client.get("/journal/", headers=headers).headers["etag"]
+    me_etag = client.get("/users/me", headers=headers).headers["etag"]
+    client.post("/journal/", headers=headers, json={"entry_date": "2025-10-01", "content": "Changes everything"})
+    assert client.get("/moods/", headers={**headers, "If-None-Match": etag}).status_code == 200
+    assert client.get("/journal/", headers={**headers, "If-None-Match": journal_etag}).status_code == 200
+    assert client.get("/users/me", headers={**headers, "If-None-Match": me_etag}).status_code == 200
+
+    prompts_etag = client.get("/prompts/").headers["etag"]
+    assert client.get("/prompts/", headers={"If-None-Match": prompts_etag}).status_code == 304
+
+def test_memstore_indexes_follow_writes():
+    from memstore import MemoryStore
+    store = MemoryStore()
+    users = store.create_table("users", ("email", "display_name"), unique=("email",))
+    journal = store.create_table("journal", ("user_id", "prompt_id"), indexes=("user_id", "prompt_id"))
+    alice = users.insert({"email": "alice@example.com"})
+    with pytest.raises(KeyError):
+        users.insert({"email": "alice@example.com"})
+    users.update(alice.id, {"email": "alicia@example.com"})
+    assert users.get_by("email", "alice@example.com") is None
+    assert users.get_by("email", "alicia@example.com") is alice
+
+    first = journal.insert({"user_id": alice.id, "prompt_id": 7})
+    second = journal.insert({"user_id": alice.id, "prompt_id": None})
+    assert [j.id for j in journal.find("user_id", alice.id)] == [first.id, second.id]
+    journal.update(first.id, {"prompt_id": 8})
+    assert journal.find("prompt_id", 7) == [] and journal.find("prompt_id", 8) == [first]
+    assert len(journal.delete_by("user_id", alice.id)) == 2
+    assert len(journal) == 0 and journal.indexes["user_id"] == {} and journal.indexes["prompt_id"] == {}
+
+def test_memory_reads_wait_for_writers():
+    import threading
+    from datetime import date
+    repo = MemoryRepository()
+    user = repo.create_user("reader@example.com", "hash", None)
+    repo.create_journal(user.id, None, date(2025, 1, 1), "First")
+    pages = []
+    reader = threading.Thread(target=lambda: pages.append(repo.list_journals(user.id, PageRequest(limit=10))))
+    with repo.store.write():
+        reader.start()
+        reader.join(0.1)
+        assert reader.is_alive()
+        repo.create_journal(user.id, None, date(2025, 1, 2), "Second")
+    reader.join()
+    assert [j.content for j in pages[0]] == ["Second", "First"]
+
+def test_memstore_recovers_from_snapshot_and_log(tmp_path):
+    from datetime import date
+    from memstore import MemoryStore
+
+    def make_store():
+        store = MemoryStore()
+        store.create_table("users", ("email",), unique=("email",))
+        store.create_table("moods", ("user_id", "mood_date"), indexes=("user_id",))
+        return store
+
+    store = make_store()
+    store.open(str(tmp_path), durability="sync", snapshot_every=0)
+    with store.write():
+        alice = store["users"].insert({"email": "alice@example.com"})
+        store["moods"].insert({"user_id": alice.id, "mood_date": date(2025, 1, 1)})
+    store.snapshot()
+    with store.write():
+        bob = store["users"].insert({"email": "bob@example.com"})
+        store["users"].update(alice.id, {"email": "alicia@example.com"})
+        store["moods"].delete_by("user_id", alice.id)
+    store.wal.close()  # crash: no closing snapshot
+    segment = sorted(tmp_path.glob("*.wal"))[-1]
+    with open(segment, "ab") as f:
+        f.write(b"\x10\x00\x00")  # torn record from a crash mid-append
+
+    recovered = make_store()
+    recovered.open(str(tmp_path), durability="group", snapshot_every=0)
+    assert [u.email for u in recovered["users"]] == ["alicia@example.com", "bob@example.com"]
+    assert recovered["users"].get_by("email", "bob@example.com").id == bob.id
+    assert len(recovered["moods"]) == 0
+    with recovered.write():
+        carol = recovered["users"].insert({"email": "carol@example.com"})
+    assert carol.id == 3
+    recovered.close()
+    assert len(list(tmp_path.glob("snapshot-*.bin"))) == 1
+
+    reopened = make_store()
+    reopened.open(str(tmp_path), durability="async", snapshot_every=0)
+    assert len(reopened["users"]) == 3 and reopened["users"].next_id == 4
+    reopened.close(snapshot=False)
+
+@pytest.fixture(params=["sql", "memory"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRepository()
+        return
+    repo_engine = create_engine(f"sqlite:///{tmp_path / 'repository.db'}")
+    run_migrations(repo_engine)
+    db = sessionmaker(bind=repo_engine, autoflush=False)()
+    yield main.SqlRepository(db)
+    db.close()
+    repo_engine.dispose()
+
+def test_repository_conformance(repository):
+    from datetime import date
+    alice = repository.create_user("alice@example.com", "hash", "Alice")
+    bob = repository.create_user("bob@example.com", "hash", None)
+    with pytest.raises(DuplicateError):
+        repository.create_user("alice@example.com", "hash", None)
+    with pytest.raises(DuplicateError):
+        repository.update_user(bob.id, "alice@example.com", None)
+    assert repository.update_user(999, "x@example.com", None) is None
+    assert repository.get_user_by_email("alice@example.com").id == alice.id
+    assert repository.add_missing_prompts(["Why?", "How?"]) == 2
+    assert repository.add_missing_prompts(["Why?", "When?"]) == 1
+    prompt = repository.list_prompts()[0]
+
+    version = repository.data_version(user_scope(alice.id))
+    for day in (3, 1, 2):
+        repository.create_mood(alice.id, "happy", date(2025, 1, day))
+    with pytest.raises(DuplicateError):
+        repository.create_mood(alice.id, "sad", date(2025, 1, 1))
+    repository.create_mood(bob.id, "sad", date(2025, 1, 1))
+    assert repository.data_version(user_scope(alice.id)) == version + 3
+
+    first = repository.list_moods(alice.id, PageRequest(limit=2))
+    assert [m.mood_date.day for m in first] == [3, 2, 1]
+    after = (first[1].mood_date, first[1].id)
+    assert [m.mood_date.day for m in repository.list_moods(alice.id, PageRequest(limit=2, after=after))] == [1]
+    ascending = repository.list_moods(alice.id, PageRequest(limit=5, descending=False, from_date=date(2025, 1, 2)))
+    assert [m.mood_date.day for m in ascending] == [2, 3]
+
+    mood = repository.get_mood(alice.id, first[0].id)
+    assert repository.get_mood(bob.id, mood.id) is None
+    assert repository.update_mood(bob.id, mood.id, "sad", date(2025, 1, 9)) is None
+    with pytest.raises(DuplicateError):
+        repository.update_mood(alice.id, mood.id, "sad", date(2025, 1, 1))
+    assert repository.update_mood(alice.id, mood.id, "sad", date(2025, 1, 9)).mood_date == date(2025, 1, 9)
+    assert not repository.delete_mood(bob.id, mood.id) and repository.delete_mood(alice.id, mood.id)
+    assert [m.mood_date.day for m in repository.list_moods(alice.id, PageRequest(limit=5))] == [2, 1]
+
+    custom = repository.create_prompt("What now?")
+    with pytest.raises(DuplicateError):
+        repository.create_prompt("Why?")
+    with pytest.raises(DuplicateError):
+        repository.update_prompt(custom.id, "Why?")
+    assert repository.update_prompt(custom.id, "What next?").prompt_text == "What next?"
+    assert repository.update_prompt(999, "Who?") is None
+    linked = repository.create_journal(bob.id, custom.id, date(2025, 1, 3), "Linked")
+    version = repository.data_version(user_scope(bob.id))
+    assert repository.delete_prompt(custom.id) and not repository.delete_prompt(custom.id)
+    assert repository.get_prompt(custom.id) is None
+    assert repository.get_journal(bob.id, linked.id).prompt_id is None
+    assert repository.data_version(user_scope(bob.id)) == version + 1
+
+    entry = repository.create_journal(alice.id, prompt.id, date(2025, 1, 1), "First")
+    same_day = repository.create_journal(alice.id, None, date(2025, 1, 1), "Second")
+    assert [j.id for j in repository.list_journals(alice.id, PageRequest(limit=10))] == [same_day.id, entry.id]
+    assert repository.get_journal(bob.id, entry.id) is None
+    assert repository.update_journal(bob.id, entry.id, None, date(2025, 1, 2), "Nope") is None
+    assert repository.update_journal(alice.id, entry.id, None, date(2025, 1, 2), "Edited").content == "Edited"
+    assert not repository.delete_journal(bob.id, entry.id)
+    assert repository.delete_journal(alice.id, entry.id)
+
+    version = repository.data_version(user_scope(alice.id))
+    assert repository.delete_user(alice.id) and not repository.delete_user(alice.id)
+    assert repository.get_user(alice.id) is None
+    assert repository.list_moods(alice.id, PageRequest(limit=10)) == []
+    assert repository.list_journals(alice.id, PageRequest(limit=10)) == []
+    assert len(repository.list_moods(bob.id, PageRequest(limit=10))) == 1
+    assert repository.data_version(user_scope(alice.id)) == version + 1
+
+def test_memory_backend_serves_the_same_api(monkeypatch):
+    repo = MemoryRepository()
+    repo.add_missing_prompts(main.MOOD_PROMPT_MAP.values())
+    monkeypatch.setattr(main, "memory_repository", repo)
+    app.dependency_overrides[main.get_repository] = lambda: repo
+    app.dependency_overrides[main.get_read_repository] = lambda: repo
+    # Memory-backend user ids overlap the SQLite ones used by other tests.
+    main.principal_cache.clear()
+    try:
+        headers = auth_headers("memory@example.com")
+        assert client.post("/users/", json={"email": "memory@example.com", "password": "testpass123"}).status_code == 400
+        assert client.post("/moods/", headers=headers, json={"mood": "happy", "mood_date": "2025-01-01"}).status_code == 200
+        assert client.post("/moods/", headers=headers, json={"mood": "sad", "mood_date": "2025-01-01"}).status_code == 400
+        mood_id = client.get("/moods/", headers=headers).json()[0]["id"]
+        assert client.put(f"/moods/{mood_id}", headers=headers, json={"mood": "sad", "mood_date": "2025-01-01"}).json()["mood"] == "sad"
+        prompt_id = client.get("/prompts/").json()[0]["id"]
+        journal = client.post("/journal/", headers=headers, json={"prompt_id": prompt_id, "entry_date": "2025-01-01", "content": "Hi"}).json()
+        assert client.post("/journal/", headers=headers, json={"prompt_id": 999, "entry_date": "2025-01-01", "content": "x"}).status_code == 400
+
+        listed = client.get("/journal/", headers=headers)
+        assert listed.json() == [journal] and set(journal) == set(main.Journal.model_fields)
+        assert set(client.get("/users/").json()[0]) == set(main.User.model_fields)
+        etag = listed.headers["etag"]
+        assert client.get("/journal/", headers={**headers, "If-None-Match": etag}).status_code == 304
+        client.put(f"/journal/{journal['id']}", headers=headers, json={"entry_date": "2025-01-02", "content": "Edited"})
+        assert client.get("/journal/", headers={**headers, "If-None-Match": etag}).status_code == 200
+        assert client.get("/moods/trends", headers=headers).status_code == 501
+
+        me = client.get("/users/me", headers=headers).json()
+        client.delete(f"/users/{me['id']}")
+        assert repo.journal.find("user_id", me["id"]) == [] and repo.moods.find("user_id", me["id"]) == []
+        assert client.get("/users/me", headers=headers).status_code == 401
+    finally:
+        app.dependency_overrides.pop(main.get_repository)
+        app.dependency_overrides.pop(main.get_read_repository)
+        main.principal_cache.clear()
+
+def test_bulk_seed_is_deterministic_and_restores_indexes(tmp_path):
+    import sqlite3
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from seed_db import seed_bulk
+    from synthetic import Population
+
+    dumps = []
+    for name in ("a.db", "b.db"):
+        path = str(tmp_path / name)
+        counts = seed_bulk(path, Population(users=3, years=0.1, seed=7), batch_size=20, verbose=False)
+        conn = sqlite3.connect(path)
+        dumps.append([
+            conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+            for table in ("moods", "journal")
+        ])
+        assert counts["moods"] == len(dumps[-1][0]) and counts["journal"] == len(dumps[-1][1])
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+        assert {"uq_moods_user_date", "ix_journal_user_entry_date", "journal_fts_insert"} <= names
+        word = dumps[-1][1][0][4].split()[1].strip(".")
+        assert conn.execute("SELECT count(*) FROM journal_fts WHERE journal_fts MATCH ?", (f'"{word}"',)).fetchone()[0] > 0
+        assert conn.execute("SELECT count(*) FROM mood_streaks").fetchone()[0] == 3
+        conn.close()
+    assert dumps[0] == dumps[1]
+    with pytest.raises(ValueError):
+        seed_bulk(str(tmp_path / "a.db"), Population(users=1, years=0.1), verbose=False)
+
+def test_startup_checks_schema_and_seeds_prompts_in_bulk(tmp_path, monkeypatch):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    monkeypatch.setattr(main, "engine", fresh)
+    with pytest.raises(RuntimeError, match="manage.py migrate"):
+        main.check_schema()
+    run_migrations(fresh)
+    main.check_schema()
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(fresh, "before_cursor_execute", record)
+    db = sessionmaker(bind=fresh)()
+    try:
+        assert main.SqlRepository(db).add_missing_prompts(main.MOOD_PROMPT_MAP.values()) == len(main.MOOD_PROMPT_MAP)
+        # One lookup, one multi-row insert and the prompts version bump.
+        assert len(statements) == 3
+        assert main.SqlRepository(db).add_missing_prompts(main.MOOD_PROMPT_MAP.values()) == 0
+        assert len(statements) == 4
+    finally:
+        event.remove(fresh, "before_cursor_execute", record)
+        db.close()
+        fresh.dispose()
+
+MEMORY_STARTUP_SCRIPT = """
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+import main_in_memory
+
+class Completions:
+    async def create(self, **kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Noted."))])
+
+main_in_memory.main.async_client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+with TestClient(main_in_memory.app) as client:
+    print(client.get("/prompts/").status_code)
+    print(client.post("/journal/feedback", json={"content": "Quiet day."}).json())
+"""
+
+def test_memory_backend_starts_without_a_database(tmp_path):
+    # Startup hooks run in a child process: shutdown stops this process's worker pools.
+    import subprocess
+    import sys
+    db_path = tmp_path / "memory.db"
+    script = tmp_path / "start_memory.py"
+    script.write_text(MEMORY_STARTUP_SCRIPT)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "STORAGE_BACKEND": "memory", "DATABASE_URL": f"sqlite:///{db_path}", "PYTHONPATH": app_dir}
+    env.pop("MEMORY_DATA_DIR", None)
+    env.pop("FEEDBACK_CACHE_PERSIST", None)
+    def start(**extra):
+        return subprocess.run([sys.executable, str(script)], cwd=app_dir, env={**env, **extra}, capture_output=True, text=True)
+
+    in_process = start()
+    assert in_process.returncode == 0, in_process.stderr
+    assert in_process.stdout.splitlines() == ["200", "{'feedback': 'Noted.', 'cached': False}"]
+    assert not db_path.exists()
+
+    # A persistent feedback cache is the one thing that needs the SQLite schema.
+    unmigrated = start(FEEDBACK_CACHE_PERSIST="1")
+    assert unmigrated.returncode != 0 and "manage.py migrate" in unmigrated.stderr
+    fresh = create_engine(f"sqlite:///{db_path}")
+    run_migrations(fresh)
+    persisted = start(FEEDBACK_CACHE_PERSIST="1")
+    assert persisted.returncode == 0, persisted.stderr
+    assert persisted.stdout.splitlines() == ["200", "{'feedback': 'Noted.', 'cached': False}"]
+    with fresh.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM feedback_cache")).scalar() == 1
+    fresh.dispose()
@@ -32,3 +32,93 @@ CREATE TABLE prompts (
     prompt_text TEXT NOT NULL,
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Cached AI feedback keyed by a hash of model, prompt version and journal text,
+-- and the background jobs that precompute it (migration 2).
+CREATE TABLE feedback_cache (
+    "key" VARCHAR(64) NOT NULL,
+    model VARCHAR NOT NULL,
+    prompt_version VARCHAR NOT NULL,
+    feedback TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY ("key")
+);
+
+CREATE INDEX ix_feedback_cache_created_at ON feedback_cache (created_at);
+
+CREATE TABLE feedback_jobs (
+    id INTEGER NOT NULL,
+    journal_id INTEGER NOT NULL,
+    status VARCHAR NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (journal_id),
+    FOREIGN KEY(journal_id) REFERENCES journal (id)
+);
+
+CREATE INDEX ix_feedback_jobs_id ON feedback_jobs (id);
+CREATE INDEX ix_feedback_jobs_status ON feedback_jobs (status);
+
+-- Per-user listing, date filters and keyset pagination (migration 3).
+CREATE INDEX ix_journal_user_entry_date ON journal (user_id, entry_date, id);
+
+-- Shared-text check before purging cached feedback on delete (migration 8).
+CREATE INDEX ix_journal_content ON journal (content);
+
+-- One mood per user per day; also serves per-user mood listing (migration 4).
+CREATE UNIQUE INDEX uq_moods_user_date ON moods (user_id, mood_date);
+
+-- Per-user mood trend aggregates (migration 5), kept current by POST /moods/.
+CREATE TABLE mood_buckets (
+    user_id INTEGER NOT NULL,
+    period VARCHAR NOT NULL,
+    bucket_start DATE NOT NULL,
+    entries INTEGER NOT NULL,
+    score_total INTEGER NOT NULL,
+    angry INTEGER NOT NULL,
+    very_sad INTEGER NOT NULL,
+    sad INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    happy INTEGER NOT NULL,
+    very_happy INTEGER NOT NULL,
+    PRIMARY KEY (user_id, period, bucket_start),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE mood_streaks (
+    user_id INTEGER NOT NULL,
+    run_start DATE NOT NULL,
+    run_end DATE NOT NULL,
+    longest INTEGER NOT NULL,
+    PRIMARY KEY (user_id),
+    FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+-- Full-text search over journal content (migration 6); user_id is indexed so
+-- per-user searches intersect posting lists.
+CREATE VIRTUAL TABLE journal_fts USING fts5(
+    content, user_id, content='journal', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER journal_fts_insert AFTER INSERT ON journal BEGIN
+    INSERT INTO journal_fts (rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+END;
+
+CREATE TRIGGER journal_fts_delete AFTER DELETE ON journal BEGIN
+    INSERT INTO journal_fts (journal_fts, rowid, content, user_id) VALUES ('delete', old.id, old.content, old.user_id);
+END;
+
+CREATE TRIGGER journal_fts_update AFTER UPDATE OF content, user_id ON journal BEGIN
+    INSERT INTO journal_fts (journal_fts, rowid, content, user_id) VALUES ('delete', old.id, old.content, old.user_id);
+    INSERT INTO journal_fts (rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+END;
+
+-- Per-scope data versions behind ETags (migration 7): "user:<id>" and "prompts".
+CREATE TABLE data_versions (
+    scope VARCHAR NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (scope)
+);
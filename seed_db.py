@@ -1,6 +1,21 @@
+import argparse
+import itertools
+import os
 import sqlite3
+import subprocess
+import sys
+import time
 from datetime import datetime
 
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+sys.path.insert(0, APP_DIR)
+
+# Tables whose secondary indexes and triggers are dropped during a bulk load and
+# rebuilt afterwards: one sorted index build is far cheaper than millions of
+# incremental B-tree and FTS updates.
+BULK_TABLES = ("users", "prompts", "moods", "journal")
+
+
 def seed_demo_data(db_path, user_email):
     try:
         conn = sqlite3.connect(db_path)
@@ -15,6 +30,7 @@ def seed_demo_data(db_path, user_email):
 
         user_id = result[0]
         print(f"Found user ID {user_id} for email {user_email}")
+        now = datetime.utcnow().isoformat(" ")
 
         # Insert prompts (if they don't already exist)
         prompts = [
@@ -22,11 +38,10 @@ def seed_demo_data(db_path, user_email):
             (2, "Describe something that went well."),
             (3, "What’s one thing you’d like to improve tomorrow?")
         ]
-        for prompt in prompts:
-            cursor.execute(
-                "INSERT OR IGNORE INTO prompts (id, prompt_text, created_at) VALUES (?, ?, ?)",
-                (prompt[0], prompt[1], datetime.utcnow())
-            )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO prompts (id, prompt_text, created_at) VALUES (?, ?, ?)",
+            [(prompt_id, text, now) for prompt_id, text in prompts]
+        )
 
         # Insert mood history
         mood_data = [
@@ -36,11 +51,10 @@ def seed_demo_data(db_path, user_email):
             ("sad", "2025-08-01"),
             ("happy", "2025-08-02")
         ]
-        for mood, date in mood_data:
-            cursor.execute(
-                "INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (?, ?, ?, ?)",
-                (user_id, mood, date, datetime.utcnow())
-            )
+        cursor.executemany(
+            "INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (?, ?, ?, ?)",
+            [(user_id, mood, date, now) for mood, date in mood_data]
+        )
 
         # Insert journal entries
         journal_data = [
@@ -50,11 +64,10 @@ def seed_demo_data(db_path, user_email):
             (1, "2025-08-01", "A bit drained today. Trying to rest more."),
             (2, "2025-08-02", "Went to the park. Felt peaceful and grounded.")
         ]
-        for prompt_id, entry_date, content in journal_data:
-            cursor.execute(
-                "INSERT INTO journal (user_id, prompt_id, entry_date, content, created_at) VALUES (?, ?, ?, ?, ?)",
-                (user_id, prompt_id, entry_date, content, datetime.utcnow())
-            )
+        cursor.executemany(
+            "INSERT INTO journal (user_id, prompt_id, entry_date, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(user_id, prompt_id, entry_date, content, now) for prompt_id, entry_date, content in journal_data]
+        )
 
         conn.commit()
         print("Demo data seeded successfully.")
@@ -64,7 +77,151 @@ def seed_demo_data(db_path, user_email):
         if conn:
             conn.close()
 
+
+# =====================
+#   BULK SEEDING
+# =====================
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(conn, sql, rows, batch_size):
+    """executemany in one transaction per batch; returns the number of rows inserted."""
+    count = 0
+    for batch in _batches(rows, batch_size):
+        conn.execute("BEGIN")
+        conn.executemany(sql, batch)
+        conn.execute("COMMIT")
+        count += len(batch)
+    return count
+
+
+def seed_bulk(db_path, population, batch_size=50_000, password="mindfulday", verbose=True):
+    """Load a synthetic population into an empty, migrated-on-demand database.
+
+    Every user signs in as user<N>@example.com with `password`. The same
+    population settings (including its seed) always produce the same rows.
+    Returns the row counts per table.
+    """
+    from sqlalchemy import create_engine
+
+    from migrations import run_migrations
+    from passwords import hash_password
+
+    def log(message):
+        if verbose:
+            print(message, flush=True)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    run_migrations(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM users)").fetchone()[0]:
+            raise ValueError(f"{db_path} already has users; bulk seeding needs an empty database")
+
+        # Relaxed for the load: no fsyncs, rollback journal in memory, a large
+        # page cache, and no other connections. A crash mid-load leaves a
+        # database to throw away, which is fine for a staging build.
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        for pragma in ("journal_mode = MEMORY", "synchronous = OFF", "cache_size = -262144",
+                       "temp_store = MEMORY", "locking_mode = EXCLUSIVE", "foreign_keys = OFF"):
+            conn.execute(f"PRAGMA {pragma}")
+
+        placeholders = ", ".join("?" * len(BULK_TABLES))
+        deferred = conn.execute(
+            f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+            f"AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+            BULK_TABLES
+        ).fetchall()
+        for kind, name, _ in deferred:
+            conn.execute(f'DROP {kind.upper()} "{name}"')
+
+        counts, began = {}, time.perf_counter()
+        created = datetime.utcnow().isoformat(" ")
+        counts["prompts"] = _insert(
+            conn, "INSERT INTO prompts (id, prompt_text, created_at) VALUES (?, ?, ?)",
+            ((prompt_id, text, created) for prompt_id, text in population.prompt_rows()), batch_size
+        )
+        password_hash = hash_password(password)
+        counts["users"] = _insert(
+            conn, "INSERT INTO users (id, email, password_hash, display_name, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((user_id, email, password_hash, name, str(joined), str(joined)) for user_id, email, name, joined in population.user_rows()),
+            batch_size
+        )
+        log(f"Inserted {counts['users']} users")
+        user_ids = range(1, population.users + 1)
+        counts["moods"] = _insert(
+            conn, "INSERT INTO moods (user_id, mood, mood_date, created_at) VALUES (?, ?, ?, ?)",
+            ((user_id, mood, str(day), str(at)) for uid in user_ids for user_id, mood, day, at in population.mood_rows(uid)),
+            batch_size
+        )
+        log(f"Inserted {counts['moods']} moods")
+        counts["journal"] = _insert(
+            conn, "INSERT INTO journal (user_id, prompt_id, entry_date, content, created_at) VALUES (?, ?, ?, ?, ?)",
+            ((user_id, prompt_id, str(day), content, str(at))
+             for uid in user_ids for user_id, prompt_id, day, content, at in population.journal_rows(uid)),
+            batch_size
+        )
+        log(f"Inserted {counts['journal']} journal entries in {time.perf_counter() - began:.1f}s")
+
+        began = time.perf_counter()
+        conn.execute("BEGIN")
+        for kind, _, sql in deferred:
+            if kind == "index":
+                conn.execute(sql)
+        # The triggers keep journal_fts current from here on; fill it once now.
+        conn.execute("INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')")
+        for kind, _, sql in deferred:
+            if kind == "trigger":
+                conn.execute(sql)
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        log(f"Built indexes and the search index in {time.perf_counter() - began:.1f}s")
+
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    finally:
+        conn.close()
+
+    # Trend aggregates are derived in SQL by the app's own rebuild command.
+    began = time.perf_counter()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.abspath(db_path)}")
+    subprocess.run([sys.executable, "manage.py", "rebuild-mood-trends"], cwd=APP_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    log(f"Rebuilt mood trends in {time.perf_counter() - began:.1f}s")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed demo data for one user, or bulk-load a synthetic population.")
+    parser.add_argument("--db", default="mental_health.db", help="SQLite database file")
+    parser.add_argument("--email", default="demo1@example.com", help="user to attach the demo data to")
+    parser.add_argument("--bulk", action="store_true", help="load a synthetic population into an empty database")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=1.0, help="years of mood and journal history per user")
+    parser.add_argument("--journals-per-week", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42, help="same seed, same dataset")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per transaction")
+    parser.add_argument("--password", default="mindfulday", help="password for every seeded user")
+    args = parser.parse_args()
+
+    if not args.bulk:
+        seed_demo_data(args.db, args.email)
+        return
+
+    from synthetic import Population
+
+    population = Population(users=args.users, years=args.years, journals_per_week=args.journals_per_week, seed=args.seed)
+    began = time.perf_counter()
+    counts = seed_bulk(args.db, population, args.batch_size, args.password)
+    print(f"Seeded {args.db} in {time.perf_counter() - began:.1f}s: " + ", ".join(f"{n} {table}" for table, n in counts.items()))
+
+
 if __name__ == "__main__":
-    db_path = "mental_health.db"
-    demo_email = "demo1@example.com"
-    seed_demo_data(db_path, demo_email)
+    main()